@@ -12,12 +12,17 @@ from ..auth import get_current_user, require_role
 
 router = APIRouter(prefix="/api/cost-reports", tags=["cost-reports"])
 
+def get_cost_calculator(db: Session = Depends(get_db)) -> CostCalculator:
+    """Calculadora de costos de la request (su caché por dispositivo y fecha vive lo que la request)"""
+    return CostCalculator(db)
+
 @router.get("/device/{device_id}/cost")
 async def get_device_cost(
     device_id: int,
     calculation_date: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calculator: CostCalculator = Depends(get_cost_calculator)
 ):
     """Obtiene el cálculo de costo de un dispositivo específico"""
     
@@ -39,12 +44,11 @@ async def get_device_cost(
             raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
     
     # Calcular costo
-    calculator = CostCalculator(db)
     cost_data = calculator.calculate_device_cost(device, calc_date)
     
     return {
         "success": True,
-        "data": cost_data
+        "data": cost_data.as_dict()
     }
 
 @router.get("/device/{device_id}/report")
@@ -53,7 +57,8 @@ async def get_device_cost_report(
     format: str = "pdf",
     calculation_date: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calculator: CostCalculator = Depends(get_cost_calculator)
 ):
     """Genera reporte de costo de un dispositivo en PDF o CSV"""
     
@@ -79,10 +84,10 @@ async def get_device_cost_report(
             raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
     
     # Generar reporte
-    generator = ReportGenerator(db)
+    generator = ReportGenerator(db, calculator)
     
     if format == "pdf":
-        pdf_content = generator.generate_device_cost_report_pdf(device, calc_date)
+        pdf_content = await generator.generate_device_cost_report_pdf_async(device, calc_date)
         
         return StreamingResponse(
             io.BytesIO(pdf_content),
@@ -91,10 +96,8 @@ async def get_device_cost_report(
         )
     
     else:  # CSV
-        csv_content = generator.generate_device_cost_report_csv(device, calc_date)
-        
         return StreamingResponse(
-            io.StringIO(csv_content),
+            generator.iter_device_cost_report_csv(device, calc_date),
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename=costo-{device.name}-{datetime.now().strftime('%Y%m%d')}.csv"}
         )
@@ -105,7 +108,8 @@ async def get_company_monthly_cost(
     year: int,
     month: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calculator: CostCalculator = Depends(get_cost_calculator)
 ):
     """Obtiene el cálculo de costo mensual de una empresa"""
     
@@ -126,7 +130,6 @@ async def get_company_monthly_cost(
         raise HTTPException(status_code=400, detail="Año inválido")
     
     # Calcular costo mensual
-    calculator = CostCalculator(db)
     monthly_data = calculator.calculate_company_monthly_cost(company, year, month)
     
     return {
@@ -141,7 +144,8 @@ async def get_company_monthly_report(
     month: int,
     format: str = "pdf",
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calculator: CostCalculator = Depends(get_cost_calculator)
 ):
     """Genera reporte mensual de una empresa en PDF o CSV"""
     
@@ -166,10 +170,10 @@ async def get_company_monthly_report(
         raise HTTPException(status_code=400, detail="Año inválido")
     
     # Generar reporte
-    generator = ReportGenerator(db)
+    generator = ReportGenerator(db, calculator)
     
     if format == "pdf":
-        pdf_content = generator.generate_company_monthly_report_pdf(company, year, month)
+        pdf_content = await generator.generate_company_monthly_report_pdf_async(company, year, month)
         
         return StreamingResponse(
             io.BytesIO(pdf_content),
@@ -178,10 +182,8 @@ async def get_company_monthly_report(
         )
     
     else:  # CSV
-        csv_content = generator.generate_company_monthly_report_csv(company, year, month)
-        
         return StreamingResponse(
-            io.StringIO(csv_content),
+            generator.iter_company_monthly_report_csv(company, year, month),
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename=reporte-mensual-{company.name}-{year}-{month:02d}.csv"}
         )
@@ -190,7 +192,8 @@ async def get_company_monthly_report(
 async def get_company_cost_summary(
     company_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calculator: CostCalculator = Depends(get_cost_calculator)
 ):
     """Obtiene resumen de costos de una empresa"""
     
@@ -204,7 +207,6 @@ async def get_company_cost_summary(
         raise HTTPException(status_code=403, detail="No tienes permisos para ver esta empresa")
     
     # Obtener resumen
-    calculator = CostCalculator(db)
     summary = calculator.get_company_cost_summary(company)
     
     return {
@@ -217,7 +219,8 @@ async def get_company_historical_costs(
     company_id: int,
     months_back: int = 12,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calculator: CostCalculator = Depends(get_cost_calculator)
 ):
     """Obtiene costos históricos de una empresa"""
     
@@ -235,7 +238,6 @@ async def get_company_historical_costs(
         raise HTTPException(status_code=400, detail="months_back debe estar entre 1 y 24")
     
     # Obtener histórico
-    calculator = CostCalculator(db)
     historical = calculator.calculate_historical_costs(company, months_back)
     
     return {
@@ -247,7 +249,8 @@ async def get_company_historical_costs(
 async def get_company_cost_breakdown(
     company_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calculator: CostCalculator = Depends(get_cost_calculator)
 ):
     """Obtiene desglose de costos por estado de dispositivos"""
     
@@ -261,7 +264,6 @@ async def get_company_cost_breakdown(
         raise HTTPException(status_code=403, detail="No tienes permisos para ver esta empresa")
     
     # Obtener desglose
-    calculator = CostCalculator(db)
     breakdown = calculator.get_cost_breakdown_by_status(company)
     
     return {
@@ -275,7 +277,8 @@ async def export_devices_list(
     company_id: Optional[int] = None,
     status: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["superadmin", "staff"]))
+    current_user: User = Depends(require_role(["superadmin", "staff"])),
+    calculator: CostCalculator = Depends(get_cost_calculator)
 ):
     """Exporta lista de dispositivos con costos (solo admin)"""
     
@@ -295,11 +298,9 @@ async def export_devices_list(
     devices = query.all()
     
     # Generar reporte
-    generator = ReportGenerator(db)
-    csv_content = generator.generate_devices_list_csv(devices)
-    
+    generator = ReportGenerator(db, calculator)
     return StreamingResponse(
-        io.StringIO(csv_content),
+        generator.iter_devices_list_csv(devices),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename=equipos-{datetime.now().strftime('%Y%m%d')}.csv"}
     )
@@ -310,10 +311,11 @@ async def get_device_cost_legacy(
     device_id: int,
     calculation_date: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calculator: CostCalculator = Depends(get_cost_calculator)
 ):
     """Ruta legacy para compatibilidad con plantillas"""
-    return await get_device_cost(device_id, calculation_date, db, current_user)
+    return await get_device_cost(device_id, calculation_date, db, current_user, calculator)
 
 @router.get("/devices/{device_id}/cost-report")
 async def get_device_cost_report_legacy(
@@ -321,7 +323,8 @@ async def get_device_cost_report_legacy(
     format: str = "pdf",
     calculation_date: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calculator: CostCalculator = Depends(get_cost_calculator)
 ):
     """Ruta legacy para compatibilidad con plantillas"""
-    return await get_device_cost_report(device_id, format, calculation_date, db, current_user)
\ No newline at end of file
+    return await get_device_cost_report(device_id, format, calculation_date, db, current_user, calculator)
\ No newline at end of file
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, Response
 from sqlalchemy.orm import Session
 from typing import Optional
-import base64
 from io import BytesIO
 
 from app.database import get_db
@@ -17,8 +17,8 @@ label_generator = LabelGenerator()
 @router.get("/device/{device_id}/qr")
 async def get_device_qr(
     device_id: int,
-    size: Optional[int] = Query(200, description="Tamaño del QR en píxeles"),
-    format: Optional[str] = Query("base64", description="Formato de salida: base64 o png"),
+    size: Optional[int] = Query(200, ge=50, le=1000, description="Tamaño del QR en píxeles"),
+    format: Optional[str] = Query("base64", description="Formato de salida: base64, png o svg"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -36,14 +36,17 @@ async def get_device_qr(
     # Generar datos del QR
     qr_data = f"DEVICE:{device.id}:{device.serial_number or ''}"
     
-    # Generar QR
-    qr_image = label_generator.generate_qr_code(qr_data, (size, size))
+    # SVG: vectorial, sin rasterizar ni redimensionar
+    if format == "svg":
+        qr_svg = label_generator.generate_qr_svg_bytes(qr_data, size)
+        return Response(content=qr_svg, media_type="image/svg+xml")
     
     if format == "base64":
+        qr_image = label_generator.generate_qr_code(qr_data, (size, size))
         return {"qr_code": qr_image, "data": qr_data}
     elif format == "png":
-        # Decodificar base64 y retornar como imagen
-        img_data = base64.b64decode(qr_image.split(',')[1])
+        # PNG directo, sin pasar por base64
+        img_data = label_generator.generate_qr_code_bytes(qr_data, (size, size))
         return Response(content=img_data, media_type="image/png")
     else:
         raise HTTPException(status_code=400, detail="Formato no soportado")
@@ -51,8 +54,8 @@ async def get_device_qr(
 @router.get("/device/{device_id}/barcode")
 async def get_device_barcode(
     device_id: int,
-    width: Optional[int] = Query(300, description="Ancho del código de barras"),
-    height: Optional[int] = Query(100, description="Alto del código de barras"),
+    width: Optional[int] = Query(300, ge=50, le=1000, description="Ancho del código de barras"),
+    height: Optional[int] = Query(100, ge=20, le=500, description="Alto del código de barras"),
     format: Optional[str] = Query("base64", description="Formato de salida: base64 o png"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -71,14 +74,12 @@ async def get_device_barcode(
     # Generar código de barras con ID del dispositivo
     barcode_data = f"{device.id:06d}"  # Formatear como 6 dígitos
     
-    # Generar código de barras
-    barcode_image = label_generator.generate_barcode(barcode_data, (width, height))
-    
     if format == "base64":
+        barcode_image = label_generator.generate_barcode(barcode_data, (width, height))
         return {"barcode": barcode_image, "data": barcode_data}
     elif format == "png":
-        # Decodificar base64 y retornar como imagen
-        img_data = base64.b64decode(barcode_image.split(',')[1])
+        # PNG directo, sin pasar por base64
+        img_data = label_generator.generate_barcode_bytes(barcode_data, (width, height))
         return Response(content=img_data, media_type="image/png")
     else:
         raise HTTPException(status_code=400, detail="Formato no soportado")
@@ -86,7 +87,7 @@ async def get_device_barcode(
 @router.get("/device/{device_id}/label")
 async def get_device_label(
     device_id: int,
-    format: Optional[str] = Query("base64", description="Formato de salida: base64 o png"),
+    format: Optional[str] = Query("base64", description="Formato de salida: base64, png o html"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -116,17 +117,19 @@ async def get_device_label(
         "serial_number": device.serial_number,
         "company_name": company.name if company else "StoraTrack",
         "location": location.name if location else "",
-        "entry_date": device.entry_date
+        "entry_date": device.fecha_ingreso
     }
     
-    # Generar etiqueta
-    label_image = label_generator.generate_device_label(device_data)
+    # HTML con QR y código de barras en SVG, para imprimir desde el navegador
+    if format == "html":
+        return HTMLResponse(content=label_generator.generate_device_label_html(device_data))
     
     if format == "base64":
+        label_image = label_generator.generate_device_label(device_data)
         return {"label": label_image, "device_data": device_data}
     elif format == "png":
-        # Decodificar base64 y retornar como imagen
-        img_data = base64.b64decode(label_image.split(',')[1])
+        # PNG directo, sin pasar por base64
+        img_data = label_generator.generate_device_label_bytes(device_data)
         return Response(content=img_data, media_type="image/png")
     else:
         raise HTTPException(status_code=400, detail="Formato no soportado")
@@ -134,8 +137,8 @@ async def get_device_label(
 @router.get("/location/{location_id}/qr")
 async def get_location_qr(
     location_id: int,
-    size: Optional[int] = Query(200, description="Tamaño del QR en píxeles"),
-    format: Optional[str] = Query("base64", description="Formato de salida: base64 o png"),
+    size: Optional[int] = Query(200, ge=50, le=1000, description="Tamaño del QR en píxeles"),
+    format: Optional[str] = Query("base64", description="Formato de salida: base64, png o svg"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -153,14 +156,17 @@ async def get_location_qr(
     # Generar datos del QR
     qr_data = f"LOCATION:{location.id}:{location.code or ''}"
     
-    # Generar QR
-    qr_image = label_generator.generate_qr_code(qr_data, (size, size))
+    # SVG: vectorial, sin rasterizar ni redimensionar
+    if format == "svg":
+        qr_svg = label_generator.generate_qr_svg_bytes(qr_data, size)
+        return Response(content=qr_svg, media_type="image/svg+xml")
     
     if format == "base64":
+        qr_image = label_generator.generate_qr_code(qr_data, (size, size))
         return {"qr_code": qr_image, "data": qr_data}
     elif format == "png":
-        # Decodificar base64 y retornar como imagen
-        img_data = base64.b64decode(qr_image.split(',')[1])
+        # PNG directo, sin pasar por base64
+        img_data = label_generator.generate_qr_code_bytes(qr_data, (size, size))
         return Response(content=img_data, media_type="image/png")
     else:
         raise HTTPException(status_code=400, detail="Formato no soportado")
@@ -195,14 +201,12 @@ async def get_location_label(
         "max_capacity": location.max_capacity
     }
     
-    # Generar etiqueta
-    label_image = label_generator.generate_location_label(location_data)
-    
     if format == "base64":
+        label_image = label_generator.generate_location_label(location_data)
         return {"label": label_image, "location_data": location_data}
     elif format == "png":
-        # Decodificar base64 y retornar como imagen
-        img_data = base64.b64decode(label_image.split(',')[1])
+        # PNG directo, sin pasar por base64
+        img_data = label_generator.generate_location_label_bytes(location_data)
         return Response(content=img_data, media_type="image/png")
     else:
         raise HTTPException(status_code=400, detail="Formato no soportado")
@@ -236,6 +240,30 @@ async def get_batch_device_labels(
     
     results = []
     
+    # Etiquetas completas: empresas y ubicaciones en una consulta, imágenes en paralelo
+    labels = {}
+    if label_type == "label":
+        company_names = dict(db.query(Company.id, Company.name).filter(
+            Company.id.in_({device.company_id for device in devices})
+        ).all())
+        location_names = dict(db.query(Location.id, Location.name).filter(
+            Location.id.in_({device.location_id for device in devices if device.location_id})
+        ).all())
+        
+        devices_data = [
+            {
+                "id": device.id,
+                "name": device.name,
+                "serial_number": device.serial_number,
+                "company_name": company_names.get(device.company_id, "StoraTrack"),
+                "location": location_names.get(device.location_id, ""),
+                "entry_date": device.fecha_ingreso
+            }
+            for device in devices
+        ]
+        generated = await run_in_threadpool(label_generator.generate_device_labels, devices_data, True)
+        labels = dict(zip((device.id for device in devices), generated))
+    
     for device in devices:
         try:
             if label_type == "qr":
@@ -257,22 +285,9 @@ async def get_batch_device_labels(
                     "type": "barcode"
                 })
             elif label_type == "label":
-                # Obtener datos adicionales
-                company = db.query(Company).filter(Company.id == device.company_id).first()
-                location = None
-                if device.location_id:
-                    location = db.query(Location).filter(Location.id == device.location_id).first()
-                
-                device_data = {
-                    "id": device.id,
-                    "name": device.name,
-                    "serial_number": device.serial_number,
-                    "company_name": company.name if company else "StoraTrack",
-                    "location": location.name if location else "",
-                    "entry_date": device.entry_date
-                }
-                
-                image = label_generator.generate_device_label(device_data)
+                image = labels[device.id]
+                if isinstance(image, Exception):
+                    raise image
                 results.append({
                     "device_id": device.id,
                     "device_name": device.name,
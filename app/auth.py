@@ -4,7 +4,7 @@ from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from app.database import get_db
 from app.models import User, UserRole
 from app.schemas import TokenData
@@ -72,7 +72,10 @@ def get_current_user(request: Request, db: Session = Depends(get_db)):
     user_id = request.session.get("user_id")
     if user_id:
         try:
-            user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
+            # La empresa se carga en la misma consulta (base.html la muestra en cada página)
+            user = db.query(User).options(joinedload(User.company)).filter(
+                User.id == user_id, User.is_active == True
+            ).first()
             if user:
                 # Verificar que la sesión tenga todos los datos necesarios
                 if not request.session.get("user_email") or not request.session.get("user_role"):
@@ -95,7 +98,9 @@ def get_current_user(request: Request, db: Session = Depends(get_db)):
         try:
             token = authorization.split(" ")[1]
             token_data = verify_token(token, credentials_exception)
-            user = db.query(User).filter(User.email == token_data.email, User.is_active == True).first()
+            user = db.query(User).options(joinedload(User.company)).filter(
+                User.email == token_data.email, User.is_active == True
+            ).first()
             if user is None:
                 raise credentials_exception
             return user
@@ -140,6 +145,14 @@ def require_admin_or_staff(current_user: User = Depends(get_current_active_user)
         )
     return current_user
 
+def require_client_user(current_user: User = Depends(get_current_active_user)):
+    """Requerir rol de cliente con empresa asignada"""
+    if current_user.role.value != "client_user":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    if not current_user.company_id:
+        raise HTTPException(status_code=400, detail="Usuario sin empresa asignada")
+    return current_user
+
 def require_same_company_or_admin(current_user: User = Depends(get_current_active_user)):
     """Requerir misma empresa o permisos de admin"""
     def company_checker(company_id: int):
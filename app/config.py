@@ -10,8 +10,19 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     
+    # CORS y hosts permitidos (listas separadas por comas)
+    cors_origins: str = os.getenv("CORS_ORIGINS", "http://localhost:4011,http://127.0.0.1:4011")
+    allowed_hosts: str = os.getenv("ALLOWED_HOSTS", "localhost,127.0.0.1,*")
+    
+    def get_cors_origins(self) -> List[str]:
+        return [origin.strip() for origin in self.cors_origins.split(',')]
+    
+    def get_allowed_hosts(self) -> List[str]:
+        return [host.strip() for host in self.allowed_hosts.split(',')]
+    
     # Database
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./database/storatrack.db")
+    auto_create_tables: bool = os.getenv("AUTO_CREATE_TABLES", "false").lower() in ("1", "true")
     
     # Timezone and locale
     timezone: str = os.getenv("TIMEZONE", time.tzname[0] if time.daylight == 0 else time.tzname[1])
@@ -36,6 +47,9 @@ class Settings(BaseSettings):
     def get_allowed_extensions(self) -> List[str]:
         return [ext.strip() for ext in self.allowed_extensions.split(',')]
     
+    # Plantillas: releer las modificadas (desarrollo); desactivar en producción
+    templates_auto_reload: bool = os.getenv("TEMPLATES_AUTO_RELOAD", "true").lower() in ("1", "true")
+    
     # Pagination
     default_page_size: int = 20
     max_page_size: int = 100
@@ -60,6 +74,10 @@ class Settings(BaseSettings):
     cache_default_expire: int = 300  # 5 minutos
     cache_stats_expire: int = 60     # 1 minuto para estadísticas
     
+    # Procesos para generar PDF por cada worker de uvicorn (el total es
+    # PDF_WORKERS × --workers)
+    pdf_workers: int = int(os.getenv("PDF_WORKERS", "2"))
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Enum, Table
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Enum, Table, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -106,7 +106,7 @@ class Location(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
     description = Column(Text)
-    code = Column(String(100))  # Código de referencia
+    code = Column(String(100), index=True)  # Código de referencia
     
     # Jerarquía y tipo
     parent_id = Column(Integer, ForeignKey("locations.id"), nullable=True)
@@ -202,6 +202,16 @@ class Device(Base):
     tags = relationship("Tag", secondary="device_tags", back_populates="devices")
     movements = relationship("DeviceMovement", back_populates="device")
     cost_calculations = relationship("CostCalculation", back_populates="device")
+    
+    # Índices para los filtros más usados (empresa + activos); parciales sobre is_active
+    __table_args__ = (
+        Index("ix_devices_company_fecha_ingreso", "company_id", "fecha_ingreso",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")),
+        Index("ix_devices_company_status", "company_id", "status",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")),
+        Index("ix_devices_company_created_at", "company_id", "created_at",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")),
+    )
 
 # Tabla de asociación para Device-Tag (many-to-many)
 from sqlalchemy import Table
@@ -235,6 +245,11 @@ class DeviceMovement(Base):
     device = relationship("Device", back_populates="movements")
     from_location = relationship("Location", foreign_keys=[from_location_id], back_populates="device_movements_from")
     to_location = relationship("Location", foreign_keys=[to_location_id], back_populates="device_movements_to")
+    
+    __table_args__ = (
+        Index("ix_device_movements_device_created_at", "device_id", "created_at"),
+        Index("ix_device_movements_device_status_created_at", "device_id", "to_status", "created_at"),
+    )
 
 class CostCalculation(Base):
     __tablename__ = "cost_calculations"
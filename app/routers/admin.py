@@ -22,7 +22,9 @@ from app.config import settings
 from app.utils.datetime_utils import now_local
 from app.utils.pagination import paginate_query, get_pagination_params, create_pagination_context
 # from app.utils.cache import cached, invalidate_cache_pattern
+from app.utils.cache import invalidate_cache_pattern, invalidate_lookup_cache
 from datetime import datetime
+from functools import partial
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
@@ -390,6 +392,7 @@ async def update_company(
     company.updated_at = now_local()
     
     db.commit()
+    invalidate_cache_pattern(f"current_cost:{company_id}")
     
     return RedirectResponse(url=f"/admin/companies/{company_id}", status_code=302)
 
@@ -841,6 +844,9 @@ async def devices_page(
         {"title": "Equipos", "url": ""}
     ]
     
+    # Una sola fecha de corte para todas las filas de la tabla
+    now = now_local()
+    
     return templates.TemplateResponse(
         "admin/devices.html",
         {
@@ -852,8 +858,8 @@ async def devices_page(
             "locations": locations,
             "breadcrumbs": breadcrumbs,
             "pagination": pagination,
-            "now": now_local(),
-            "calculate_device_cost": calculate_device_cost
+            "now": now,
+            "calculate_device_cost": partial(calculate_device_cost, fecha_hasta=now)
         }
     )
 
@@ -930,6 +936,7 @@ async def create_device(
         )
         db.add(movement)
         db.commit()
+        invalidate_cache_pattern(f"current_cost:{company_id}")
         
         return {"success": True, "message": "Equipo creado exitosamente"}
         
@@ -974,6 +981,7 @@ async def delete_device(
         device.updated_at = now_local()
         
         db.commit()
+        invalidate_cache_pattern(f"current_cost:{device.company_id}")
         
         return {"success": True, "message": "Dispositivo eliminado exitosamente"}
         
@@ -1260,6 +1268,7 @@ async def update_location(
         location.company_id = company_id
         
         db.commit()
+        invalidate_lookup_cache()
         
         return {"success": True, "message": "Ubicación actualizada exitosamente"}
         
@@ -1311,6 +1320,7 @@ async def delete_location(
         # Marcar como inactiva (soft delete)
         location.is_active = False
         db.commit()
+        invalidate_lookup_cache()
         
         return {"success": True, "message": "Ubicación eliminada exitosamente"}
         
@@ -1425,6 +1435,7 @@ async def admin_location_create(
             db_location.companies = companies
         
         db.commit()
+        invalidate_lookup_cache()
         
         return {"success": True, "message": "Ubicación creada exitosamente"}
         
@@ -1474,7 +1485,7 @@ async def admin_reports(
             try:
                 # Calcular costo mensual de cada empresa
                 company_monthly = calculator.calculate_company_monthly_cost(
-                    company, current_date.year, current_date.month
+                    company, current_date.year, current_date.month, include_device_details=False
                 )
                 monthly_revenue += company_monthly['total_cost']
             except Exception as e:
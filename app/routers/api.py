@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
@@ -16,14 +17,16 @@ from app.schemas import (
     Tag as TagSchema, TagCreate, TagUpdate,
     DeviceMovement as DeviceMovementSchema, DeviceMovementCreate,
     MonthlyReport as MonthlyReportSchema,
-    PaginatedResponse, MessageResponse, DashboardStats, CompanyDashboard
+    PaginatedResponse, MessageResponse, DashboardStats, CompanyDashboard,
+    CompanyListAdapter, UserListAdapter, DeviceListAdapter, LocationListAdapter,
+    dump_list_json
 )
 from app.auth import (
     get_current_active_user, require_superadmin, require_admin_or_staff,
     check_company_access, get_password_hash
 )
 from app.config import settings
-from app.utils.cache import invalidate_cache_pattern
+from app.utils.cache import invalidate_cache_pattern, invalidate_lookup_cache
 
 router = APIRouter()
 
@@ -39,7 +42,7 @@ async def get_companies(
     companies = db.query(Company).filter(
         Company.is_active == True
     ).offset(skip).limit(limit).all()
-    return companies
+    return Response(content=dump_list_json(CompanyListAdapter, companies), media_type="application/json")
 
 @router.post("/companies", response_model=CompanySchema, tags=["Companies"])
 async def create_company(
@@ -56,7 +59,7 @@ async def create_company(
             detail="Ya existe una empresa con ese RUT/ID"
         )
     
-    db_company = Company(**company.dict())
+    db_company = Company(**company.model_dump())
     db.add(db_company)
     db.commit()
     db.refresh(db_company)
@@ -106,7 +109,7 @@ async def update_company(
             detail="Empresa no encontrada"
         )
     
-    update_data = company_update.dict(exclude_unset=True)
+    update_data = company_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(company, field, value)
     
@@ -117,6 +120,7 @@ async def update_company(
     # Invalidar caché
     invalidate_cache_pattern("dashboard_stats*")
     invalidate_cache_pattern("companies_list*")
+    invalidate_cache_pattern(f"current_cost:{company_id}")
     
     return company
 
@@ -164,7 +168,7 @@ async def get_users(
         query = query.filter(User.company_id == company_id)
     
     users = query.offset(skip).limit(limit).all()
-    return users
+    return Response(content=dump_list_json(UserListAdapter, users), media_type="application/json")
 
 @router.post("/users", response_model=UserSchema, tags=["Users"])
 async def create_user(
@@ -188,7 +192,7 @@ async def create_user(
             detail="No tienes permisos para crear superadministradores"
         )
     
-    user_data = user.dict()
+    user_data = user.model_dump()
     user_data['hashed_password'] = get_password_hash(user_data.pop('password'))
     
     db_user = User(**user_data)
@@ -237,7 +241,7 @@ async def get_devices(
         query = query.filter(Device.location_id == location_id)
     
     devices = query.offset(skip).limit(limit).all()
-    return devices
+    return Response(content=dump_list_json(DeviceListAdapter, devices), media_type="application/json")
 
 @router.post("/devices", response_model=DeviceSchema, tags=["Devices"])
 async def create_device(
@@ -253,7 +257,7 @@ async def create_device(
             detail="No tienes acceso a esta empresa"
         )
     
-    device_data = device.dict()
+    device_data = device.model_dump()
     tag_ids = device_data.pop('tag_ids', [])
     
     db_device = Device(**device_data)
@@ -289,6 +293,7 @@ async def create_device(
     
     # Invalidar caché
     invalidate_cache_pattern("dashboard_stats*")
+    invalidate_cache_pattern(f"current_cost:{db_device.company_id}")
     
     return db_device
 
@@ -349,7 +354,7 @@ async def update_device(
             detail="No tienes acceso a esta empresa"
         )
     
-    update_data = device_update.dict(exclude_unset=True)
+    update_data = device_update.model_dump(exclude_unset=True)
     tag_ids = update_data.pop('tag_ids', None)
     
     # Guardar valores anteriores para el movimiento
@@ -390,6 +395,7 @@ async def update_device(
     
     # Invalidar caché
     invalidate_cache_pattern("dashboard_stats*")
+    invalidate_cache_pattern(f"current_cost:{device.company_id}")
     
     return device
 
@@ -406,7 +412,7 @@ async def get_locations(
         locations = db.query(Location).filter(
             Location.is_active == True
         ).all()
-        return locations
+        return Response(content=dump_list_json(LocationListAdapter, locations), media_type="application/json")
     
     # Si se especifica company_id, verificar acceso
     if company_id:
@@ -420,7 +426,7 @@ async def get_locations(
             Location.company_id == company_id,
             Location.is_active == True
         ).all()
-        return locations
+        return Response(content=dump_list_json(LocationListAdapter, locations), media_type="application/json")
     
     # Para usuarios cliente sin company_id especificado, devolver error
     raise HTTPException(
@@ -452,7 +458,7 @@ async def create_location(
                 )
     
     # Crear ubicación sin las company_ids (no es campo del modelo)
-    location_data = location.dict(exclude={'company_ids'})
+    location_data = location.model_dump(exclude={'company_ids'})
     db_location = Location(**location_data)
     db.add(db_location)
     db.flush()  # Para obtener el ID
@@ -468,6 +474,7 @@ async def create_location(
     # Invalidar caché
     invalidate_cache_pattern("dashboard_stats*")
     invalidate_cache_pattern("locations_list*")
+    invalidate_lookup_cache()
     
     return db_location
 
@@ -498,7 +505,7 @@ async def get_dashboard_stats(
             try:
                 # Calcular costo mensual de cada empresa
                 company_monthly = calculator.calculate_company_monthly_cost(
-                    company, current_date.year, current_date.month
+                    company, current_date.year, current_date.month, include_device_details=False
                 )
                 monthly_revenue += company_monthly['total_cost']
             except Exception as e:
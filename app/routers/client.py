@@ -1,33 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Query
-from fastapi.responses import HTMLResponse, Response
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from fastapi.concurrency import run_in_threadpool
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy.orm import Session, contains_eager, joinedload, selectinload
+from sqlalchemy import and_, case, or_, func
 from typing import Optional
 from datetime import datetime, timedelta
-from app.database import get_db
-from app.models import User, Device, DeviceMovement, Tag, Location, UserRole, DeviceStatus
-from app.auth import get_current_active_user
+from functools import lru_cache
+from calendar import monthrange
+from io import BytesIO
+from itertools import chain
+from pathlib import Path
+import asyncio
+import hashlib
+import os
+import numpy as np
+import segno
+from app.database import SessionLocal, get_db
+from app.models import User, Company, Device, DeviceMovement, Tag, Location, MonthlyReport, UserRole, DeviceStatus, device_tags
+from app.auth import require_client_user
 from app.config import settings
 from app.utils.datetime_utils import now_local
+from app.utils.cache import cache_manager, get_cached_lookup
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
+templates.env.bytecode_cache = FileSystemBytecodeCache()
+templates.env.auto_reload = settings.templates_auto_reload
+
+# Plantillas de los endpoints más usados (el entorno de Jinja las cachea y
+# solo revisa si cambiaron cuando auto_reload está activo)
+DASHBOARD_TEMPLATE = "client/dashboard.html"
+DEVICES_TEMPLATE = "client/devices.html"
 
 @router.get("/dashboard", response_class=HTMLResponse, name="client_dashboard")
 async def client_dashboard(
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(require_client_user)
 ):
     """Dashboard del cliente"""
-    # Verificar que el usuario sea un cliente
-    if current_user.role.value != "client_user":
-        raise HTTPException(status_code=403, detail="Acceso denegado")
-    
-    # Verificar que el usuario tenga una empresa asignada
-    if not current_user.company_id:
-        raise HTTPException(status_code=400, detail="Usuario sin empresa asignada")
+    etag = company_version(db, current_user)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=revalidate_headers(etag))
     
     try:
         # Estadísticas básicas
@@ -59,7 +75,10 @@ async def client_dashboard(
         }
         
         # Movimientos recientes
-        recent_movements = db.query(DeviceMovement).join(Device).filter(
+        recent_movements = db.query(DeviceMovement).join(Device).options(
+            contains_eager(DeviceMovement.device),
+            joinedload(DeviceMovement.to_location)
+        ).filter(
             Device.company_id == current_user.company_id
         ).order_by(DeviceMovement.created_at.desc()).limit(5).all()
         
@@ -83,16 +102,13 @@ async def client_dashboard(
         recent_movements = []
         recent_devices = []
     
-    return templates.TemplateResponse(
-        "client/dashboard.html",
-        {
-            "request": request,
-            "current_user": current_user,
-            "stats": stats,
-            "recent_movements": recent_movements,
-            "recent_devices": recent_devices
-        }
-    )
+    return HTMLResponse(templates.get_template(DASHBOARD_TEMPLATE).render(
+        request=request,
+        current_user=current_user,
+        stats=stats,
+        recent_movements=recent_movements,
+        recent_devices=recent_devices
+    ), headers=revalidate_headers(etag))
 
 @router.get("/devices", response_class=HTMLResponse, name="client_devices")
 async def list_devices(
@@ -103,34 +119,28 @@ async def list_devices(
     location_id: Optional[int] = Query(None),
     tag_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(require_client_user)
 ):
     """Listar dispositivos del cliente"""
-    if current_user.role.value != "client_user":
-        raise HTTPException(status_code=403, detail="Acceso denegado")
-    
-    if not current_user.company_id:
-        raise HTTPException(status_code=400, detail="Usuario sin empresa asignada")
+    etag = company_version(db, current_user)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=revalidate_headers(etag))
     
     page_size = settings.default_page_size
     offset = (page - 1) * page_size
     
-    # Query base
-    query = db.query(Device).filter(
+    # Query base (tags y ubicación precargados para la tabla)
+    query = db.query(Device).options(
+        selectinload(Device.tags),
+        joinedload(Device.location)
+    ).filter(
         Device.company_id == current_user.company_id,
         Device.is_active == True
     )
     
     # Filtros
     if search:
-        query = query.filter(
-            or_(
-                Device.name.ilike(f"%{search}%"),
-                Device.serial_number.ilike(f"%{search}%"),
-                Device.model.ilike(f"%{search}%"),
-                Device.brand.ilike(f"%{search}%")
-            )
-        )
+        query = query.filter(DEVICE_SEARCH_TEXT.ilike(f"%{search}%"))
     
     if status:
         from app.models import DeviceStatus
@@ -151,49 +161,43 @@ async def list_devices(
     total = query.count()
     pages = (total + page_size - 1) // page_size
     
-    # Datos para filtros
-    locations = db.query(Location).filter(
-        Location.company_id == current_user.company_id,
-        Location.is_active == True
-    ).all()
-    
-    tags = db.query(Tag).filter(
-        Tag.company_id == current_user.company_id,
-        Tag.is_active == True
-    ).all()
+    # Datos para filtros (caché en proceso por empresa)
+    locations = get_active_locations(db, current_user.company_id)
+    tags = get_active_tags(db, current_user.company_id)
     
     from app.models import DeviceStatus
     
-    return templates.TemplateResponse("client/devices.html", {
-        "request": request,
-        "current_user": current_user,
-        "devices": devices,
-        "locations": locations,
-        "tags": tags,
-        "device_statuses": DeviceStatus,
-        "filters": {
+    return HTMLResponse(templates.get_template(DEVICES_TEMPLATE).render(
+        request=request,
+        current_user=current_user,
+        devices=devices,
+        locations=locations,
+        tags=tags,
+        device_statuses=DeviceStatus,
+        filters={
             "search": search,
             "status": status,
             "location_id": location_id,
             "tag_id": tag_id
         },
-        "page": page,
-        "pages": pages,
-        "total": total
-    })
+        page=page,
+        pages=pages,
+        total=total
+    ), headers=revalidate_headers(etag))
 
 @router.get("/devices/{device_id}", response_class=HTMLResponse, name="client_device_detail")
 async def view_device(
     request: Request,
     device_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(require_client_user)
 ):
     """Ver detalle de dispositivo"""
-    if current_user.role.value != "client_user":
-        raise HTTPException(status_code=403, detail="Acceso denegado")
-    
-    device = db.query(Device).filter(
+    device = db.query(Device).options(
+        joinedload(Device.company),
+        joinedload(Device.location),
+        selectinload(Device.tags)
+    ).filter(
         Device.id == device_id,
         Device.company_id == current_user.company_id,
         Device.is_active == True
@@ -202,13 +206,12 @@ async def view_device(
     if not device:
         raise HTTPException(status_code=404, detail="Dispositivo no encontrado")
     
-    # Calcular costo actual
-    current_cost = calculate_device_cost(device, now_local())
-    
-    # Historial de movimientos
-    movements = db.query(DeviceMovement).filter(
-        DeviceMovement.device_id == device_id
-    ).order_by(DeviceMovement.created_at.desc()).all()
+    # Costo actual e historial de movimientos en paralelo; el device ya tiene
+    # su empresa precargada y los movimientos usan su propia sesión
+    current_cost, movements = await asyncio.gather(
+        run_in_threadpool(calculate_device_cost, device, now_local()),
+        run_in_threadpool(load_device_movements, device_id)
+    )
     
     return templates.TemplateResponse("client/device_detail.html", {
         "request": request,
@@ -220,14 +223,12 @@ async def view_device(
 
 @router.get("/devices/{device_id}/qr", name="client_device_qr")
 async def device_qr_code(
+    request: Request,
     device_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(require_client_user)
 ):
     """Generar código QR del dispositivo"""
-    if current_user.role.value != "client_user":
-        raise HTTPException(status_code=403, detail="Acceso denegado")
-    
     device = db.query(Device).filter(
         Device.id == device_id,
         Device.company_id == current_user.company_id,
@@ -237,68 +238,53 @@ async def device_qr_code(
     if not device:
         raise HTTPException(status_code=404, detail="Dispositivo no encontrado")
     
-    # Generar QR
-    import qrcode
-    from io import BytesIO
-    
-    qr_data = f"StoraTrack-{device.id}-{device.name}"
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
+    # Generar QR (cacheado por id y nombre del dispositivo)
+    png = render_device_qr_png(device.id, device.name)
+    etag = f'"{hashlib.sha256(png).hexdigest()[:16]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=86400"
+    }
     
-    # Convertir a bytes
-    img_buffer = BytesIO()
-    img.save(img_buffer, format='PNG')
-    img_buffer.seek(0)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
     
-    return Response(
-        content=img_buffer.getvalue(),
-        media_type="image/png",
-        headers={"Content-Disposition": f"inline; filename=device_{device_id}_qr.png"}
-    )
+    headers["Content-Disposition"] = f"inline; filename=device_{device_id}_qr.png"
+    return Response(content=png, media_type="image/png", headers=headers)
 
 @router.get("/reports", response_class=HTMLResponse, name="client_reports")
 async def reports_page(
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(require_client_user)
 ):
     """Página de reportes"""
-    if current_user.role.value != "client_user":
-        raise HTTPException(status_code=403, detail="Acceso denegado")
-    
-    if not current_user.company_id:
-        raise HTTPException(status_code=400, detail="Usuario sin empresa asignada")
-    
-    # Reportes mensuales disponibles
-    from app.models import MonthlyReport
-    monthly_reports = db.query(MonthlyReport).filter(
+    # Reportes mensuales disponibles junto con el costo total acumulado
+    # de todos los reportes cerrados (SUM() OVER () en la misma consulta)
+    report_rows = db.query(
+        MonthlyReport,
+        func.sum(MonthlyReport.total_cost).over().label('accumulated')
+    ).filter(
         MonthlyReport.company_id == current_user.company_id,
         MonthlyReport.is_closed == True
     ).order_by(MonthlyReport.year.desc(), MonthlyReport.month.desc()).all()
+    monthly_reports = [report for report, _ in report_rows]
+    total_accumulated = (report_rows[0].accumulated if report_rows else None) or 0.0
     
     # Costo actual del mes
     now = now_local()
     current_month_cost = calculate_monthly_cost(db, current_user.company_id, now.year, now.month)
     
     # Estadísticas actuales para el resumen
-    total_devices = db.query(Device).filter(
+    device_counts = db.query(
+        func.count(Device.id).label('total'),
+        func.sum(case((Device.status == DeviceStatus.ALMACENADO, 1), else_=0)).label('stored')
+    ).filter(
         Device.company_id == current_user.company_id,
         Device.is_active == True
-    ).count()
-    stored_devices = db.query(Device).filter(
-        Device.company_id == current_user.company_id,
-        Device.is_active == True,
-        Device.status == DeviceStatus.ALMACENADO
-    ).count()
-    
-    # Costo total acumulado de todos los reportes cerrados
-    total_accumulated = db.query(func.sum(MonthlyReport.total_cost)).filter(
-        MonthlyReport.company_id == current_user.company_id,
-        MonthlyReport.is_closed == True
-    ).scalar() or 0.0
+    ).one()
+    total_devices = device_counts.total
+    stored_devices = device_counts.stored or 0
     
     current_stats = {
         'total_devices': total_devices,
@@ -313,8 +299,7 @@ async def reports_page(
     }
     
     # Información del período actual
-    from calendar import monthrange
-    days_in_month = monthrange(now.year, now.month)[1]
+    days_in_month = month_last_day(now.year, now.month)
     current_period = {
         'start': f"{now.year}-{now.month:02d}-01",
         'end': f"{now.year}-{now.month:02d}-{days_in_month}",
@@ -322,8 +307,7 @@ async def reports_page(
     }
     
     # Obtener información de la empresa
-    from app.models import Company
-    company = db.query(Company).filter(Company.id == current_user.company_id).first()
+    company = current_user.company
     
     return templates.TemplateResponse("client/reports.html", {
         "request": request,
@@ -341,29 +325,24 @@ async def reports_page(
 async def download_current_report(
     format: str = Query("pdf", regex="^(pdf|csv)$"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(require_client_user)
 ):
     """Descargar reporte actual"""
-    if current_user.role.value != "client_user":
-        raise HTTPException(status_code=403, detail="Acceso denegado")
-    
-    if not current_user.company_id:
-        raise HTTPException(status_code=400, detail="Usuario sin empresa asignada")
-    
     # Generar reporte hasta la fecha actual
     now = now_local()
     
     if format == "pdf":
-        pdf_content = generate_pdf_report(db, current_user.company_id, now.year, now.month, now)
+        pdf_content = await run_in_threadpool(
+            generate_pdf_report, db, current_user.company_id, now.year, now.month, now
+        )
         return Response(
             content=pdf_content,
             media_type="application/pdf",
             headers={"Content-Disposition": f"attachment; filename=reporte_{now.year}_{now.month:02d}.pdf"}
         )
     else:
-        csv_content = generate_csv_report(db, current_user.company_id, now.year, now.month, now)
-        return Response(
-            content=csv_content,
+        return StreamingResponse(
+            iter_csv_report(db, current_user.company_id, now.year, now.month, now),
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename=reporte_{now.year}_{now.month:02d}.csv"}
         )
@@ -372,29 +351,24 @@ async def download_current_report(
 async def download_current_report_format(
     format: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(require_client_user)
 ):
     """Descargar reporte actual"""
-    if current_user.role.value != "client_user":
-        raise HTTPException(status_code=403, detail="Acceso denegado")
-    
-    if not current_user.company_id:
-        raise HTTPException(status_code=400, detail="Usuario sin empresa asignada")
-    
     # Generar reporte hasta la fecha actual
     now = now_local()
     
     if format == "pdf":
-        pdf_content = generate_pdf_report(db, current_user.company_id, now.year, now.month, now)
+        pdf_content = await run_in_threadpool(
+            generate_pdf_report, db, current_user.company_id, now.year, now.month, now
+        )
         return Response(
             content=pdf_content,
             media_type="application/pdf",
             headers={"Content-Disposition": f"attachment; filename=reporte_{now.year}_{now.month:02d}.pdf"}
         )
     else:
-        csv_content = generate_csv_report(db, current_user.company_id, now.year, now.month, now)
-        return Response(
-            content=csv_content,
+        return StreamingResponse(
+            iter_csv_report(db, current_user.company_id, now.year, now.month, now),
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename=reporte_{now.year}_{now.month:02d}.csv"}
         )
@@ -402,53 +376,54 @@ async def download_current_report_format(
 @router.get("/api/current-cost", name="client_api_current_cost")
 async def get_current_cost(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(require_client_user)
 ):
     """Obtener costo actual de la empresa"""
-    if current_user.role.value != "client_user":
-        raise HTTPException(status_code=403, detail="Acceso denegado")
-    
-    if not current_user.company_id:
-        raise HTTPException(status_code=400, detail="Usuario sin empresa asignada")
+    # Caché por empresa (nunca por usuario) para los sondeos del navegador
+    cache_key_str = f"current_cost:{current_user.company_id}"
+    cached_cost = cache_manager.get(cache_key_str)
+    if cached_cost is not None:
+        return {"current_cost": cached_cost}
     
     try:
         total_cost = calculate_total_cost_to_date(db, current_user.company_id)
-        return {"current_cost": total_cost}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al calcular costo: {str(e)}")
+    
+    cache_manager.set(cache_key_str, total_cost, settings.cache_stats_expire)
+    return {"current_cost": total_cost}
 
 @router.get("/reports/{report_id}/{format}", name="client_reports_download")
 async def download_report(
     report_id: str,
     format: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(require_client_user)
 ):
     """Descargar reporte específico"""
-    if current_user.role.value != "client_user":
-        raise HTTPException(status_code=403, detail="Acceso denegado")
-    
-    if not current_user.company_id:
-        raise HTTPException(status_code=400, detail="Usuario sin empresa asignada")
-    
     try:
         # Parsear el report_id para obtener año y mes
         year, month = map(int, report_id.split('-'))
         
         # Generar reporte hasta el último día del mes
-        from calendar import monthrange
-        last_day = monthrange(year, month)[1]
+        last_day = month_last_day(year, month)
         fecha_hasta = datetime(year, month, last_day, 23, 59, 59)
         
         if format == "pdf":
-            pdf_content = generate_pdf_report(db, current_user.company_id, year, month, fecha_hasta)
+            pdf_content = await run_in_threadpool(
+                get_report_artifact, db, current_user.company_id, year, month, "pdf",
+                lambda: generate_pdf_report(db, current_user.company_id, year, month, fecha_hasta)
+            )
             return Response(
                 content=pdf_content,
                 media_type="application/pdf",
                 headers={"Content-Disposition": f"attachment; filename=reporte_{year}_{month:02d}.pdf"}
             )
         else:
-            csv_content = generate_csv_report(db, current_user.company_id, year, month, fecha_hasta)
+            csv_content = await run_in_threadpool(
+                get_report_artifact, db, current_user.company_id, year, month, "csv",
+                lambda: generate_csv_report(db, current_user.company_id, year, month, fecha_hasta)
+            )
             return Response(
                 content=csv_content,
                 media_type="text/csv",
@@ -459,10 +434,130 @@ async def download_report(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al generar reporte: {str(e)}")
 
+# Texto de búsqueda de dispositivos: una sola expresión en lugar de cuatro ILIKE,
+# igual a la del índice trigram de migrations/add_device_search_index.py
+DEVICE_SEARCH_TEXT = (
+    func.coalesce(Device.name, '') + ' ' +
+    func.coalesce(Device.serial_number, '') + ' ' +
+    func.coalesce(Device.model, '') + ' ' +
+    func.coalesce(Device.brand, '')
+)
+
 # Funciones auxiliares
-def calculate_device_cost(device: Device, fecha_hasta: datetime) -> dict:
-    """Calcular costo de un dispositivo hasta una fecha"""
+def build_version() -> str:
+    """Versión del despliegue: última modificación de plantillas y código de la app
+    
+    Es la misma en todos los workers de un despliegue y cambia al desplegar
+    nuevas plantillas o vistas.
+    """
+    app_dir = Path(__file__).resolve().parents[1]
+    files = chain(Path("templates").rglob("*.html"), app_dir.rglob("*.py"))
+    return str(max((f.stat().st_mtime_ns for f in files), default=0))
+
+BUILD_VERSION = build_version()
+
+def company_version(db: Session, user: User) -> str:
+    """ETag débil con la versión de los datos de la empresa del usuario
+    
+    Cambia cuando se crea/modifica un dispositivo o se registra un movimiento,
+    cuando cambian la empresa (nombre, costos, IVA), sus ubicaciones o sus
+    etiquetas (o sus asignaciones), con el día (las páginas muestran días
+    almacenados) y con cada despliegue de plantillas o código.
+    """
+    company_id = user.company_id
+    company_devices = db.query(Device).filter(Device.company_id == company_id)
+    company_movements = db.query(DeviceMovement).join(Device).filter(Device.company_id == company_id)
+    company_device_tags = db.query(device_tags).filter(
+        device_tags.c.device_id.in_(company_devices.with_entities(Device.id))
+    )
+    company_locations = db.query(Location).filter(or_(
+        Location.company_id == company_id,
+        Location.id.in_(company_devices.with_entities(Device.location_id))
+    ))
+    version = db.query(
+        company_devices.with_entities(func.max(Device.updated_at)).scalar_subquery(),
+        company_devices.with_entities(func.count(Device.id)).scalar_subquery(),
+        company_movements.with_entities(func.max(DeviceMovement.created_at)).scalar_subquery(),
+        company_movements.with_entities(func.count(DeviceMovement.id)).scalar_subquery(),
+        db.query(Company.updated_at).filter(Company.id == company_id).scalar_subquery(),
+        company_locations.with_entities(func.max(Location.updated_at)).scalar_subquery(),
+        # Las asignaciones de etiquetas no cambian devices.updated_at
+        company_device_tags.with_entities(func.count()).scalar_subquery(),
+        company_device_tags.with_entities(func.sum(device_tags.c.tag_id)).scalar_subquery(),
+        company_device_tags.with_entities(func.sum(device_tags.c.device_id)).scalar_subquery()
+    ).one()
+    
+    # Las etiquetas no tienen updated_at: se incluye el catálogo tal como se muestra
+    tags = db.query(Tag.id, Tag.name, Tag.color, Tag.is_active).filter(
+        Tag.company_id == company_id
+    ).order_by(Tag.id).all()
+    
+    # En desarrollo (plantillas con auto_reload) se recalcula en cada request
+    build = build_version() if settings.templates_auto_reload else BUILD_VERSION
+    raw = (
+        f"{build}:{company_id}:{user.id}:{user.updated_at}:{now_local().date()}:"
+        f"{tuple(version)}:{[tuple(tag) for tag in tags]}"
+    )
+    return f'W/"{hashlib.sha256(raw.encode()).hexdigest()[:16]}"'
+
+def revalidate_headers(etag: str) -> dict:
+    """Headers para que el navegador revalide la página con If-None-Match"""
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+def load_device_movements(device_id: int) -> list:
+    """Historial de movimientos de un dispositivo (usa una sesión propia)"""
+    db = SessionLocal()
+    try:
+        return db.query(DeviceMovement).options(
+            joinedload(DeviceMovement.to_location)
+        ).filter(
+            DeviceMovement.device_id == device_id
+        ).order_by(DeviceMovement.created_at.desc()).all()
+    finally:
+        db.close()
+
+@lru_cache(maxsize=256)
+def month_last_day(year: int, month: int) -> int:
+    """Último día de un mes"""
+    return monthrange(year, month)[1]
+
+@lru_cache(maxsize=4096)
+def render_device_qr_png(device_id: int, device_name: str) -> bytes:
+    """Generar el PNG del código QR de un dispositivo"""
+    qr = segno.make(f"StoraTrack-{device_id}-{device_name}", error='m', boost_error=False)
+    buffer = BytesIO()
+    qr.save(buffer, kind='png', scale=10, border=5)
+    return buffer.getvalue()
+
+def get_active_locations(db: Session, company_id: int) -> list:
+    """Ubicaciones activas de la empresa para los filtros"""
+    return get_cached_lookup(
+        ("locations", company_id),
+        lambda: db.query(Location.id, Location.name).filter(
+            Location.company_id == company_id,
+            Location.is_active == True
+        ).all()
+    )
+
+def get_active_tags(db: Session, company_id: int) -> list:
+    """Etiquetas activas de la empresa para los filtros"""
+    return get_cached_lookup(
+        ("tags", company_id),
+        lambda: db.query(Tag.id, Tag.name, Tag.color).filter(
+            Tag.company_id == company_id,
+            Tag.is_active == True
+        ).all()
+    )
+
+def calculate_device_cost(device: Device, fecha_hasta: datetime, company: Company = None) -> dict:
+    """Calcular costo de un dispositivo hasta una fecha
+    
+    `company` evita cargar device.company cuando ya se tiene la empresa
+    (por ejemplo, al recorrer filas de columnas en lugar de objetos Device).
+    """
     try:
+        company = company or device.company
+        
         if device.fecha_salida and device.fecha_salida < fecha_hasta:
             fecha_hasta = device.fecha_salida
         
@@ -475,11 +570,11 @@ def calculate_device_cost(device: Device, fecha_hasta: datetime) -> dict:
             dias = 1
         
         # Usar costos específicos del dispositivo o los default de la empresa
-        costo_base = device.costo_base or device.company.costo_base_default or 0.0
-        costo_diario = device.costo_diario or device.company.costo_diario_default or 0.0
+        costo_base = device.costo_base or company.costo_base_default or 0.0
+        costo_diario = device.costo_diario or company.costo_diario_default or 0.0
         
         subtotal = costo_base + (costo_diario * dias)
-        iva_amount = subtotal * (device.company.iva_percent / 100) if device.company.incluir_iva else 0
+        iva_amount = subtotal * (company.iva_percent / 100) if company.incluir_iva else 0
         total = subtotal + iva_amount
         
         return {
@@ -502,29 +597,63 @@ def calculate_device_cost(device: Device, fecha_hasta: datetime) -> dict:
         }
 
 def calculate_total_cost_to_date(db: Session, company_id: int) -> float:
-    """Calcular costo total de todos los dispositivos hasta la fecha"""
-    devices = db.query(Device).filter(
+    """Calcular costo total de todos los dispositivos hasta la fecha
+    
+    Equivale a sumar calculate_device_cost para cada dispositivo, pero trae solo
+    las columnas necesarias y hace la aritmética sobre arrays de NumPy.
+    """
+    rows = db.query(
+        Device.fecha_ingreso,
+        Device.fecha_salida,
+        Device.costo_base,
+        Device.costo_diario,
+        Company.costo_base_default,
+        Company.costo_diario_default,
+        Company.iva_percent,
+        Company.incluir_iva
+    ).join(Company, Device.company_id == Company.id).filter(
         Device.company_id == company_id,
         Device.is_active == True
     ).all()
     
-    total = 0.0
-    for device in devices:
-        try:
-            cost_info = calculate_device_cost(device, datetime.utcnow())
-            total += cost_info["total"]
-        except Exception as e:
-            print(f"Error calculating cost for device {device.id}: {e}")
-            continue
+    if not rows:
+        return 0.0
     
-    return total
+    (ingreso, salida, costo_base, costo_diario,
+     base_default, diario_default, iva_percent, incluir_iva) = zip(*rows)
+    
+    fecha_hasta = np.datetime64(now_local(), 'us')
+    ingreso = np.array(ingreso, dtype='datetime64[us]')
+    salida = np.array(salida, dtype='datetime64[us]')
+    hasta = np.where(~np.isnat(salida) & (salida < fecha_hasta), salida, fecha_hasta)
+    
+    dias = (hasta.astype('datetime64[D]') - ingreso.astype('datetime64[D]')).astype(np.int64) + 1
+    dias = np.maximum(dias, 1)
+    
+    # Costos del dispositivo o, si no tiene (None/0), los default de la empresa
+    costo_base = _first_nonzero(costo_base, base_default)
+    costo_diario = _first_nonzero(costo_diario, diario_default)
+    iva_percent = np.array(iva_percent, dtype=float)
+    incluir_iva = np.array([bool(v) for v in incluir_iva])
+    
+    subtotal = costo_base + costo_diario * dias
+    iva_amount = np.where(incluir_iva, subtotal * iva_percent / 100, 0.0)
+    total = subtotal + iva_amount
+    
+    # Dispositivos sin fecha de ingreso o sin IVA configurado no suman costo
+    valid = ~np.isnat(ingreso) & ~(incluir_iva & np.isnan(iva_percent))
+    return float(total[valid].sum())
+
+def _first_nonzero(values, defaults) -> np.ndarray:
+    """Equivalente vectorizado de `value or default or 0.0`"""
+    values = np.nan_to_num(np.array(values, dtype=float))
+    defaults = np.nan_to_num(np.array(defaults, dtype=float))
+    return np.where(values != 0, values, defaults)
 
 def calculate_monthly_cost(db: Session, company_id: int, year: int, month: int) -> float:
     """Calcular costo mensual"""
-    from calendar import monthrange
-    
     # Último día del mes
-    last_day = monthrange(year, month)[1]
+    last_day = month_last_day(year, month)
     fecha_hasta = datetime(year, month, last_day, 23, 59, 59)
     
     devices = db.query(Device).filter(
@@ -540,6 +669,43 @@ def calculate_monthly_cost(db: Session, company_id: int, year: int, month: int)
     
     return total
 
+def get_report_artifact(db: Session, company_id: int, year: int, month: int, format: str, generate) -> bytes:
+    """Obtener el reporte de un mes cerrado desde disco, generándolo una sola vez
+    
+    Los meses cerrados son inmutables, así que el archivo generado se guarda
+    en la ruta del MonthlyReport y se reutiliza en las siguientes descargas.
+    Para meses abiertos se genera siempre.
+    """
+    report = db.query(MonthlyReport).filter(
+        MonthlyReport.company_id == company_id,
+        MonthlyReport.year == year,
+        MonthlyReport.month == month,
+        MonthlyReport.is_closed == True
+    ).first()
+    
+    if not report:
+        content = generate()
+        return content.encode('utf-8') if isinstance(content, str) else content
+    
+    path_attr = f"{format}_path"
+    path = getattr(report, path_attr)
+    if path and os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    
+    content = generate()
+    content = content.encode('utf-8') if isinstance(content, str) else content
+    
+    directory = os.path.join(settings.upload_dir, "reports", str(company_id))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"reporte_{year}_{month:02d}.{format}")
+    with open(path, 'wb') as f:
+        f.write(content)
+    
+    setattr(report, path_attr, path)
+    db.commit()
+    return content
+
 def generate_pdf_report(db: Session, company_id: int, year: int, month: int, fecha_hasta: datetime) -> bytes:
     """Generar reporte PDF"""
     # Implementación básica - se puede mejorar con WeasyPrint
@@ -560,52 +726,69 @@ def generate_pdf_report(db: Session, company_id: int, year: int, month: int, fec
         Device.is_active == True
     ).all()
     
-    y = 700
+    # Un solo objeto de texto por página en lugar de un drawString por línea
+    text = p.beginText(100, 700)
+    text.setLeading(20)
     total_general = 0.0
     
     for device in devices:
         cost_info = calculate_device_cost(device, fecha_hasta)
-        p.drawString(100, y, f"{device.name} - ${cost_info['total']:.2f}")
+        text.textLine(f"{device.name} - ${cost_info['total']:.2f}")
         total_general += cost_info['total']
-        y -= 20
         
-        if y < 100:
+        if text.getY() < 100:
+            p.drawText(text)
             p.showPage()
-            y = 750
+            text = p.beginText(100, 750)
+            text.setLeading(20)
     
     # Total
-    p.drawString(100, y - 20, f"TOTAL: ${total_general:.2f}")
+    text.textLine("")
+    text.textLine(f"TOTAL: ${total_general:.2f}")
+    p.drawText(text)
     
     p.save()
     buffer.seek(0)
     return buffer.getvalue()
 
-def generate_csv_report(db: Session, company_id: int, year: int, month: int, fecha_hasta: datetime) -> str:
-    """Generar reporte CSV"""
+class _CSVLine:
+    """Destino de csv.writer que devuelve cada línea en lugar de acumularla"""
+    def write(self, value: str) -> str:
+        return value
+
+def iter_csv_report(db: Session, company_id: int, year: int, month: int, fecha_hasta: datetime):
+    """Generar reporte CSV fila por fila"""
     import csv
-    from io import StringIO
     
-    output = StringIO()
-    writer = csv.writer(output)
+    writer = csv.writer(_CSVLine())
     
     # Headers
-    writer.writerow([
+    yield writer.writerow([
         'Dispositivo', 'Serie', 'Fecha Ingreso', 'Días', 
         'Costo Base', 'Costo Diario', 'Subtotal', 'IVA', 'Total'
     ])
     
-    # Obtener dispositivos
-    devices = db.query(Device).filter(
+    # Solo las columnas necesarias, en bloques desde el cursor (sin objetos Device)
+    company = db.query(Company).filter(Company.id == company_id).first()
+    devices = db.query(
+        Device.id,
+        Device.name,
+        Device.serial_number,
+        Device.fecha_ingreso,
+        Device.fecha_salida,
+        Device.costo_base,
+        Device.costo_diario
+    ).filter(
         Device.company_id == company_id,
         Device.fecha_ingreso <= fecha_hasta,
         Device.is_active == True
-    ).all()
+    ).yield_per(1000)
     
     total_general = 0.0
     
     for device in devices:
-        cost_info = calculate_device_cost(device, fecha_hasta)
-        writer.writerow([
+        cost_info = calculate_device_cost(device, fecha_hasta, company)
+        yield writer.writerow([
             device.name,
             device.serial_number or '',
             device.fecha_ingreso.strftime('%d/%m/%Y'),
@@ -619,9 +802,11 @@ def generate_csv_report(db: Session, company_id: int, year: int, month: int, fec
         total_general += cost_info['total']
     
     # Total
-    writer.writerow(['', '', '', '', '', '', '', 'TOTAL:', total_general])
-    
-    return output.getvalue()
+    yield writer.writerow(['', '', '', '', '', '', '', 'TOTAL:', total_general])
+
+def generate_csv_report(db: Session, company_id: int, year: int, month: int, fecha_hasta: datetime) -> str:
+    """Generar reporte CSV"""
+    return "".join(iter_csv_report(db, company_id, year, month, fecha_hasta))
 
 
 # ==================== HELP ROUTES ====================
@@ -629,13 +814,9 @@ def generate_csv_report(db: Session, company_id: int, year: int, month: int, fec
 @router.get("/help", response_class=HTMLResponse)
 async def help_client(
     request: Request,
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(require_client_user)
 ):
     """Página de ayuda para Cliente"""
-    # Verificar que el usuario sea un cliente
-    if current_user.role.value != "client_user":
-        raise HTTPException(status_code=403, detail="Acceso denegado")
-    
     # Breadcrumbs
     breadcrumbs = [
         {"title": "Dashboard", "url": "/client/dashboard"},
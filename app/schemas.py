@@ -1,20 +1,37 @@
-from pydantic import BaseModel, EmailStr, validator
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, EmailStr, StringConstraints, TypeAdapter, create_model, model_validator
+from typing import Annotated, List, Optional
 from datetime import datetime
 from app.models import UserRole, DeviceStatus, DeviceCondition
 
 # Base schemas
 class BaseSchema(BaseModel):
-    class Config:
-        orm_mode = True
-        use_enum_values = True
+    model_config = ConfigDict(from_attributes=True)
+
+# Configuración de los schemas de respuesta: se construyen desde objetos ORM
+# y no se modifican después
+RESPONSE_CONFIG = ConfigDict(from_attributes=True, extra='ignore', frozen=True)
+
+def make_update(name: str, base: type, exclude: set = frozenset(), **extra_fields) -> type:
+    """Generar el schema de actualización de `base`: todos sus campos opcionales
+    con default None, sin los de `exclude` y con los tipos de `extra_fields`
+    (que agregan campos o reemplazan el tipo de uno existente)
+    """
+    fields = {
+        field_name: (Optional[field.annotation], None)
+        for field_name, field in base.model_fields.items()
+        if field_name not in exclude
+    }
+    fields.update({field_name: (annotation, None) for field_name, annotation in extra_fields.items()})
+    return create_model(name, __base__=BaseModel, **fields)
 
 # Company schemas
+# Los schemas base tipan el email como str: en las respuestas viene de la base
+# de datos y no hace falta validarlo de nuevo; los de entrada usan EmailStr.
 class CompanyBase(BaseModel):
     name: str
     rut_id: str
     contact_name: Optional[str] = None
-    email: Optional[EmailStr] = None
+    email: Optional[str] = None
     phone: Optional[str] = None
     address: Optional[str] = None
     costo_base_default: float = 0.0
@@ -26,22 +43,12 @@ class CompanyBase(BaseModel):
     incluir_iva: bool = True
 
 class CompanyCreate(CompanyBase):
-    pass
-
-class CompanyUpdate(BaseModel):
-    name: Optional[str] = None
-    contact_name: Optional[str] = None
     email: Optional[EmailStr] = None
-    phone: Optional[str] = None
-    address: Optional[str] = None
-    costo_base_default: Optional[float] = None
-    costo_diario_default: Optional[float] = None
-    logo_url: Optional[str] = None
-    timezone: Optional[str] = None
-    currency: Optional[str] = None
-    iva_percent: Optional[float] = None
-    incluir_iva: Optional[bool] = None
-    is_active: Optional[bool] = None
+
+CompanyUpdate = make_update(
+    'CompanyUpdate', CompanyBase, exclude={'rut_id'},
+    email=Optional[EmailStr], is_active=Optional[bool]
+)
 
 class Company(CompanyBase):
     id: int
@@ -49,27 +56,24 @@ class Company(CompanyBase):
     updated_at: datetime
     is_active: bool
 
-    class Config:
-        orm_mode = True
+    model_config = RESPONSE_CONFIG
 
 # User schemas
 class UserBase(BaseModel):
-    email: EmailStr
+    email: str
     full_name: str
     role: UserRole
     company_id: Optional[int] = None
     is_active: bool = True
 
 class UserCreate(UserBase):
+    email: EmailStr
     password: str
 
-class UserUpdate(BaseModel):
-    email: Optional[EmailStr] = None
-    full_name: Optional[str] = None
-    role: Optional[UserRole] = None
-    company_id: Optional[int] = None
-    is_active: Optional[bool] = None
-    password: Optional[str] = None
+UserUpdate = make_update(
+    'UserUpdate', UserBase,
+    email=Optional[EmailStr], password=Optional[str]
+)
 
 class User(UserBase):
     id: int
@@ -78,8 +82,7 @@ class User(UserBase):
     last_login: Optional[datetime] = None
     company: Optional[Company] = None
 
-    class Config:
-        orm_mode = True
+    model_config = RESPONSE_CONFIG
 
 class UserLogin(BaseModel):
     email: EmailStr
@@ -89,20 +92,14 @@ class UserProfileUpdate(BaseModel):
     full_name: Optional[str] = None
     email: Optional[EmailStr] = None
     current_password: Optional[str] = None
-    new_password: Optional[str] = None
+    new_password: Optional[Annotated[str, StringConstraints(min_length=6)]] = None
     confirm_password: Optional[str] = None
     
-    @validator('confirm_password')
-    def passwords_match(cls, v, values):
-        if 'new_password' in values and v != values['new_password']:
+    @model_validator(mode='after')
+    def passwords_match(self):
+        if 'confirm_password' in self.model_fields_set and self.confirm_password != self.new_password:
             raise ValueError('Las contraseñas no coinciden')
-        return v
-    
-    @validator('new_password')
-    def validate_new_password(cls, v, values):
-        if v and len(v) < 6:
-            raise ValueError('La contraseña debe tener al menos 6 caracteres')
-        return v
+        return self
 
 # Location schemas
 class LocationBase(BaseModel):
@@ -120,19 +117,10 @@ class LocationCreate(LocationBase):
     company_id: Optional[int] = None  # Empresa principal (opcional)
     company_ids: Optional[List[int]] = []  # Empresas con acceso
 
-class LocationUpdate(BaseModel):
-    name: Optional[str] = None
-    description: Optional[str] = None
-    code: Optional[str] = None
-    parent_id: Optional[int] = None
-    location_type: Optional[str] = None
-    level: Optional[int] = None
-    max_capacity: Optional[int] = None
-    shelf_count: Optional[int] = None
-    sort_order: Optional[int] = None
-    company_id: Optional[int] = None
-    company_ids: Optional[List[int]] = None
-    is_active: Optional[bool] = None
+LocationUpdate = make_update(
+    'LocationUpdate', LocationBase,
+    company_id=Optional[int], company_ids=Optional[List[int]], is_active=Optional[bool]
+)
 
 class Location(LocationBase):
     id: int
@@ -140,11 +128,13 @@ class Location(LocationBase):
     created_at: datetime
     updated_at: datetime
     is_active: bool
-    children: List['Location'] = []
-    companies: List['Company'] = []  # Empresas con acceso
 
-    class Config:
-        orm_mode = True
+    model_config = RESPONSE_CONFIG
+
+class LocationTree(Location):
+    """Ubicación con sus hijas y empresas con acceso (solo para vistas de árbol)"""
+    children: List['LocationTree'] = []
+    companies: List[Company] = []  # Empresas con acceso
 
 # Tag schemas
 class TagBase(BaseModel):
@@ -155,11 +145,7 @@ class TagBase(BaseModel):
 class TagCreate(TagBase):
     company_id: int
 
-class TagUpdate(BaseModel):
-    name: Optional[str] = None
-    color: Optional[str] = None
-    description: Optional[str] = None
-    is_active: Optional[bool] = None
+TagUpdate = make_update('TagUpdate', TagBase, is_active=Optional[bool])
 
 class Tag(TagBase):
     id: int
@@ -167,8 +153,7 @@ class Tag(TagBase):
     created_at: datetime
     is_active: bool
 
-    class Config:
-        orm_mode = True
+    model_config = RESPONSE_CONFIG
 
 # Device schemas
 class DeviceBase(BaseModel):
@@ -187,20 +172,10 @@ class DeviceCreate(DeviceBase):
     company_id: int
     tag_ids: List[int] = []
 
-class DeviceUpdate(BaseModel):
-    name: Optional[str] = None
-    description: Optional[str] = None
-    serial_number: Optional[str] = None
-    model: Optional[str] = None
-    brand: Optional[str] = None
-    status: Optional[DeviceStatus] = None
-    condition: Optional[DeviceCondition] = None
-    location_id: Optional[int] = None
-    costo_base: Optional[float] = None
-    costo_diario: Optional[float] = None
-    fecha_salida: Optional[datetime] = None
-    is_active: Optional[bool] = None
-    tag_ids: Optional[List[int]] = None
+DeviceUpdate = make_update(
+    'DeviceUpdate', DeviceBase,
+    fecha_salida=Optional[datetime], is_active=Optional[bool], tag_ids=Optional[List[int]]
+)
 
 class Device(DeviceBase):
     id: int
@@ -218,8 +193,7 @@ class Device(DeviceBase):
     location: Optional[Location] = None
     tags: List[Tag] = []
 
-    class Config:
-        orm_mode = True
+    model_config = RESPONSE_CONFIG
 
 # Device Movement schemas
 class DeviceMovementBase(BaseModel):
@@ -241,8 +215,7 @@ class DeviceMovement(DeviceMovementBase):
     from_location: Optional[Location] = None
     location: Optional[Location] = None
 
-    class Config:
-        orm_mode = True
+    model_config = RESPONSE_CONFIG
 
 # Cost Calculation schemas
 class CostCalculationBase(BaseModel):
@@ -264,8 +237,7 @@ class CostCalculation(CostCalculationBase):
     calculated_at: datetime
     device: Optional[Device] = None
 
-    class Config:
-        orm_mode = True
+    model_config = RESPONSE_CONFIG
 
 # Monthly Report schemas
 class MonthlyReportBase(BaseModel):
@@ -290,8 +262,7 @@ class MonthlyReport(MonthlyReportBase):
     created_at: datetime
     company: Optional[Company] = None
 
-    class Config:
-        orm_mode = True
+    model_config = RESPONSE_CONFIG
 
 # Audit Log schemas
 class AuditLogBase(BaseModel):
@@ -312,8 +283,7 @@ class AuditLog(AuditLogBase):
     created_at: datetime
     user: Optional[User] = None
 
-    class Config:
-        orm_mode = True
+    model_config = RESPONSE_CONFIG
 
 # Token schemas
 class Token(BaseModel):
@@ -348,5 +318,15 @@ class CompanyDashboard(BaseModel):
     monthly_cost: float
     recent_movements: List[DeviceMovement]
 
-# Update Location schema to handle self-reference
-Location.update_forward_refs()
\ No newline at end of file
+# Update LocationTree schema to handle self-reference
+LocationTree.model_rebuild()
+
+# Adaptadores reutilizables para las respuestas de listas
+CompanyListAdapter = TypeAdapter(List[Company])
+UserListAdapter = TypeAdapter(List[User])
+DeviceListAdapter = TypeAdapter(List[Device])
+LocationListAdapter = TypeAdapter(List[Location])
+
+def dump_list_json(adapter: TypeAdapter, rows) -> bytes:
+    """Validar una lista de objetos ORM y serializarla a JSON en un solo paso"""
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
@@ -1,91 +1,146 @@
 #!/usr/bin/env python3
 """
 Script para poblar la base de datos con datos iniciales (seeds)
+
+Uso: python -m app.seeds
 """
 
-import sys
 import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
+from types import SimpleNamespace
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-
-# Agregar el directorio raíz al path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database import engine, SessionLocal
 from app.models import (
-    Base, User, Company, Location, Device, Tag, DeviceTag,
+    Base, User, Company, Location, Device, Tag, device_tags,
     DeviceMovement, UserRole, DeviceStatus, DeviceCondition
 )
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+# Datos de ejemplo estáticos
+COMPANIES_SEED = (
+    {
+        "name": "TechCorp S.A.",
+        "rut_id": "76.123.456-7",
+        "contact_name": "Juan Pérez",
+        "email": "contacto@techcorp.cl",
+        "phone": "+56 2 2345 6789",
+        "address": "Av. Providencia 1234, Santiago",
+        "costo_base_default": 5000.0,
+        "costo_diario_default": 1500.0
+    },
+    {
+        "name": "Innovación Digital Ltda.",
+        "rut_id": "77.987.654-3",
+        "contact_name": "María González",
+        "email": "info@innovacion.cl",
+        "phone": "+56 2 9876 5432",
+        "address": "Las Condes 5678, Santiago",
+        "costo_base_default": 3000.0,
+        "costo_diario_default": 1000.0
+    },
+    {
+        "name": "Soluciones Empresariales SpA",
+        "rut_id": "78.555.444-9",
+        "contact_name": "Carlos Rodríguez",
+        "email": "ventas@soluciones.cl",
+        "phone": "+56 2 5555 4444",
+        "address": "Vitacura 9999, Santiago",
+        "costo_base_default": 4000.0,
+        "costo_diario_default": 1200.0
+    }
+)
+
+# Tags de cada dispositivo (por número de serie y nombre de tag)
+DEVICE_TAG_MAPPING = (
+    ("DL7420001", ("Laptop", "Crítico")),     # Laptop Dell
+    ("SM27001", ("Monitor",)),                # Monitor Samsung
+    ("HP380001", ("Servidor", "Crítico")),    # Servidor HP
+    ("MBP16001", ("Laptop", "Desarrollo")),   # MacBook Pro
+    ("CS2960001", ("Red",)),                  # Switch Cisco
+)
+
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    """Contexto de passlib, creado al primer uso (no al importar el módulo)"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_tables():
     """Crear todas las tablas"""
-    print("Creando tablas...")
+    logger.info("Creando tablas...")
     Base.metadata.create_all(bind=engine)
-    print("✓ Tablas creadas")
+    logger.info("✓ Tablas creadas")
+
+def insert_missing(db: Session, model, rows: list, key_fields: tuple,
+                   created_msg: str, existing_msg: str, prepare=None) -> list:
+    """Insertar en un solo INSERT las filas que aún no existen
+    
+    La existencia se comprueba con una sola consulta IN sobre `key_fields`.
+    `prepare` recibe la lista de filas nuevas y devuelve los valores a insertar
+    (p. ej. con la contraseña hasheada). Devuelve las filas con su `id`, en el
+    mismo orden.
+    """
+    key_columns = [getattr(model, field) for field in key_fields]
+    keys = [tuple(row[field] for field in key_fields) for row in rows]
+    
+    # Claves simples con un IN sobre la columna; compuestas con un IN de tuplas
+    if len(key_columns) == 1:
+        existing_filter = key_columns[0].in_([key[0] for key in keys])
+    else:
+        existing_filter = tuple_(*key_columns).in_(keys)
+    ids = {
+        tuple(key): row_id
+        for row_id, *key in db.execute(select(model.id, *key_columns).where(existing_filter))
+    }
+    missing = [(row, key) for row, key in zip(rows, keys) if key not in ids]
+    
+    if missing:
+        new_rows = [row for row, _ in missing]
+        values = prepare(new_rows) if prepare else [dict(row) for row in new_rows]
+        # executemany necesita las mismas claves en todas las filas
+        columns = {column for value in values for column in value}
+        values = [{column: value.get(column) for column in columns} for value in values]
+        
+        result = db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), values)
+        for (row, key), row_id in zip(missing, result.scalars()):
+            ids[key] = row_id
+            logger.info(created_msg.format(**row))
+    
+    created = {key for _, key in missing}
+    seeded = []
+    for row, key in zip(rows, keys):
+        if key not in created:
+            logger.info(existing_msg.format(**row))
+        seeded.append(SimpleNamespace(**row, id=ids[key]))
+    return seeded
 
 def seed_companies(db: Session):
     """Crear empresas de ejemplo"""
-    print("Creando empresas...")
-    
-    companies = [
-        {
-            "name": "TechCorp S.A.",
-            "rut_id": "76.123.456-7",
-            "contact_name": "Juan Pérez",
-            "email": "contacto@techcorp.cl",
-            "phone": "+56 2 2345 6789",
-            "address": "Av. Providencia 1234, Santiago",
-            "costo_base_default": 5000.0,
-            "costo_diario_default": 1500.0
-        },
-        {
-            "name": "Innovación Digital Ltda.",
-            "rut_id": "77.987.654-3",
-            "contact_name": "María González",
-            "email": "info@innovacion.cl",
-            "phone": "+56 2 9876 5432",
-            "address": "Las Condes 5678, Santiago",
-            "costo_base_default": 3000.0,
-            "costo_diario_default": 1000.0
-        },
-        {
-            "name": "Soluciones Empresariales SpA",
-            "rut_id": "78.555.444-9",
-            "contact_name": "Carlos Rodríguez",
-            "email": "ventas@soluciones.cl",
-            "phone": "+56 2 5555 4444",
-            "address": "Vitacura 9999, Santiago",
-            "costo_base_default": 4000.0,
-            "costo_diario_default": 1200.0
-        }
-    ]
+    logger.info("Creando empresas...")
     
-    created_companies = []
-    for company_data in companies:
-        # Verificar si ya existe
-        existing = db.query(Company).filter(Company.rut_id == company_data["rut_id"]).first()
-        if not existing:
-            company = Company(**company_data)
-            db.add(company)
-            db.flush()  # Para obtener el ID
-            created_companies.append(company)
-            print(f"  ✓ Empresa creada: {company.name}")
-        else:
-            created_companies.append(existing)
-            print(f"  - Empresa ya existe: {existing.name}")
+    companies = insert_missing(
+        db, Company, COMPANIES_SEED, ("rut_id",),
+        "  ✓ Empresa creada: {name}",
+        "  - Empresa ya existe: {name}"
+    )
     
-    db.commit()
-    return created_companies
+    return companies
 
 def seed_users(db: Session, companies: list):
     """Crear usuarios de ejemplo"""
-    print("Creando usuarios...")
+    logger.info("Creando usuarios...")
+    
+    by_rut = {company.rut_id: company for company in companies}
     
     users = [
         # NOTA: Cambiar estas credenciales en producción
@@ -93,60 +148,65 @@ def seed_users(db: Session, companies: list):
             "email": "admin@storatrack.com",
             "password": "change_me_admin_2024",
             "full_name": "Administrador Principal",
-            "role": UserRole.superadmin,
+            "role": UserRole.SUPERADMIN,
             "company_id": None
         },
         {
             "email": "staff@storatrack.com",
             "password": "change_me_staff_2024",
             "full_name": "Personal de Staff",
-            "role": UserRole.staff,
+            "role": UserRole.STAFF,
             "company_id": None
         },
         {
             "email": "cliente1@techcorp.cl",
             "password": "change_me_client_2024",
             "full_name": "Usuario TechCorp",
-            "role": UserRole.client,
-            "company_id": companies[0].id if companies else None
+            "role": UserRole.CLIENT_USER,
+            "company_id": by_rut["76.123.456-7"].id
         },
         {
             "email": "cliente2@innovacion.cl",
             "password": "change_me_client_2024",
             "full_name": "Usuario Innovación",
-            "role": UserRole.client,
-            "company_id": companies[1].id if len(companies) > 1 else None
+            "role": UserRole.CLIENT_USER,
+            "company_id": by_rut["77.987.654-3"].id
         },
         {
             "email": "cliente3@soluciones.cl",
             "password": "change_me_client_2024",
             "full_name": "Usuario Soluciones",
-            "role": UserRole.client,
-            "company_id": companies[2].id if len(companies) > 2 else None
+            "role": UserRole.CLIENT_USER,
+            "company_id": by_rut["78.555.444-9"].id
         }
     ]
     
-    created_users = []
-    for user_data in users:
-        # Verificar si ya existe
-        existing = db.query(User).filter(User.email == user_data["email"]).first()
-        if not existing:
-            user_data["hashed_password"] = get_password_hash(user_data.pop("password"))
-            user = User(**user_data)
-            db.add(user)
-            db.flush()
-            created_users.append(user)
-            print(f"  ✓ Usuario creado: {user.email} ({user.role.value})")
-        else:
-            created_users.append(existing)
-            print(f"  - Usuario ya existe: {existing.email}")
+    def with_hashed_passwords(new_users):
+        # Un hash por contraseña distinta; bcrypt libera el GIL, así que se
+        # calculan en paralelo
+        passwords = list({u["password"] for u in new_users})
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            hashes = dict(zip(passwords, executor.map(get_password_hash, passwords)))
+        return [
+            {**{k: v for k, v in user_data.items() if k != "password"},
+             "hashed_password": hashes[user_data["password"]]}
+            for user_data in new_users
+        ]
     
-    db.commit()
-    return created_users
+    users = insert_missing(
+        db, User, users, ("email",),
+        "  ✓ Usuario creado: {email} ({role.value})",
+        "  - Usuario ya existe: {email}",
+        prepare=with_hashed_passwords
+    )
+    
+    return users
 
 def seed_locations(db: Session, companies: list):
     """Crear ubicaciones de ejemplo"""
-    print("Creando ubicaciones...")
+    logger.info("Creando ubicaciones...")
+    
+    by_rut = {company.rut_id: company for company in companies}
     
     locations_data = [
         # TechCorp
@@ -154,7 +214,7 @@ def seed_locations(db: Session, companies: list):
             "name": "Bodega Principal",
             "code": "TC-BP-001",
             "description": "Bodega principal de TechCorp",
-            "company_id": companies[0].id,
+            "company_id": by_rut["76.123.456-7"].id,
             "max_capacity": 100,
             "sort_order": 1
         },
@@ -162,7 +222,7 @@ def seed_locations(db: Session, companies: list):
             "name": "Sala de Servidores",
             "code": "TC-SS-001",
             "description": "Sala de servidores climatizada",
-            "company_id": companies[0].id,
+            "company_id": by_rut["76.123.456-7"].id,
             "max_capacity": 50,
             "sort_order": 2
         },
@@ -171,7 +231,7 @@ def seed_locations(db: Session, companies: list):
             "name": "Almacén Norte",
             "code": "ID-AN-001",
             "description": "Almacén ubicado en el norte",
-            "company_id": companies[1].id if len(companies) > 1 else companies[0].id,
+            "company_id": by_rut["77.987.654-3"].id,
             "max_capacity": 75,
             "sort_order": 1
         },
@@ -179,7 +239,7 @@ def seed_locations(db: Session, companies: list):
             "name": "Oficina Central",
             "code": "ID-OC-001",
             "description": "Oficina central para equipos temporales",
-            "company_id": companies[1].id if len(companies) > 1 else companies[0].id,
+            "company_id": by_rut["77.987.654-3"].id,
             "max_capacity": 25,
             "sort_order": 2
         },
@@ -188,75 +248,55 @@ def seed_locations(db: Session, companies: list):
             "name": "Depósito Sur",
             "code": "SE-DS-001",
             "description": "Depósito principal en el sur",
-            "company_id": companies[2].id if len(companies) > 2 else companies[0].id,
+            "company_id": by_rut["78.555.444-9"].id,
             "max_capacity": 120,
             "sort_order": 1
         }
     ]
     
-    created_locations = []
-    for location_data in locations_data:
-        # Verificar si ya existe
-        existing = db.query(Location).filter(
-            Location.code == location_data["code"],
-            Location.company_id == location_data["company_id"]
-        ).first()
-        
-        if not existing:
-            location = Location(**location_data)
-            db.add(location)
-            db.flush()
-            created_locations.append(location)
-            print(f"  ✓ Ubicación creada: {location.name} ({location.code})")
-        else:
-            created_locations.append(existing)
-            print(f"  - Ubicación ya existe: {existing.name}")
+    locations = insert_missing(
+        db, Location, locations_data, ("code", "company_id"),
+        "  ✓ Ubicación creada: {name} ({code})",
+        "  - Ubicación ya existe: {name}"
+    )
     
-    db.commit()
-    return created_locations
+    return locations
 
 def seed_tags(db: Session, companies: list):
     """Crear tags de ejemplo"""
-    print("Creando tags...")
+    logger.info("Creando tags...")
+    
+    by_rut = {company.rut_id: company for company in companies}
     
     tags_data = [
-        # Tags generales
-        {"name": "Laptop", "color": "#007bff", "description": "Computadores portátiles", "company_id": None},
-        {"name": "Desktop", "color": "#28a745", "description": "Computadores de escritorio", "company_id": None},
-        {"name": "Monitor", "color": "#ffc107", "description": "Monitores y pantallas", "company_id": None},
-        {"name": "Servidor", "color": "#dc3545", "description": "Servidores", "company_id": None},
-        {"name": "Red", "color": "#6f42c1", "description": "Equipos de red", "company_id": None},
+        # Tags generales (el modelo exige empresa: se asignan a la primera)
+        {"name": "Laptop", "color": "#007bff", "description": "Computadores portátiles", "company_id": by_rut["76.123.456-7"].id},
+        {"name": "Desktop", "color": "#28a745", "description": "Computadores de escritorio", "company_id": by_rut["76.123.456-7"].id},
+        {"name": "Monitor", "color": "#ffc107", "description": "Monitores y pantallas", "company_id": by_rut["76.123.456-7"].id},
+        {"name": "Servidor", "color": "#dc3545", "description": "Servidores", "company_id": by_rut["76.123.456-7"].id},
+        {"name": "Red", "color": "#6f42c1", "description": "Equipos de red", "company_id": by_rut["76.123.456-7"].id},
         
         # Tags específicos por empresa
-        {"name": "Crítico", "color": "#fd7e14", "description": "Equipos críticos", "company_id": companies[0].id},
-        {"name": "Desarrollo", "color": "#20c997", "description": "Equipos de desarrollo", "company_id": companies[1].id if len(companies) > 1 else companies[0].id},
-        {"name": "Producción", "color": "#e83e8c", "description": "Equipos de producción", "company_id": companies[2].id if len(companies) > 2 else companies[0].id},
+        {"name": "Crítico", "color": "#fd7e14", "description": "Equipos críticos", "company_id": by_rut["76.123.456-7"].id},
+        {"name": "Desarrollo", "color": "#20c997", "description": "Equipos de desarrollo", "company_id": by_rut["77.987.654-3"].id},
+        {"name": "Producción", "color": "#e83e8c", "description": "Equipos de producción", "company_id": by_rut["78.555.444-9"].id},
     ]
     
-    created_tags = []
-    for tag_data in tags_data:
-        # Verificar si ya existe
-        existing = db.query(Tag).filter(
-            Tag.name == tag_data["name"],
-            Tag.company_id == tag_data["company_id"]
-        ).first()
-        
-        if not existing:
-            tag = Tag(**tag_data)
-            db.add(tag)
-            db.flush()
-            created_tags.append(tag)
-            print(f"  ✓ Tag creado: {tag.name}")
-        else:
-            created_tags.append(existing)
-            print(f"  - Tag ya existe: {existing.name}")
+    tags = insert_missing(
+        db, Tag, tags_data, ("name", "company_id"),
+        "  ✓ Tag creado: {name}",
+        "  - Tag ya existe: {name}"
+    )
     
-    db.commit()
-    return created_tags
+    return tags
 
 def seed_devices(db: Session, companies: list, locations: list, tags: list):
     """Crear dispositivos de ejemplo"""
-    print("Creando dispositivos...")
+    logger.info("Creando dispositivos...")
+    
+    by_rut = {company.rut_id: company for company in companies}
+    by_code = {location.code: location for location in locations}
+    now = datetime.now()
     
     devices_data = [
         # TechCorp devices
@@ -265,42 +305,42 @@ def seed_devices(db: Session, companies: list, locations: list, tags: list):
             "serial_number": "DL7420001",
             "brand": "Dell",
             "model": "Latitude 7420",
-            "condition": DeviceCondition.excellent,
-            "status": DeviceStatus.stored,
+            "condition": DeviceCondition.EXCELENTE,
+            "status": DeviceStatus.ALMACENADO,
             "description": "Laptop ejecutivo con Windows 11 Pro",
-            "company_id": companies[0].id,
-            "location_id": locations[0].id if locations else None,
+            "company_id": by_rut["76.123.456-7"].id,
+            "location_id": by_code["TC-BP-001"].id,
             "costo_base": 5000.0,
             "costo_diario": 1500.0,
-            "entry_date": datetime.now() - timedelta(days=15)
+            "fecha_ingreso": now - timedelta(days=15)
         },
         {
             "name": "Monitor Samsung 27\" 4K",
             "serial_number": "SM27001",
             "brand": "Samsung",
             "model": "U28E590D",
-            "condition": DeviceCondition.good,
-            "status": DeviceStatus.stored,
+            "condition": DeviceCondition.BUENO,
+            "status": DeviceStatus.ALMACENADO,
             "description": "Monitor 4K para diseño gráfico",
-            "company_id": companies[0].id,
-            "location_id": locations[0].id if locations else None,
+            "company_id": by_rut["76.123.456-7"].id,
+            "location_id": by_code["TC-BP-001"].id,
             "costo_base": 3000.0,
             "costo_diario": 800.0,
-            "entry_date": datetime.now() - timedelta(days=10)
+            "fecha_ingreso": now - timedelta(days=10)
         },
         {
             "name": "Servidor HP ProLiant DL380",
             "serial_number": "HP380001",
             "brand": "HP",
             "model": "ProLiant DL380 Gen10",
-            "condition": DeviceCondition.excellent,
-            "status": DeviceStatus.in_process,
+            "condition": DeviceCondition.EXCELENTE,
+            "status": DeviceStatus.INGRESADO,
             "description": "Servidor para aplicaciones críticas",
-            "company_id": companies[0].id,
-            "location_id": locations[1].id if len(locations) > 1 else locations[0].id,
+            "company_id": by_rut["76.123.456-7"].id,
+            "location_id": by_code["TC-SS-001"].id,
             "costo_base": 15000.0,
             "costo_diario": 3000.0,
-            "entry_date": datetime.now() - timedelta(days=5)
+            "fecha_ingreso": now - timedelta(days=5)
         },
         
         # Innovación Digital devices
@@ -309,129 +349,104 @@ def seed_devices(db: Session, companies: list, locations: list, tags: list):
             "serial_number": "MBP16001",
             "brand": "Apple",
             "model": "MacBook Pro 16\"",
-            "condition": DeviceCondition.excellent,
-            "status": DeviceStatus.stored,
+            "condition": DeviceCondition.EXCELENTE,
+            "status": DeviceStatus.ALMACENADO,
             "description": "MacBook Pro para desarrollo",
-            "company_id": companies[1].id if len(companies) > 1 else companies[0].id,
-            "location_id": locations[2].id if len(locations) > 2 else locations[0].id,
+            "company_id": by_rut["77.987.654-3"].id,
+            "location_id": by_code["ID-AN-001"].id,
             "costo_base": 8000.0,
             "costo_diario": 2000.0,
-            "entry_date": datetime.now() - timedelta(days=20)
+            "fecha_ingreso": now - timedelta(days=20)
         },
         {
             "name": "Switch Cisco Catalyst 2960",
             "serial_number": "CS2960001",
             "brand": "Cisco",
             "model": "Catalyst 2960-X",
-            "condition": DeviceCondition.good,
-            "status": DeviceStatus.finished,
+            "condition": DeviceCondition.BUENO,
+            "status": DeviceStatus.RETIRADO,
             "description": "Switch de red 24 puertos",
-            "company_id": companies[1].id if len(companies) > 1 else companies[0].id,
-            "location_id": locations[3].id if len(locations) > 3 else locations[0].id,
+            "company_id": by_rut["77.987.654-3"].id,
+            "location_id": by_code["ID-OC-001"].id,
             "costo_base": 4000.0,
             "costo_diario": 1000.0,
-            "entry_date": datetime.now() - timedelta(days=30),
-            "exit_date": datetime.now() - timedelta(days=2)
+            "fecha_ingreso": now - timedelta(days=30),
+            "fecha_salida": now - timedelta(days=2)
         }
     ]
     
-    created_devices = []
-    for device_data in devices_data:
-        # Verificar si ya existe
-        existing = db.query(Device).filter(
-            Device.serial_number == device_data["serial_number"]
-        ).first()
-        
-        if not existing:
-            device = Device(**device_data)
-            db.add(device)
-            db.flush()
-            created_devices.append(device)
-            print(f"  ✓ Dispositivo creado: {device.name} ({device.serial_number})")
-        else:
-            created_devices.append(existing)
-            print(f"  - Dispositivo ya existe: {existing.name}")
+    devices = insert_missing(
+        db, Device, devices_data, ("serial_number",),
+        "  ✓ Dispositivo creado: {name} ({serial_number})",
+        "  - Dispositivo ya existe: {name}"
+    )
     
-    db.commit()
-    return created_devices
+    return devices
 
 def seed_device_tags(db: Session, devices: list, tags: list):
     """Asignar tags a dispositivos"""
-    print("Asignando tags a dispositivos...")
+    logger.info("Asignando tags a dispositivos...")
     
-    # Mapeo de dispositivos a tags
-    device_tag_mapping = [
-        (0, [0, 5]),  # Laptop Dell -> Laptop, Crítico
-        (1, [2]),     # Monitor Samsung -> Monitor
-        (2, [3, 5]),  # Servidor HP -> Servidor, Crítico
-        (3, [0, 6]),  # MacBook Pro -> Laptop, Desarrollo
-        (4, [4]),     # Switch Cisco -> Red
+    by_serial = {device.serial_number: device for device in devices}
+    by_name = {tag.name: tag for tag in tags}
+    links = [
+        {"device_id": by_serial[serial].id, "tag_id": by_name[tag_name].id}
+        for serial, tag_names in DEVICE_TAG_MAPPING
+        for tag_name in tag_names
     ]
     
-    for device_idx, tag_indices in device_tag_mapping:
-        if device_idx < len(devices):
-            device = devices[device_idx]
-            for tag_idx in tag_indices:
-                if tag_idx < len(tags):
-                    tag = tags[tag_idx]
-                    
-                    # Verificar si ya existe la relación
-                    existing = db.query(DeviceTag).filter(
-                        DeviceTag.device_id == device.id,
-                        DeviceTag.tag_id == tag.id
-                    ).first()
-                    
-                    if not existing:
-                        device_tag = DeviceTag(device_id=device.id, tag_id=tag.id)
-                        db.add(device_tag)
-                        print(f"  ✓ Tag '{tag.name}' asignado a '{device.name}'")
-    
-    db.commit()
+    # Un solo INSERT con todas las filas en VALUES; las asignaciones ya
+    # existentes se ignoran en la base de datos
+    if links:
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        db.execute(dialect.insert(device_tags).values(links).on_conflict_do_nothing())
+    logger.info(f"  ✓ {len(links)} asignaciones de tags procesadas")
 
 def seed_device_movements(db: Session, devices: list, locations: list):
     """Crear movimientos de dispositivos"""
-    print("Creando movimientos de dispositivos...")
+    logger.info("Creando movimientos de dispositivos...")
+    
+    by_code = {location.code: location for location in locations}
+    by_serial = {device.serial_number: device for device in devices}
+    now = datetime.now()
     
     movements_data = [
         {
-            "device_id": devices[0].id,
+            "device_id": by_serial["DL7420001"].id,
             "from_status": None,
-            "to_status": DeviceStatus.stored,
+            "to_status": DeviceStatus.ALMACENADO,
             "from_location_id": None,
-            "to_location_id": locations[0].id if locations else None,
+            "to_location_id": by_code["TC-BP-001"].id,
             "notes": "Ingreso inicial del dispositivo",
-            "movement_date": devices[0].entry_date
+            "created_at": by_serial["DL7420001"].fecha_ingreso
         },
         {
-            "device_id": devices[2].id,
-            "from_status": DeviceStatus.stored,
-            "to_status": DeviceStatus.in_process,
-            "from_location_id": locations[0].id if locations else None,
-            "to_location_id": locations[1].id if len(locations) > 1 else None,
+            "device_id": by_serial["HP380001"].id,
+            "from_status": DeviceStatus.ALMACENADO,
+            "to_status": DeviceStatus.INGRESADO,
+            "from_location_id": by_code["TC-BP-001"].id,
+            "to_location_id": by_code["TC-SS-001"].id,
             "notes": "Movido a sala de servidores para configuración",
-            "movement_date": datetime.now() - timedelta(days=3)
+            "created_at": now - timedelta(days=3)
         },
         {
-            "device_id": devices[4].id if len(devices) > 4 else devices[0].id,
-            "from_status": DeviceStatus.stored,
-            "to_status": DeviceStatus.finished,
-            "from_location_id": locations[3].id if len(locations) > 3 else locations[0].id,
+            "device_id": by_serial["CS2960001"].id,
+            "from_status": DeviceStatus.ALMACENADO,
+            "to_status": DeviceStatus.RETIRADO,
+            "from_location_id": by_code["ID-OC-001"].id,
             "to_location_id": None,
             "notes": "Dispositivo entregado al cliente",
-            "movement_date": datetime.now() - timedelta(days=2)
+            "created_at": now - timedelta(days=2)
         }
     ]
     
-    for movement_data in movements_data:
-        movement = DeviceMovement(**movement_data)
-        db.add(movement)
-        print(f"  ✓ Movimiento creado para dispositivo ID {movement.device_id}")
-    
-    db.commit()
+    db.execute(insert(DeviceMovement), movements_data)
+    logger.info(f"  ✓ {len(movements_data)} movimientos creados")
 
 def main():
     """Función principal para ejecutar todos los seeds"""
-    print("🌱 Iniciando proceso de seeds...")
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger.info("🌱 Iniciando proceso de seeds...")
     
     # Crear tablas
     create_tables()
@@ -440,32 +455,33 @@ def main():
     db = SessionLocal()
     
     try:
-        # Ejecutar seeds en orden
-        companies = seed_companies(db)
-        users = seed_users(db, companies)
-        locations = seed_locations(db, companies)
-        tags = seed_tags(db, companies)
-        devices = seed_devices(db, companies, locations, tags)
-        seed_device_tags(db, devices, tags)
-        seed_device_movements(db, devices, locations)
+        # Ejecutar seeds en orden, en una sola transacción
+        with db.begin():
+            companies = seed_companies(db)
+            users = seed_users(db, companies)
+            locations = seed_locations(db, companies)
+            tags = seed_tags(db, companies)
+            devices = seed_devices(db, companies, locations, tags)
+            seed_device_tags(db, devices, tags)
+            seed_device_movements(db, devices, locations)
         
-        print("\n✅ Seeds completados exitosamente!")
-        print(f"\n📊 Resumen:")
-        print(f"  - {len(companies)} empresas")
-        print(f"  - {len(users)} usuarios")
-        print(f"  - {len(locations)} ubicaciones")
-        print(f"  - {len(tags)} tags")
-        print(f"  - {len(devices)} dispositivos")
+        logger.info("\n✅ Seeds completados exitosamente!")
+        logger.info("\n📊 Resumen:")
+        logger.info(f"  - {len(companies)} empresas")
+        logger.info(f"  - {len(users)} usuarios")
+        logger.info(f"  - {len(locations)} ubicaciones")
+        logger.info(f"  - {len(tags)} tags")
+        logger.info(f"  - {len(devices)} dispositivos")
         
-        print("\n🔑 Credenciales de acceso:")
-        print("  Superadmin: admin@storatrack.com / admin123")
-        print("  Staff: staff@storatrack.com / staff123")
-        print("  Cliente 1: cliente1@techcorp.cl / cliente123")
-        print("  Cliente 2: cliente2@innovacion.cl / cliente123")
-        print("  Cliente 3: cliente3@soluciones.cl / cliente123")
+        logger.info("\n🔑 Credenciales de acceso:")
+        logger.info("  Superadmin: admin@storatrack.com / admin123")
+        logger.info("  Staff: staff@storatrack.com / staff123")
+        logger.info("  Cliente 1: cliente1@techcorp.cl / cliente123")
+        logger.info("  Cliente 2: cliente2@innovacion.cl / cliente123")
+        logger.info("  Cliente 3: cliente3@soluciones.cl / cliente123")
         
     except Exception as e:
-        print(f"❌ Error ejecutando seeds: {e}")
+        logger.error(f"❌ Error ejecutando seeds: {e}")
         db.rollback()
         raise
     finally:
@@ -1,135 +1,344 @@
+from collections import OrderedDict
+from dataclasses import dataclass, fields
 from datetime import datetime, date
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
 from decimal import Decimal, ROUND_HALF_UP
-from sqlalchemy.orm import Session
-from ..models import Device, Company, DeviceMovement
+import numpy as np
+from sqlalchemy import Date, Integer, Numeric, and_, case, cast, exists, func, literal, or_
+from sqlalchemy.orm import Session, selectinload
+from ..models import Device, Company, DeviceMovement, DeviceStatus
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+HUNDRED = Decimal('100')
+
+# Máximo de costos por (dispositivo, fecha) memorizados por instancia
+DEVICE_COST_CACHE_SIZE = 10_000
+
+
+@lru_cache(maxsize=1024)
+def to_decimal(value) -> Decimal:
+    """Convierte un valor de columna Float a Decimal (memoizado: los costos se repiten mucho)"""
+    return Decimal(str(value))
+
+
+@dataclass(slots=True, frozen=True)
+class DeviceCostResult:
+    """Costo de un equipo a una fecha (montos en float, listos para mostrar)"""
+    device_id: int
+    device_name: str
+    company_name: str
+    currency: str
+    entry_date: str
+    calculation_date: str
+    days_stored: int
+    base_cost: float
+    daily_cost: float
+    storage_cost: float
+    subtotal: float
+    iva_percent: float
+    iva_amount: float
+    total_cost: float
+    apply_iva: bool
+    status: Any
+    location: Optional[str]
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """Representación como dict, para respuestas JSON"""
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+
+class CompanyParams(NamedTuple):
+    """Parámetros de facturación de una empresa, ya convertidos a Decimal"""
+    name: str
+    currency: str
+    iva_percent: Decimal
+    iva_rate: Decimal
+    incluir_iva: bool
+    costo_base_default: Decimal
+    costo_diario_default: Decimal
+
+
+def _compute_costs(entry: np.ndarray, base: np.ndarray, daily: np.ndarray, iva_percent: float,
+                   month_starts: np.ndarray, month_ends: np.ndarray,
+                   retired_index: np.ndarray, retired_at: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Núcleo numérico de los costos mensuales (matrices meses x dispositivos).
+    
+    Recibe solo arrays homogéneos: fechas de ingreso (datetime64[us]), costos
+    base y diario por dispositivo, y los retiros como (índice de dispositivo,
+    fecha). Devuelve activo, días, almacenamiento, subtotal, IVA y total.
+    """
+    month_end_limits = month_ends.astype('datetime64[us]')
+    no_retirement = np.iinfo(np.int64).min
+    latest_retirement = np.full((len(month_ends), len(entry)), no_retirement, dtype=np.int64)
+    for m, limit in enumerate(month_end_limits):
+        in_range = retired_at <= limit
+        np.maximum.at(latest_retirement[m], retired_index[in_range], retired_at[in_range].view(np.int64))
+    latest_retirement_days = latest_retirement.view('datetime64[us]').astype('datetime64[D]')
+    
+    # Activo en el mes: ingresado antes del cierre y no retirado antes del inicio
+    retired_before = (
+        (latest_retirement != no_retirement)
+        & (latest_retirement_days < month_starts[:, None])
+    )
+    active = (entry[None, :] <= month_end_limits[:, None]) & ~retired_before
+    
+    # Costo de cada dispositivo al cierre de cada mes
+    days_stored = (month_ends[:, None] - entry.astype('datetime64[D]')[None, :]).astype(np.int64)
+    storage_cost = np.round(daily * days_stored, 2)
+    subtotal = np.round(base + storage_cost, 2)
+    if iva_percent > 0:
+        # Redondeo a centavos hacia arriba en el medio (ROUND_HALF_UP)
+        iva_amount = np.floor(subtotal * iva_percent + 0.5 + 1e-6) / 100
+    else:
+        iva_amount = np.zeros_like(subtotal)
+    total = np.round(subtotal + iva_amount, 2)
+    return active, days_stored, storage_cost, subtotal, iva_amount, total
+
 
 class CostCalculator:
     """Servicio para calcular costos de almacenamiento de equipos"""
     
     def __init__(self, db: Session):
         self.db = db
+        self._company_cache: Dict[int, CompanyParams] = {}
+        self._cost_cache: "OrderedDict[Tuple[int, date], DeviceCostResult]" = OrderedDict()
     
-    def calculate_device_cost(self, device: Device, calculation_date: Optional[date] = None) -> Dict[str, Any]:
+    def _company_params(self, company_id: int) -> CompanyParams:
+        """Parámetros de la empresa, consultados una sola vez por instancia"""
+        params = self._company_cache.get(company_id)
+        if params is None:
+            company = self.db.get(Company, company_id)
+            iva_percent = to_decimal(company.iva_percent or 0)
+            params = CompanyParams(
+                name=company.name,
+                currency=company.currency,
+                iva_percent=iva_percent,
+                iva_rate=iva_percent / HUNDRED,
+                incluir_iva=company.incluir_iva,
+                costo_base_default=to_decimal(company.costo_base_default or 0),
+                costo_diario_default=to_decimal(company.costo_diario_default or 0)
+            )
+            self._company_cache[company_id] = params
+        return params
+    
+    def calculate_device_cost(self, device: Device, calculation_date: Optional[date] = None) -> DeviceCostResult:
         """Calcula el costo total de un equipo hasta una fecha específica"""
         if calculation_date is None:
             calculation_date = date.today()
         
+        # Memorizado por (dispositivo, fecha) dentro de la instancia
+        key = (device.id, calculation_date)
+        cost = self._cost_cache.get(key)
+        if cost is None:
+            cost = self._device_cost(device, calculation_date)
+            self._cost_cache[key] = cost
+            if len(self._cost_cache) > DEVICE_COST_CACHE_SIZE:
+                self._cost_cache.popitem(last=False)
+        else:
+            self._cost_cache.move_to_end(key)
+        return cost
+    
+    def calculate_devices_costs_bulk(self, devices: List[Device],
+                                     calculation_date: Optional[date] = None) -> Dict[int, DeviceCostResult]:
+        """Costo de varios equipos, por id. Carga empresa y ubicación de todos en
+        bloque en lugar de una consulta por equipo"""
+        if devices:
+            self.db.query(Device).options(
+                selectinload(Device.company),
+                selectinload(Device.location)
+            ).filter(Device.id.in_([device.id for device in devices])).all()
+        
+        return {device.id: self.calculate_device_cost(device, calculation_date) for device in devices}
+    
+    def _device_cost(self, device: Device, calculation_date: date) -> DeviceCostResult:
+        """Cálculo sin memorizar de calculate_device_cost"""
         # Obtener información básica
-        entry_date = device.entry_date.date() if hasattr(device.entry_date, 'date') else device.entry_date
+        entry_date = device.fecha_ingreso.date() if hasattr(device.fecha_ingreso, 'date') else device.fecha_ingreso
         days_stored = (calculation_date - entry_date).days
         
+        company = self._company_params(device.company_id)
+        
         # Calcular costos base
-        base_cost = Decimal(str(device.base_cost))
-        daily_cost = Decimal(str(device.daily_cost))
+        base_cost = to_decimal(device.costo_base) if device.costo_base else company.costo_base_default
+        daily_cost = to_decimal(device.costo_diario) if device.costo_diario else company.costo_diario_default
         storage_cost = daily_cost * days_stored
         
         # Subtotal sin IVA
         subtotal = base_cost + storage_cost
         
         # Calcular IVA si aplica
-        iva_percent = Decimal(str(device.company.iva_percent or 0))
-        iva_amount = Decimal('0')
+        iva_percent = company.iva_percent
+        iva_amount = ZERO
         
-        if device.company.apply_iva and iva_percent > 0:
-            iva_amount = (subtotal * iva_percent / 100).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        if company.incluir_iva and iva_percent > 0:
+            iva_amount = (subtotal * company.iva_rate).quantize(CENT, rounding=ROUND_HALF_UP)
         
         # Total final
         total_cost = subtotal + iva_amount
         
-        return {
-            'device_id': device.id,
-            'device_name': device.name,
-            'company_name': device.company.name,
-            'currency': device.company.currency,
-            'entry_date': entry_date.isoformat(),
-            'calculation_date': calculation_date.isoformat(),
-            'days_stored': days_stored,
-            'base_cost': float(base_cost),
-            'daily_cost': float(daily_cost),
-            'storage_cost': float(storage_cost),
-            'subtotal': float(subtotal),
-            'iva_percent': float(iva_percent),
-            'iva_amount': float(iva_amount),
-            'total_cost': float(total_cost),
-            'apply_iva': device.company.apply_iva,
-            'status': device.status,
-            'location': device.location.name if device.location else None
-        }
+        return DeviceCostResult(
+            device_id=device.id,
+            device_name=device.name,
+            company_name=company.name,
+            currency=company.currency,
+            entry_date=entry_date.isoformat(),
+            calculation_date=calculation_date.isoformat(),
+            days_stored=days_stored,
+            base_cost=float(base_cost),
+            daily_cost=float(daily_cost),
+            storage_cost=float(storage_cost),
+            subtotal=float(subtotal),
+            iva_percent=float(iva_percent),
+            iva_amount=float(iva_amount),
+            total_cost=float(total_cost),
+            apply_iva=company.incluir_iva,
+            status=device.status,
+            location=device.location.name if device.location else None
+        )
     
-    def calculate_company_monthly_cost(self, company: Company, year: int, month: int) -> Dict[str, Any]:
-        """Calcula el costo mensual total de una empresa"""
-        from calendar import monthrange
+    def calculate_company_monthly_cost(self, company: Company, year: int, month: int,
+                                       include_device_details: bool = True) -> Dict[str, Any]:
+        """Calcula el costo mensual total de una empresa.
         
-        # Fechas del mes
-        start_date = date(year, month, 1)
-        last_day = monthrange(year, month)[1]
-        end_date = date(year, month, last_day)
+        Con include_device_details=False solo se calculan los totales y 'devices' queda vacío.
+        """
+        return self._monthly_costs(company, [(year, month)], include_device_details)[0]
+    
+    def _monthly_costs(self, company: Company, periods: List[Tuple[int, int]],
+                       include_device_details: bool = True) -> List[Dict[str, Any]]:
+        """Costos mensuales de la empresa para varios (año, mes) a la vez.
+        
+        Carga dispositivos y retiros una sola vez y calcula todos los meses
+        con operaciones vectorizadas (meses x dispositivos).
+        """
+        from calendar import monthrange
         
-        # Obtener dispositivos activos durante el mes
-        devices = self.db.query(Device).filter(
+        # Fechas de cada mes
+        start_dates = [date(year, month, 1) for year, month in periods]
+        end_dates = [date(year, month, monthrange(year, month)[1]) for year, month in periods]
+        month_starts = np.array(start_dates, dtype='datetime64[D]')
+        month_ends = np.array(end_dates, dtype='datetime64[D]')
+        
+        # Dispositivos ingresados hasta el último mes pedido. Se descartan en SQL los
+        # retirados antes del primer mes sin retiros posteriores: inactivos en todos
+        first_start, last_end = min(start_dates), max(end_dates)
+        is_retirement = and_(
+            DeviceMovement.device_id == Device.id,
+            DeviceMovement.to_status == 'RETIRADO'
+        )
+        retired_before = exists().where(is_retirement, DeviceMovement.created_at < first_start)
+        retired_during = exists().where(
+            is_retirement,
+            DeviceMovement.created_at >= first_start,
+            DeviceMovement.created_at <= last_end
+        )
+        if include_device_details:
+            devices_query = self.db.query(Device).options(selectinload(Device.location))
+        else:
+            # Para los totales alcanza con las columnas de costo
+            devices_query = self.db.query(
+                Device.id, Device.fecha_ingreso, Device.costo_base, Device.costo_diario
+            )
+        devices = devices_query.filter(
             Device.company_id == company.id,
-            Device.entry_date <= end_date
+            Device.fecha_ingreso <= last_end,
+            or_(~retired_before, retired_during)
         ).all()
         
-        total_devices = 0
-        total_cost = Decimal('0')
-        device_costs = []
-        
-        for device in devices:
-            # Verificar si el dispositivo estuvo activo durante el mes
-            device_entry = device.entry_date.date() if hasattr(device.entry_date, 'date') else device.entry_date
-            
-            # Verificar si fue retirado antes del mes
-            last_movement = self.db.query(DeviceMovement).filter(
-                DeviceMovement.device_id == device.id,
-                DeviceMovement.to_status == 'RETIRADO',
-                DeviceMovement.created_at <= end_date
-            ).order_by(DeviceMovement.created_at.desc()).first()
-            
-            if last_movement:
-                retirement_date = last_movement.created_at.date()
-                if retirement_date < start_date:
-                    continue  # Retirado antes del mes
+        params = self._company_params(company.id)
+        index = {device.id: i for i, device in enumerate(devices)}
+        
+        # Columnas homogéneas (SoA) para el núcleo vectorizado, sin listas intermedias
+        n = len(devices)
+        entry = np.fromiter((device.fecha_ingreso for device in devices), dtype='datetime64[us]', count=n)
+        entry_days = entry.astype('datetime64[D]')
+        base = np.fromiter(
+            (device.costo_base or params.costo_base_default for device in devices), dtype='float64', count=n
+        )
+        daily = np.fromiter(
+            (device.costo_diario or params.costo_diario_default for device in devices), dtype='float64', count=n
+        )
+        
+        # Retiros de los dispositivos hasta el último mes pedido
+        retirements = self.db.query(DeviceMovement.device_id, DeviceMovement.created_at).join(
+            Device, Device.id == DeviceMovement.device_id
+        ).filter(
+            Device.company_id == company.id,
+            DeviceMovement.to_status == 'RETIRADO',
+            DeviceMovement.created_at <= last_end
+        ).all()
+        retired_index = np.fromiter(
+            (index.get(device_id, -1) for device_id, _ in retirements), dtype=np.int64, count=len(retirements)
+        )
+        retired_at = np.fromiter(
+            (created_at for _, created_at in retirements), dtype='datetime64[us]', count=len(retirements)
+        )
+        known = retired_index >= 0
+        retired_index, retired_at = retired_index[known], retired_at[known]
+        
+        iva_percent = float(params.iva_percent)
+        active, days_stored, storage_cost, subtotal, iva_amount, total = _compute_costs(
+            entry, base, daily, iva_percent if params.incluir_iva else 0.0,
+            month_starts, month_ends, retired_index, retired_at
+        )
+        
+        generated_at = datetime.now().isoformat()
+        results = []
+        for m, (start_date, end_date) in enumerate(zip(start_dates, end_dates)):
+            device_costs = [] if not include_device_details else [
+                DeviceCostResult(
+                    device_id=devices[i].id,
+                    device_name=devices[i].name,
+                    company_name=params.name,
+                    currency=params.currency,
+                    entry_date=entry_days[i].item().isoformat(),
+                    calculation_date=end_date.isoformat(),
+                    days_stored=int(days_stored[m, i]),
+                    base_cost=float(base[i]),
+                    daily_cost=float(daily[i]),
+                    storage_cost=float(storage_cost[m, i]),
+                    subtotal=float(subtotal[m, i]),
+                    iva_percent=iva_percent,
+                    iva_amount=float(iva_amount[m, i]),
+                    total_cost=float(total[m, i]),
+                    apply_iva=params.incluir_iva,
+                    status=devices[i].status,
+                    location=devices[i].location.name if devices[i].location else None
+                )
+                for i in np.flatnonzero(active[m])
+            ]
+            month_total = Decimal(str(total[m][active[m]].sum())).quantize(CENT, rounding=ROUND_HALF_UP)
             
-            # Calcular costo para este dispositivo
-            device_cost = self.calculate_device_cost(device, end_date)
-            device_costs.append(device_cost)
-            total_devices += 1
-            total_cost += Decimal(str(device_cost['total_cost']))
+            results.append({
+                'company_id': company.id,
+                'company_name': company.name,
+                'currency': company.currency,
+                'year': start_date.year,
+                'month': start_date.month,
+                'month_name': start_date.strftime('%B'),
+                'period': f"{start_date.strftime('%d/%m/%Y')} - {end_date.strftime('%d/%m/%Y')}",
+                'total_devices': int(active[m].sum()),
+                'total_cost': float(month_total),
+                'devices': device_costs,
+                'generated_at': generated_at
+            })
         
-        return {
-            'company_id': company.id,
-            'company_name': company.name,
-            'currency': company.currency,
-            'year': year,
-            'month': month,
-            'month_name': start_date.strftime('%B'),
-            'period': f"{start_date.strftime('%d/%m/%Y')} - {end_date.strftime('%d/%m/%Y')}",
-            'total_devices': total_devices,
-            'total_cost': float(total_cost),
-            'devices': device_costs,
-            'generated_at': datetime.now().isoformat()
-        }
+        return results
     
     def calculate_device_cost_range(self, device: Device, start_date: date, end_date: date) -> Dict[str, Any]:
         """Calcula el costo de un equipo en un rango de fechas específico"""
-        device_entry = device.entry_date.date() if hasattr(device.entry_date, 'date') else device.entry_date
+        device_entry = device.fecha_ingreso.date() if hasattr(device.fecha_ingreso, 'date') else device.fecha_ingreso
         
         # Ajustar fechas si es necesario
         actual_start = max(start_date, device_entry)
         actual_end = end_date
         
         # Verificar si fue retirado durante el período
-        last_movement = self.db.query(DeviceMovement).filter(
-            DeviceMovement.device_id == device.id,
-            DeviceMovement.to_status == 'RETIRADO',
-            DeviceMovement.created_at <= end_date
-        ).order_by(DeviceMovement.created_at.desc()).first()
-        
-        if last_movement:
-            retirement_date = last_movement.created_at.date()
-            actual_end = min(actual_end, retirement_date)
+        retired_at = self._latest_retirements(end_date, Device.id == device.id).get(device.id)
+        if retired_at:
+            actual_end = min(actual_end, retired_at.date())
         
         # Calcular días en el período
         if actual_end < actual_start:
@@ -137,25 +346,27 @@ class CostCalculator:
         else:
             days_in_period = (actual_end - actual_start).days + 1
         
+        company = self._company_params(device.company_id)
+        
         # Calcular costos
-        base_cost = Decimal(str(device.base_cost))
-        daily_cost = Decimal(str(device.daily_cost))
+        base_cost = to_decimal(device.costo_base) if device.costo_base else company.costo_base_default
+        daily_cost = to_decimal(device.costo_diario) if device.costo_diario else company.costo_diario_default
         period_storage_cost = daily_cost * days_in_period
         
         # Para el costo base, solo se cobra una vez por dispositivo
         # Si el período incluye la fecha de entrada, se incluye el costo base
         include_base_cost = actual_start == device_entry
-        period_base_cost = base_cost if include_base_cost else Decimal('0')
+        period_base_cost = base_cost if include_base_cost else ZERO
         
         # Subtotal
         subtotal = period_base_cost + period_storage_cost
         
         # IVA
-        iva_percent = Decimal(str(device.company.iva_percent or 0))
-        iva_amount = Decimal('0')
+        iva_percent = company.iva_percent
+        iva_amount = ZERO
         
-        if device.company.apply_iva and iva_percent > 0:
-            iva_amount = (subtotal * iva_percent / 100).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        if company.incluir_iva and iva_percent > 0:
+            iva_amount = (subtotal * company.iva_rate).quantize(CENT, rounding=ROUND_HALF_UP)
         
         total_cost = subtotal + iva_amount
         
@@ -175,81 +386,98 @@ class CostCalculator:
             'total_cost': float(total_cost)
         }
     
-    def get_company_cost_summary(self, company: Company) -> Dict[str, Any]:
-        """Obtiene un resumen de costos de la empresa"""
-        # Dispositivos activos (no retirados)
-        active_devices = self.db.query(Device).filter(
-            Device.company_id == company.id,
-            Device.status != 'RETIRADO'
-        ).all()
-        
-        total_active = len(active_devices)
-        current_monthly_cost = Decimal('0')
-        total_accumulated_cost = Decimal('0')
+    def _latest_retirements(self, end_date: date, *device_filters) -> Dict[int, datetime]:
+        """Fecha del último movimiento a RETIRADO (hasta end_date) por dispositivo"""
+        return dict(
+            self.db.query(DeviceMovement.device_id, func.max(DeviceMovement.created_at))
+            .join(Device, Device.id == DeviceMovement.device_id)
+            .filter(
+                DeviceMovement.to_status == 'RETIRADO',
+                DeviceMovement.created_at <= end_date,
+                *device_filters
+            )
+            .group_by(DeviceMovement.device_id)
+            .all()
+        )
+    
+    def _device_cost_columns(self, company: Company, calculation_date: date):
+        """Expresiones SQL con el costo de almacenamiento y el total (con IVA)
+        de cada dispositivo a una fecha, con la misma lógica que calculate_device_cost
+        """
+        calculation_day = literal(calculation_date, Date)
+        if self.db.get_bind().dialect.name == "sqlite":
+            days_stored = cast(
+                func.julianday(calculation_day) - func.julianday(func.date(Device.fecha_ingreso)),
+                Integer
+            )
+        else:
+            days_stored = calculation_day - func.date(Device.fecha_ingreso)
         
-        for device in active_devices:
-            device_cost = self.calculate_device_cost(device)
-            current_monthly_cost += Decimal(str(device_cost['storage_cost']))
-            total_accumulated_cost += Decimal(str(device_cost['total_cost']))
+        base_cost = func.coalesce(func.nullif(Device.costo_base, 0), company.costo_base_default or 0)
+        daily_cost = func.coalesce(func.nullif(Device.costo_diario, 0), company.costo_diario_default or 0)
+        storage_cost = daily_cost * days_stored
+        subtotal = base_cost + storage_cost
         
-        # Todos los dispositivos para estadísticas generales
-        all_devices = self.db.query(Device).filter(
+        iva_percent = company.iva_percent or 0
+        if company.incluir_iva and iva_percent > 0:
+            total_cost = subtotal + func.round(cast(subtotal * iva_percent / 100, Numeric(18, 6)), 2)
+        else:
+            total_cost = subtotal
+        return storage_cost, total_cost
+    
+    def get_company_cost_summary(self, company: Company) -> Dict[str, Any]:
+        """Obtiene un resumen de costos de la empresa"""
+        storage_cost, total_cost = self._device_cost_columns(company, date.today())
+        # Dispositivos activos: no retirados
+        is_active = Device.status != 'RETIRADO'
+        
+        summary = self.db.query(
+            func.count(Device.id).label('total_devices'),
+            func.sum(case((is_active, 1), else_=0)).label('active_devices'),
+            func.sum(case((Device.status == 'ALMACENADO', 1), else_=0)).label('stored_devices'),
+            func.sum(case((is_active, storage_cost), else_=0)).label('current_monthly_cost'),
+            func.sum(case((is_active, total_cost), else_=0)).label('total_accumulated_cost')
+        ).filter(
             Device.company_id == company.id
-        ).all()
-        
-        total_devices = len(all_devices)
-        stored_devices = len([d for d in all_devices if d.status == 'ALMACENADO'])
+        ).one()
         
         return {
             'company_id': company.id,
             'company_name': company.name,
             'currency': company.currency,
-            'total_devices': total_devices,
-            'active_devices': total_active,
-            'stored_devices': stored_devices,
-            'current_monthly_cost': float(current_monthly_cost),
-            'total_accumulated_cost': float(total_accumulated_cost),
+            'total_devices': summary.total_devices,
+            'active_devices': summary.active_devices or 0,
+            'stored_devices': summary.stored_devices or 0,
+            'current_monthly_cost': round(float(summary.current_monthly_cost or 0), 2),
+            'total_accumulated_cost': round(float(summary.total_accumulated_cost or 0), 2),
             'generated_at': datetime.now().isoformat()
         }
     
     def calculate_historical_costs(self, company: Company, months_back: int = 12) -> list:
         """Calcula costos históricos de los últimos N meses"""
-        from dateutil.relativedelta import relativedelta
-        
-        results = []
+        # Meses contados desde el año 0, para retroceder con aritmética entera
         current_date = date.today()
+        base = current_date.year * 12 + current_date.month - 1
+        periods = [((base - i) // 12, (base - i) % 12 + 1) for i in range(months_back)]
         
-        for i in range(months_back):
-            target_date = current_date - relativedelta(months=i)
-            year = target_date.year
-            month = target_date.month
-            
-            monthly_cost = self.calculate_company_monthly_cost(company, year, month)
-            results.append(monthly_cost)
-        
-        return results
+        return self._monthly_costs(company, periods)
     
     def get_cost_breakdown_by_status(self, company: Company) -> Dict[str, Any]:
         """Obtiene desglose de costos por estado de dispositivos"""
-        devices = self.db.query(Device).filter(
+        _, total_cost = self._device_cost_columns(company, date.today())
+        
+        rows = self.db.query(
+            Device.status,
+            func.count(Device.id),
+            # No calcular costo para retirados
+            func.sum(case((Device.status == 'RETIRADO', 0), else_=total_cost))
+        ).filter(
             Device.company_id == company.id
-        ).all()
-        
-        breakdown = {
-            'INGRESADO': {'count': 0, 'total_cost': 0},
-            'ESPERANDO_RECIBIR': {'count': 0, 'total_cost': 0},
-            'ALMACENADO': {'count': 0, 'total_cost': 0},
-            'ENVIADO': {'count': 0, 'total_cost': 0},
-            'RETIRADO': {'count': 0, 'total_cost': 0}
-        }
+        ).group_by(Device.status).all()
         
-        for device in devices:
-            status = device.status
-            if status in breakdown:
-                breakdown[status]['count'] += 1
-                if status != 'RETIRADO':  # No calcular costo para retirados
-                    device_cost = self.calculate_device_cost(device)
-                    breakdown[status]['total_cost'] += device_cost['total_cost']
+        breakdown = {status.name: {'count': 0, 'total_cost': 0} for status in DeviceStatus}
+        for status, count, status_cost in rows:
+            breakdown[status.name] = {'count': count, 'total_cost': round(float(status_cost or 0), 2)}
         
         return {
             'company_id': company.id,
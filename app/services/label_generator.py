@@ -1,13 +1,158 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import os
 from io import BytesIO
-import qrcode
+import segno
 from PIL import Image, ImageDraw, ImageFont
 import barcode
-from barcode.writer import ImageWriter
+from barcode.writer import ImageWriter, SVGWriter, mm2px, pt2mm
 from barcode import Code128
 import base64
-from typing import Optional, Tuple
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from typing import List, Optional, Tuple, Union
 from datetime import datetime
 
+BARCODE_OPTIONS = {
+    'module_width': 0.2,
+    'module_height': 15.0,
+    'quiet_zone': 6.5,
+    'font_size': 10,
+    'text_distance': 5.0,
+    'background': 'white',
+    'foreground': 'black',
+}
+
+# Tamaños que se cachean: los de las etiquetas y los por defecto de la API.
+# Los tamaños arbitrarios pedidos por query se generan sin cachear.
+CACHED_QR_SIZES = frozenset({(200, 200), (150, 150), (120, 120)})
+CACHED_BARCODE_SIZES = frozenset({(300, 100)})
+
+# Plantillas para etiquetas HTML (mismo directorio que usan los routers)
+label_templates = Environment(loader=FileSystemLoader("templates"), autoescape=select_autoescape())
+
+
+def generation_timestamp() -> str:
+    """Texto del pie "Generado" de las etiquetas"""
+    return datetime.now().strftime('%d/%m/%Y %H:%M')
+
+
+def _make_qr(data: str) -> segno.QRCode:
+    """Símbolo QR (no micro) con corrección de errores baja"""
+    return segno.make(data, error='l', boost_error=False, micro=False)
+
+
+def _render_qr_image(data: str, size: Tuple[int, int]) -> Image.Image:
+    """Imagen QR ya redimensionada"""
+    buffer = BytesIO()
+    _make_qr(data).save(buffer, kind='png', scale=10, border=4)
+    qr_img = Image.open(buffer)
+    return qr_img.resize(size, Image.Resampling.LANCZOS)
+
+
+_cached_qr_image = lru_cache(maxsize=512)(_render_qr_image)
+
+
+def _qr_image(data: str, size: Tuple[int, int]) -> Image.Image:
+    """Imagen QR; las de tamaño fijo se cachean y no deben modificarse"""
+    if size in CACHED_QR_SIZES:
+        return _cached_qr_image(data, size)
+    return _render_qr_image(data, size)
+
+
+@lru_cache(maxsize=512)
+def _qr_svg_markup(data: str, size: int) -> str:
+    """SVG del código QR (sin declaración XML, apto para incrustar en HTML)"""
+    qr = _make_qr(data)
+    width, _ = qr.symbol_size(scale=1, border=4)
+    buffer = BytesIO()
+    qr.save(buffer, kind='svg', scale=size / width, border=4, xmldecl=False)
+    return buffer.getvalue().decode()
+
+
+def _qr_svg(data: str, size: int) -> str:
+    """SVG del código QR como data URI, sin rasterizar"""
+    img_str = base64.b64encode(_qr_svg_markup(data, size).encode()).decode()
+    return f"data:image/svg+xml;base64,{img_str}"
+
+
+@lru_cache(maxsize=512)
+def _barcode_svg_markup(data: str) -> str:
+    """SVG del código Code128 (sin declaración XML ni DOCTYPE)"""
+    buffer = BytesIO()
+    Code128(data, writer=SVGWriter()).write(buffer, options=BARCODE_OPTIONS)
+    svg = buffer.getvalue().decode()
+    return svg[svg.index('<svg'):]
+
+
+def _render_barcode_png(data: str, size: Tuple[int, int]) -> bytes:
+    """PNG Code128 dibujado directamente al tamaño pedido.
+    
+    Se ajusta la resolución para que el ancho natural (en mm) ocupe size[0]
+    píxeles y se escalan las medidas verticales para completar size[1].
+    """
+    code128 = Code128(data, writer=ImageWriter(mode='L'))
+    writer = code128.writer
+    module_width = BARCODE_OPTIONS['module_width']
+    width_mm = 2 * BARCODE_OPTIONS['quiet_zone'] + len(code128.build()[0]) * module_width
+    dpi = size[0] * 25.4 / width_mm * (1 + 1e-9)
+    
+    buffer = BytesIO()
+    if mm2px(module_width, dpi) < 1:
+        # Menos de un píxel por módulo: dibujar a resolución normal y redimensionar
+        code128.write(buffer, options=BARCODE_OPTIONS)
+        img = Image.open(buffer).resize(size, Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        img.save(buffer, format='PNG')
+        return buffer.getvalue()
+    
+    height_mm = (
+        writer.margin_top + writer.margin_bottom + BARCODE_OPTIONS['module_height']
+        + pt2mm(BARCODE_OPTIONS['font_size']) / 2 + BARCODE_OPTIONS['text_distance']
+    )
+    scale = size[1] * 25.4 / dpi / height_mm
+    code128.write(buffer, options={
+        **BARCODE_OPTIONS,
+        'dpi': dpi,
+        'margin_top': writer.margin_top * scale,
+        'margin_bottom': writer.margin_bottom * scale,
+        'module_height': BARCODE_OPTIONS['module_height'] * scale + 1e-6,
+        'font_size': BARCODE_OPTIONS['font_size'] * scale,
+        'text_distance': BARCODE_OPTIONS['text_distance'] * scale,
+    })
+    return buffer.getvalue()
+
+
+_cached_barcode_png = lru_cache(maxsize=512)(_render_barcode_png)
+
+
+def _barcode_png(data: str, size: Tuple[int, int]) -> bytes:
+    """PNG Code128; los de tamaño fijo se cachean"""
+    if size in CACHED_BARCODE_SIZES:
+        return _cached_barcode_png(data, size)
+    return _render_barcode_png(data, size)
+
+
+@lru_cache(maxsize=512)
+def _barcode_image(data: str, size: Tuple[int, int]) -> Image.Image:
+    """Imagen Code128 al tamaño pedido; se cachea por (data, size) y no debe modificarse"""
+    img = Image.open(BytesIO(_barcode_png(data, size)))
+    img.load()
+    return img
+
+
+def _to_png(img: Image.Image) -> bytes:
+    """Codifica la imagen como PNG"""
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _png_data_uri(png: bytes) -> str:
+    """PNG como data URI base64, para incrustar en HTML/JSON"""
+    img_str = base64.b64encode(png).decode()
+    return f"data:image/png;base64,{img_str}"
+
+
 class LabelGenerator:
     """Servicio para generar etiquetas QR y códigos de barras"""
     
@@ -15,80 +160,63 @@ class LabelGenerator:
         self.qr_size = (200, 200)
         self.barcode_size = (300, 100)
         self.label_size = (400, 600)  # Tamaño de etiqueta completa
+        
+        try:
+            # Intentar cargar fuente
+            self.title_font = ImageFont.truetype("arial.ttf", 16)
+            self.text_font = ImageFont.truetype("arial.ttf", 12)
+            self.small_font = ImageFont.truetype("arial.ttf", 10)
+        except OSError:
+            # Usar fuente por defecto si no se encuentra arial
+            self.title_font = ImageFont.load_default()
+            self.text_font = ImageFont.load_default()
+            self.small_font = ImageFont.load_default()
     
     def generate_qr_code(self, data: str, size: Optional[Tuple[int, int]] = None) -> str:
         """Genera un código QR y retorna la imagen en base64"""
+        return _png_data_uri(self.generate_qr_code_bytes(data, size))
+    
+    def generate_qr_code_bytes(self, data: str, size: Optional[Tuple[int, int]] = None) -> bytes:
+        """Genera un código QR y retorna el PNG"""
         if size is None:
             size = self.qr_size
-            
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        
-        # Crear imagen QR
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        qr_img = qr_img.resize(size, Image.Resampling.LANCZOS)
-        
-        # Convertir a base64
-        buffer = BytesIO()
-        qr_img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_str}"
+        return _to_png(_qr_image(data, tuple(size)))
+    
+    def generate_qr_svg(self, data: str, size: Optional[int] = None) -> str:
+        """Genera un código QR vectorial (SVG) y retorna la imagen en base64"""
+        if size is None:
+            size = self.qr_size[0]
+        return _qr_svg(data, size)
+    
+    def generate_qr_svg_bytes(self, data: str, size: Optional[int] = None) -> bytes:
+        """Genera un código QR vectorial y retorna el documento SVG"""
+        if size is None:
+            size = self.qr_size[0]
+        return _qr_svg_markup(data, size).encode()
     
     def generate_barcode(self, data: str, size: Optional[Tuple[int, int]] = None) -> str:
         """Genera un código de barras Code128 y retorna la imagen en base64"""
+        return _png_data_uri(self.generate_barcode_bytes(data, size))
+    
+    def generate_barcode_bytes(self, data: str, size: Optional[Tuple[int, int]] = None) -> bytes:
+        """Genera un código de barras Code128 y retorna el PNG"""
         if size is None:
             size = self.barcode_size
-            
-        # Crear código de barras
-        code128 = Code128(data, writer=ImageWriter())
-        
-        # Generar imagen
-        buffer = BytesIO()
-        code128.write(buffer, options={
-            'module_width': 0.2,
-            'module_height': 15.0,
-            'quiet_zone': 6.5,
-            'font_size': 10,
-            'text_distance': 5.0,
-            'background': 'white',
-            'foreground': 'black',
-        })
-        
-        # Redimensionar si es necesario
-        img = Image.open(buffer)
-        if img.size != size:
-            img = img.resize(size, Image.Resampling.LANCZOS)
-        
-        # Convertir a base64
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_str}"
+        return _barcode_png(data, tuple(size))
     
-    def generate_device_label(self, device_data: dict) -> str:
-        """Genera una etiqueta completa para un dispositivo con QR, código de barras e información"""
-        # Crear imagen base
-        img = Image.new('RGB', self.label_size, 'white')
-        draw = ImageDraw.Draw(img)
+    def generate_device_label(self, device_data: dict, generated_at: Optional[str] = None) -> str:
+        """Genera una etiqueta completa para un dispositivo y la retorna en base64"""
+        return _png_data_uri(self.generate_device_label_bytes(device_data, generated_at))
+    
+    def generate_device_label_bytes(self, device_data: dict, generated_at: Optional[str] = None) -> bytes:
+        """Genera una etiqueta completa para un dispositivo con QR, código de barras e información (PNG).
         
-        try:
-            # Intentar cargar fuente
-            title_font = ImageFont.truetype("arial.ttf", 16)
-            text_font = ImageFont.truetype("arial.ttf", 12)
-            small_font = ImageFont.truetype("arial.ttf", 10)
-        except:
-            # Usar fuente por defecto si no se encuentra arial
-            title_font = ImageFont.load_default()
-            text_font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
+        generated_at es el texto del pie "Generado"; por defecto, la hora actual.
+        """
+        # Crear imagen base (escala de grises: la etiqueta es blanco y negro)
+        img = Image.new('L', self.label_size, 'white')
+        draw = ImageDraw.Draw(img)
+        title_font, text_font, small_font = self.title_font, self.text_font, self.small_font
         
         y_offset = 20
         
@@ -121,15 +249,10 @@ class LabelGenerator:
         
         y_offset += 10
         
-        # Generar QR code
+        # Generar QR code y pegarlo en la etiqueta
         device_id = device_data.get('id', '')
         qr_data = f"DEVICE:{device_id}:{serial_number}"
-        qr_img_data = self.generate_qr_code(qr_data, (150, 150))
-        
-        # Decodificar QR y pegarlo en la etiqueta
-        qr_img_bytes = base64.b64decode(qr_img_data.split(',')[1])
-        qr_img = Image.open(BytesIO(qr_img_bytes))
-        img.paste(qr_img, (20, y_offset))
+        img.paste(_qr_image(qr_data, (150, 150)), (20, y_offset))
         
         # Texto QR
         draw.text((180, y_offset + 60), "Código QR", fill='black', font=small_font)
@@ -137,42 +260,75 @@ class LabelGenerator:
         
         y_offset += 170
         
-        # Generar código de barras
+        # Generar código de barras y pegarlo en la etiqueta
         barcode_data = f"{device_id:06d}"  # Formatear ID como 6 dígitos
-        barcode_img_data = self.generate_barcode(barcode_data, (350, 80))
-        
-        # Decodificar código de barras y pegarlo en la etiqueta
-        barcode_img_bytes = base64.b64decode(barcode_img_data.split(',')[1])
-        barcode_img = Image.open(BytesIO(barcode_img_bytes))
-        img.paste(barcode_img, (25, y_offset))
+        img.paste(_barcode_image(barcode_data, (350, 80)), (25, y_offset))
         
         y_offset += 90
         
         # Información adicional
-        draw.text((20, y_offset), f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 
+        draw.text((20, y_offset), f"Generado: {generated_at or generation_timestamp()}", 
                  fill='gray', font=small_font)
         
-        # Convertir a base64
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
+        return _to_png(img)
+    
+    def generate_device_labels(self, devices_data: List[dict],
+                               return_exceptions: bool = False) -> List[Union[str, Exception]]:
+        """Genera etiquetas para varios dispositivos en paralelo, en el mismo orden.
+        
+        Con return_exceptions=True, un error en una etiqueta se devuelve en su
+        posición en lugar de interrumpir el lote.
+        """
+        # Mismo pie "Generado" para todo el lote
+        generated_at = generation_timestamp()
+        
+        def generate(device_data: dict):
+            try:
+                return self.generate_device_label(device_data, generated_at)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
+        
+        if not devices_data:
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(devices_data), os.cpu_count() or 1)) as executor:
+            return list(executor.map(generate, devices_data))
+    
+    def generate_device_label_html(self, device_data: dict, generated_at: Optional[str] = None) -> str:
+        """Genera la etiqueta de un dispositivo como HTML con QR y código de barras en SVG.
         
-        return f"data:image/png;base64,{img_str}"
+        Pensada para imprimir desde el navegador: no compone ninguna imagen en PIL.
+        """
+        device_id = device_data.get('id', '')
+        serial_number = device_data.get('serial_number', '')
+        entry_date = device_data.get('entry_date', '')
+        if isinstance(entry_date, datetime):
+            entry_date = entry_date.strftime('%d/%m/%Y')
+        
+        template = label_templates.get_template("components/device_label.html")
+        return template.render(
+            company_name=device_data.get('company_name', 'StoraTrack'),
+            device_name=device_data.get('name', 'Dispositivo'),
+            serial_number=serial_number,
+            location=device_data.get('location', ''),
+            entry_date=entry_date,
+            device_id=device_id,
+            qr_svg=_qr_svg_markup(f"DEVICE:{device_id}:{serial_number}", 150),
+            barcode_svg=_barcode_svg_markup(f"{device_id:06d}"),
+            generated_at=generated_at or generation_timestamp()
+        )
     
-    def generate_location_label(self, location_data: dict) -> str:
-        """Genera una etiqueta para una ubicación"""
-        # Crear imagen base
-        img = Image.new('RGB', (300, 400), 'white')
+    def generate_location_label(self, location_data: dict, generated_at: Optional[str] = None) -> str:
+        """Genera una etiqueta para una ubicación y la retorna en base64"""
+        return _png_data_uri(self.generate_location_label_bytes(location_data, generated_at))
+    
+    def generate_location_label_bytes(self, location_data: dict, generated_at: Optional[str] = None) -> bytes:
+        """Genera una etiqueta para una ubicación (PNG)"""
+        # Crear imagen base (escala de grises: la etiqueta es blanco y negro)
+        img = Image.new('L', (300, 400), 'white')
         draw = ImageDraw.Draw(img)
-        
-        try:
-            title_font = ImageFont.truetype("arial.ttf", 16)
-            text_font = ImageFont.truetype("arial.ttf", 12)
-            small_font = ImageFont.truetype("arial.ttf", 10)
-        except:
-            title_font = ImageFont.load_default()
-            text_font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
+        title_font, text_font, small_font = self.title_font, self.text_font, self.small_font
         
         y_offset = 20
         
@@ -198,28 +354,18 @@ class LabelGenerator:
         
         y_offset += 10
         
-        # Generar QR code para ubicación
+        # Generar QR code para ubicación y pegarlo en la etiqueta
         location_id = location_data.get('id', '')
         qr_data = f"LOCATION:{location_id}:{location_code}"
-        qr_img_data = self.generate_qr_code(qr_data, (120, 120))
-        
-        # Decodificar QR y pegarlo en la etiqueta
-        qr_img_bytes = base64.b64decode(qr_img_data.split(',')[1])
-        qr_img = Image.open(BytesIO(qr_img_bytes))
-        img.paste(qr_img, (90, y_offset))
+        img.paste(_qr_image(qr_data, (120, 120)), (90, y_offset))
         
         y_offset += 140
         
         # Información adicional
-        draw.text((20, y_offset), f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 
+        draw.text((20, y_offset), f"Generado: {generated_at or generation_timestamp()}", 
                  fill='gray', font=small_font)
         
-        # Convertir a base64
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_str}"
+        return _to_png(img)
     
     def get_device_qr_url(self, device_id: int, base_url: str = "") -> str:
         """Genera URL para acceso directo al dispositivo via QR"""
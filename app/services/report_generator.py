@@ -1,48 +1,169 @@
 import io
+import multiprocessing
 import csv
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
 from datetime import datetime, date
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from sqlalchemy.orm import Session
 from .cost_calculator import CostCalculator
-from ..models import Device, Company
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Device, Company, DeviceStatus
+
+CSV_CHUNK_ROWS = 500
+
+def _csv_chunks(rows: Iterable[Sequence], chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[str]:
+    """Escribe las filas con csv.writer y entrega el texto cada `chunk_rows` filas"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    rows = iter(rows)
+    
+    while True:
+        # writerows recorre el bloque en C, sin una llamada Python por fila
+        writer.writerows(islice(rows, chunk_rows))
+        chunk = buffer.getvalue()
+        if not chunk:
+            return
+        yield chunk
+        buffer.seek(0)
+        buffer.truncate()
+
+def _truncate(text: str, max_length: int = 20) -> str:
+    """Recorta el texto a `max_length` caracteres agregando '...' (sin copiar si ya es corto)"""
+    return text if len(text) <= max_length else text[:max_length] + '...'
+
+def _status_label(status: DeviceStatus) -> str:
+    """Texto legible del estado de un dispositivo ('esperando_recibir' -> 'Esperando Recibir')"""
+    return status.value.replace('_', ' ').title()
+
+# Filas fijas de los CSV (tuplas compartidas entre reportes)
+_CSV_EMPTY_ROW = ()
+_CSV_DEVICE_REPORT_TITLE = ('REPORTE DE COSTO DE EQUIPO',)
+_CSV_DEVICE_INFO_TITLE = ('INFORMACIÓN DEL EQUIPO',)
+_CSV_COST_BREAKDOWN_TITLE = ('DESGLOSE DE COSTOS',)
+_CSV_COST_BREAKDOWN_HEADER = ('Concepto', 'Cantidad', 'Precio Unitario', 'Total')
+_CSV_SUMMARY_TITLE = ('RESUMEN DEL PERÍODO',)
+_CSV_DEVICE_DETAIL_TITLE = ('DETALLE POR EQUIPO',)
+_CSV_DEVICE_DETAIL_HEADER = (
+    'Equipo', 'Estado', 'Ubicación', 'Días Almacenado', 'Costo Base',
+    'Costo Almacenamiento', 'Subtotal', 'IVA', 'Total'
+)
+_CSV_DEVICE_LIST_TITLE = ('LISTA DE EQUIPOS Y COSTOS',)
+_CSV_DEVICE_LIST_HEADER = (
+    'ID', 'Nombre', 'Empresa', 'Serie', 'Marca', 'Modelo', 'Estado',
+    'Ubicación', 'Fecha Ingreso', 'Días Almacenado', 'Costo Base',
+    'Costo Diario', 'Costo Almacenamiento', 'Costo Total'
+)
+
+# Estilos de tabla de los PDF (inmutables una vez creados, compartidos entre reportes)
+_COMPANY_INFO_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6)
+])
+
+_DEVICE_INFO_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('GRID', (0, 0), (-1, -1), 1, colors.lightgrey)
+])
+
+_COST_BREAKDOWN_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+    ('BACKGROUND', (0, -1), (-1, -1), colors.lightblue),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+_SUMMARY_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('BACKGROUND', (0, -1), (-1, -1), colors.lightblue)
+])
+
+_DEVICE_DETAIL_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+])
 
 class ReportGenerator:
     """Servicio para generar reportes en PDF y CSV"""
     
-    def __init__(self, db: Session):
+    # Hoja de estilos compartida por todas las instancias (se arma una sola vez)
+    _styles: Optional[StyleSheet1] = None
+    _styles_lock = threading.Lock()
+    
+    def __init__(self, db: Session, cost_calculator: Optional[CostCalculator] = None):
         self.db = db
-        self.cost_calculator = CostCalculator(db)
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
+        # Una calculadora compartida reutiliza su caché de costos entre reportes
+        self.cost_calculator = cost_calculator or CostCalculator(db)
+        self.styles = self._get_styles()
     
-    def _setup_custom_styles(self):
+    @classmethod
+    def _get_styles(cls) -> StyleSheet1:
+        """Hoja de estilos con los estilos personalizados, creada en el primer uso"""
+        if cls._styles is None:
+            with cls._styles_lock:
+                if cls._styles is None:
+                    styles = getSampleStyleSheet()
+                    cls._setup_custom_styles(styles)
+                    cls._styles = styles
+        return cls._styles
+    
+    @staticmethod
+    def _setup_custom_styles(styles: StyleSheet1):
         """Configura estilos personalizados para los reportes"""
-        self.styles.add(ParagraphStyle(
+        if 'CustomTitle' in styles.byName:
+            return
+        
+        styles.add(ParagraphStyle(
             name='CustomTitle',
-            parent=self.styles['Heading1'],
+            parent=styles['Heading1'],
             fontSize=18,
             spaceAfter=30,
             alignment=TA_CENTER,
             textColor=colors.HexColor('#2c3e50')
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='CustomHeading',
-            parent=self.styles['Heading2'],
+            parent=styles['Heading2'],
             fontSize=14,
             spaceAfter=12,
             textColor=colors.HexColor('#34495e')
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='CustomNormal',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=10,
             spaceAfter=6
         ))
@@ -72,12 +193,7 @@ class ReportGenerator:
         ]
         
         company_table = Table(company_info, colWidths=[2*inch, 4*inch])
-        company_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
+        company_table.setStyle(_COMPANY_INFO_STYLE)
         
         story.append(company_table)
         story.append(Spacer(1, 20))
@@ -90,20 +206,14 @@ class ReportGenerator:
             ['Número de Serie:', device.serial_number or 'N/A'],
             ['Marca:', device.brand or 'N/A'],
             ['Modelo:', device.model or 'N/A'],
-            ['Estado:', device.status.replace('_', ' ').title()],
+            ['Estado:', _status_label(device.status)],
             ['Ubicación:', device.location.name if device.location else 'Sin ubicación'],
-            ['Fecha de Ingreso:', cost_data['entry_date']],
-            ['Fecha de Cálculo:', cost_data['calculation_date']]
+            ['Fecha de Ingreso:', cost_data.entry_date],
+            ['Fecha de Cálculo:', cost_data.calculation_date]
         ]
         
         device_table = Table(device_info, colWidths=[2*inch, 4*inch])
-        device_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 1, colors.lightgrey)
-        ]))
+        device_table.setStyle(_DEVICE_INFO_STYLE)
         
         story.append(device_table)
         story.append(Spacer(1, 20))
@@ -113,29 +223,18 @@ class ReportGenerator:
         
         cost_breakdown = [
             ['Concepto', 'Cantidad', 'Precio Unitario', 'Total'],
-            ['Costo Base', '1', f"{cost_data['currency']} {cost_data['base_cost']:.2f}", f"{cost_data['currency']} {cost_data['base_cost']:.2f}"],
-            ['Almacenamiento', f"{cost_data['days_stored']} días", f"{cost_data['currency']} {cost_data['daily_cost']:.2f}", f"{cost_data['currency']} {cost_data['storage_cost']:.2f}"],
-            ['', '', 'Subtotal:', f"{cost_data['currency']} {cost_data['subtotal']:.2f}"]
+            ['Costo Base', '1', f"{cost_data.currency} {cost_data.base_cost:.2f}", f"{cost_data.currency} {cost_data.base_cost:.2f}"],
+            ['Almacenamiento', f"{cost_data.days_stored} días", f"{cost_data.currency} {cost_data.daily_cost:.2f}", f"{cost_data.currency} {cost_data.storage_cost:.2f}"],
+            ['', '', 'Subtotal:', f"{cost_data.currency} {cost_data.subtotal:.2f}"]
         ]
         
-        if cost_data['apply_iva'] and cost_data['iva_amount'] > 0:
-            cost_breakdown.append(['', '', f"IVA ({cost_data['iva_percent']:.0f}%):", f"{cost_data['currency']} {cost_data['iva_amount']:.2f}"])
+        if cost_data.apply_iva and cost_data.iva_amount > 0:
+            cost_breakdown.append(['', '', f"IVA ({cost_data.iva_percent:.0f}%):", f"{cost_data.currency} {cost_data.iva_amount:.2f}"])
         
-        cost_breakdown.append(['', '', 'TOTAL:', f"{cost_data['currency']} {cost_data['total_cost']:.2f}"])
+        cost_breakdown.append(['', '', 'TOTAL:', f"{cost_data.currency} {cost_data.total_cost:.2f}"])
         
         cost_table = Table(cost_breakdown, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1.5*inch])
-        cost_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (0, -1), (-1, -1), colors.lightblue),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        cost_table.setStyle(_COST_BREAKDOWN_STYLE)
         
         story.append(cost_table)
         
@@ -169,12 +268,7 @@ class ReportGenerator:
         ]
         
         company_table = Table(company_info, colWidths=[2*inch, 4*inch])
-        company_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
+        company_table.setStyle(_COMPANY_INFO_STYLE)
         
         story.append(company_table)
         story.append(Spacer(1, 20))
@@ -188,13 +282,7 @@ class ReportGenerator:
         ]
         
         summary_table = Table(summary_info, colWidths=[2*inch, 4*inch])
-        summary_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('BACKGROUND', (0, -1), (-1, -1), colors.lightblue),
-        ]))
+        summary_table.setStyle(_SUMMARY_STYLE)
         
         story.append(summary_table)
         story.append(Spacer(1, 20))
@@ -207,26 +295,16 @@ class ReportGenerator:
             
             for device_cost in monthly_data['devices']:
                 device_data.append([
-                    device_cost['device_name'][:20] + ('...' if len(device_cost['device_name']) > 20 else ''),
-                    device_cost['status'].replace('_', ' ')[:10],
-                    str(device_cost['days_stored']),
-                    f"{company.currency} {device_cost['base_cost']:.2f}",
-                    f"{company.currency} {device_cost['storage_cost']:.2f}",
-                    f"{company.currency} {device_cost['total_cost']:.2f}"
+                    _truncate(device_cost.device_name),
+                    _status_label(device_cost.status)[:10],
+                    str(device_cost.days_stored),
+                    f"{company.currency} {device_cost.base_cost:.2f}",
+                    f"{company.currency} {device_cost.storage_cost:.2f}",
+                    f"{company.currency} {device_cost.total_cost:.2f}"
                 ])
             
             device_table = Table(device_data, colWidths=[2*inch, 1*inch, 0.7*inch, 1*inch, 1*inch, 1*inch])
-            device_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
-            ]))
+            device_table.setStyle(_DEVICE_DETAIL_STYLE)
             
             story.append(device_table)
         
@@ -234,128 +312,203 @@ class ReportGenerator:
         buffer.seek(0)
         return buffer.getvalue()
     
+    async def generate_device_cost_report_pdf_async(self, device: Device, calculation_date: Optional[date] = None) -> bytes:
+        """Genera el PDF de costo de un dispositivo en el pool de procesos, sin bloquear el event loop"""
+        return await run_in_pdf_pool(_device_cost_report_pdf_worker, device.id, calculation_date)
+    
+    async def generate_company_monthly_report_pdf_async(self, company: Company, year: int, month: int) -> bytes:
+        """Genera el PDF mensual de una empresa en el pool de procesos, sin bloquear el event loop"""
+        return await run_in_pdf_pool(_company_monthly_report_pdf_worker, company.id, year, month)
+    
     def generate_device_cost_report_csv(self, device: Device, calculation_date: Optional[date] = None) -> str:
         """Genera reporte CSV de costo de un dispositivo específico"""
+        return "".join(self.iter_device_cost_report_csv(device, calculation_date))
+    
+    def iter_device_cost_report_csv(self, device: Device, calculation_date: Optional[date] = None) -> Iterator[str]:
+        """Genera el reporte CSV de costo de un dispositivo en bloques de texto"""
+        return _csv_chunks(self._device_cost_report_rows(device, calculation_date))
+    
+    def _device_cost_report_rows(self, device: Device, calculation_date: Optional[date]) -> Iterator[Sequence]:
         cost_data = self.cost_calculator.calculate_device_cost(device, calculation_date)
         
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
         # Encabezados de información general
-        writer.writerow(['REPORTE DE COSTO DE EQUIPO'])
-        writer.writerow([])
-        writer.writerow(['Empresa', device.company.name])
-        writer.writerow(['RUT/ID', device.company.rut_id or 'N/A'])
-        writer.writerow(['Moneda', device.company.currency])
-        writer.writerow(['Fecha de generación', datetime.now().strftime('%d/%m/%Y %H:%M')])
-        writer.writerow([])
+        yield _CSV_DEVICE_REPORT_TITLE
+        yield _CSV_EMPTY_ROW
+        yield ['Empresa', device.company.name]
+        yield ['RUT/ID', device.company.rut_id or 'N/A']
+        yield ['Moneda', device.company.currency]
+        yield ['Fecha de generación', datetime.now().strftime('%d/%m/%Y %H:%M')]
+        yield _CSV_EMPTY_ROW
         
         # Información del equipo
-        writer.writerow(['INFORMACIÓN DEL EQUIPO'])
-        writer.writerow(['Nombre', device.name])
-        writer.writerow(['Número de Serie', device.serial_number or 'N/A'])
-        writer.writerow(['Marca', device.brand or 'N/A'])
-        writer.writerow(['Modelo', device.model or 'N/A'])
-        writer.writerow(['Estado', device.status.replace('_', ' ').title()])
-        writer.writerow(['Ubicación', device.location.name if device.location else 'Sin ubicación'])
-        writer.writerow(['Fecha de Ingreso', cost_data['entry_date']])
-        writer.writerow(['Fecha de Cálculo', cost_data['calculation_date']])
-        writer.writerow([])
+        yield _CSV_DEVICE_INFO_TITLE
+        yield ['Nombre', device.name]
+        yield ['Número de Serie', device.serial_number or 'N/A']
+        yield ['Marca', device.brand or 'N/A']
+        yield ['Modelo', device.model or 'N/A']
+        yield ['Estado', _status_label(device.status)]
+        yield ['Ubicación', device.location.name if device.location else 'Sin ubicación']
+        yield ['Fecha de Ingreso', cost_data.entry_date]
+        yield ['Fecha de Cálculo', cost_data.calculation_date]
+        yield _CSV_EMPTY_ROW
         
         # Desglose de costos
-        writer.writerow(['DESGLOSE DE COSTOS'])
-        writer.writerow(['Concepto', 'Cantidad', 'Precio Unitario', 'Total'])
-        writer.writerow(['Costo Base', '1', f"{cost_data['base_cost']:.2f}", f"{cost_data['base_cost']:.2f}"])
-        writer.writerow(['Almacenamiento', f"{cost_data['days_stored']} días", f"{cost_data['daily_cost']:.2f}", f"{cost_data['storage_cost']:.2f}"])
-        writer.writerow(['', '', 'Subtotal', f"{cost_data['subtotal']:.2f}"])
+        yield _CSV_COST_BREAKDOWN_TITLE
+        yield _CSV_COST_BREAKDOWN_HEADER
+        yield ['Costo Base', '1', f"{cost_data.base_cost:.2f}", f"{cost_data.base_cost:.2f}"]
+        yield ['Almacenamiento', f"{cost_data.days_stored} días", f"{cost_data.daily_cost:.2f}", f"{cost_data.storage_cost:.2f}"]
+        yield ['', '', 'Subtotal', f"{cost_data.subtotal:.2f}"]
         
-        if cost_data['apply_iva'] and cost_data['iva_amount'] > 0:
-            writer.writerow(['', '', f"IVA ({cost_data['iva_percent']:.0f}%)", f"{cost_data['iva_amount']:.2f}"])
+        if cost_data.apply_iva and cost_data.iva_amount > 0:
+            yield ['', '', f"IVA ({cost_data.iva_percent:.0f}%)", f"{cost_data.iva_amount:.2f}"]
         
-        writer.writerow(['', '', 'TOTAL', f"{cost_data['total_cost']:.2f}"])
-        
-        return output.getvalue()
+        yield ['', '', 'TOTAL', f"{cost_data.total_cost:.2f}"]
     
     def generate_company_monthly_report_csv(self, company: Company, year: int, month: int) -> str:
         """Genera reporte CSV mensual de una empresa"""
+        return "".join(self.iter_company_monthly_report_csv(company, year, month))
+    
+    def iter_company_monthly_report_csv(self, company: Company, year: int, month: int) -> Iterator[str]:
+        """Genera el reporte CSV mensual de una empresa en bloques de texto"""
+        return _csv_chunks(self._company_monthly_report_rows(company, year, month))
+    
+    def _company_monthly_report_rows(self, company: Company, year: int, month: int) -> Iterator[Sequence]:
         monthly_data = self.cost_calculator.calculate_company_monthly_cost(company, year, month)
         
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
         # Encabezados
-        writer.writerow([f'REPORTE MENSUAL - {monthly_data["month_name"]} {year}'])
-        writer.writerow([])
-        writer.writerow(['Empresa', company.name])
-        writer.writerow(['RUT/ID', company.rut_id or 'N/A'])
-        writer.writerow(['Período', monthly_data['period']])
-        writer.writerow(['Moneda', company.currency])
-        writer.writerow(['Fecha de generación', datetime.now().strftime('%d/%m/%Y %H:%M')])
-        writer.writerow([])
+        yield [f'REPORTE MENSUAL - {monthly_data["month_name"]} {year}']
+        yield _CSV_EMPTY_ROW
+        yield ['Empresa', company.name]
+        yield ['RUT/ID', company.rut_id or 'N/A']
+        yield ['Período', monthly_data['period']]
+        yield ['Moneda', company.currency]
+        yield ['Fecha de generación', datetime.now().strftime('%d/%m/%Y %H:%M')]
+        yield _CSV_EMPTY_ROW
         
         # Resumen
-        writer.writerow(['RESUMEN DEL PERÍODO'])
-        writer.writerow(['Total de Equipos', monthly_data['total_devices']])
-        writer.writerow(['Costo Total', f"{monthly_data['total_cost']:.2f}"])
-        writer.writerow([])
+        yield _CSV_SUMMARY_TITLE
+        yield ['Total de Equipos', monthly_data['total_devices']]
+        yield ['Costo Total', f"{monthly_data['total_cost']:.2f}"]
+        yield _CSV_EMPTY_ROW
         
         # Detalle por equipo
         if monthly_data['devices']:
-            writer.writerow(['DETALLE POR EQUIPO'])
-            writer.writerow(['Equipo', 'Estado', 'Ubicación', 'Días Almacenado', 'Costo Base', 'Costo Almacenamiento', 'Subtotal', 'IVA', 'Total'])
+            yield _CSV_DEVICE_DETAIL_TITLE
+            yield _CSV_DEVICE_DETAIL_HEADER
             
             for device_cost in monthly_data['devices']:
-                writer.writerow([
-                    device_cost['device_name'],
-                    device_cost['status'].replace('_', ' ').title(),
-                    device_cost.get('location', 'Sin ubicación'),
-                    device_cost['days_stored'],
-                    f"{device_cost['base_cost']:.2f}",
-                    f"{device_cost['storage_cost']:.2f}",
-                    f"{device_cost['subtotal']:.2f}",
-                    f"{device_cost['iva_amount']:.2f}",
-                    f"{device_cost['total_cost']:.2f}"
-                ])
-        
-        return output.getvalue()
+                yield [
+                    device_cost.device_name,
+                    _status_label(device_cost.status),
+                    device_cost.location,
+                    device_cost.days_stored,
+                    f"{device_cost.base_cost:.2f}",
+                    f"{device_cost.storage_cost:.2f}",
+                    f"{device_cost.subtotal:.2f}",
+                    f"{device_cost.iva_amount:.2f}",
+                    f"{device_cost.total_cost:.2f}"
+                ]
     
     def generate_devices_list_csv(self, devices: List[Device]) -> str:
         """Genera CSV con lista de dispositivos y sus costos actuales"""
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
+        return "".join(self.iter_devices_list_csv(devices))
+    
+    def iter_devices_list_csv(self, devices: List[Device]) -> Iterator[str]:
+        """Genera el CSV de la lista de dispositivos en bloques de texto"""
+        return _csv_chunks(self._devices_list_rows(devices))
+    
+    def _devices_list_rows(self, devices: List[Device]) -> Iterator[Sequence]:
         # Encabezados
-        writer.writerow(['LISTA DE EQUIPOS Y COSTOS'])
-        writer.writerow([])
-        writer.writerow(['Fecha de generación', datetime.now().strftime('%d/%m/%Y %H:%M')])
-        writer.writerow([])
+        yield _CSV_DEVICE_LIST_TITLE
+        yield _CSV_EMPTY_ROW
+        yield ['Fecha de generación', datetime.now().strftime('%d/%m/%Y %H:%M')]
+        yield _CSV_EMPTY_ROW
         
         # Encabezados de datos
-        writer.writerow([
-            'ID', 'Nombre', 'Empresa', 'Serie', 'Marca', 'Modelo', 'Estado', 
-            'Ubicación', 'Fecha Ingreso', 'Días Almacenado', 'Costo Base', 
-            'Costo Diario', 'Costo Almacenamiento', 'Costo Total'
-        ])
-        
-        # Datos de dispositivos
-        for device in devices:
-            cost_data = self.cost_calculator.calculate_device_cost(device)
-            
-            writer.writerow([
+        yield _CSV_DEVICE_LIST_HEADER
+        
+        # Datos de dispositivos (costos, empresas y ubicaciones cargados en bloque)
+        costs = self.cost_calculator.calculate_devices_costs_bulk(devices)
+        yield from (
+            [
                 device.id,
                 device.name,
                 device.company.name,
                 device.serial_number or '',
                 device.brand or '',
                 device.model or '',
-                device.status.replace('_', ' ').title(),
+                _status_label(device.status),
                 device.location.name if device.location else '',
-                cost_data['entry_date'],
-                cost_data['days_stored'],
-                f"{cost_data['base_cost']:.2f}",
-                f"{cost_data['daily_cost']:.2f}",
-                f"{cost_data['storage_cost']:.2f}",
-                f"{cost_data['total_cost']:.2f}"
-            ])
-        
-        return output.getvalue()
\ No newline at end of file
+                cost_data.entry_date,
+                cost_data.days_stored,
+                f"{cost_data.base_cost:.2f}",
+                f"{cost_data.daily_cost:.2f}",
+                f"{cost_data.storage_cost:.2f}",
+                f"{cost_data.total_cost:.2f}"
+            ]
+            for device, cost_data in ((device, costs[device.id]) for device in devices)
+        )
+
+# Pool de procesos para los PDF: el layout de ReportLab es CPU y retiene el GIL.
+# Se crea al primer uso; cada proceso abre su propia sesión de base de datos.
+# Los procesos se lanzan con "spawn": hacer fork de un worker de uvicorn con
+# hilos activos (anyio, pool de Redis, locks) puede dejar bloqueado al hijo.
+_pdf_executor: Optional[ProcessPoolExecutor] = None
+_pdf_executor_lock = threading.Lock()
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """Obtener (creando si hace falta) el pool de procesos de los PDF"""
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is None:
+            _pdf_executor = ProcessPoolExecutor(
+                max_workers=max(1, settings.pdf_workers),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pdf_executor
+
+def _discard_pdf_executor(executor: ProcessPoolExecutor):
+    """Descartar un pool roto para que el próximo uso cree uno nuevo"""
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is executor:
+            _pdf_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+async def run_in_pdf_pool(func, *args) -> bytes:
+    """Ejecutar `func` en el pool de los PDF, recreándolo una vez si quedó roto
+    
+    Si un proceso del pool muere (OOM, crash) el ProcessPoolExecutor queda
+    inutilizable y todas las llamadas siguientes fallarían con BrokenProcessPool.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_pdf_executor()
+    try:
+        return await loop.run_in_executor(executor, func, *args)
+    except BrokenProcessPool:
+        _discard_pdf_executor(executor)
+        return await loop.run_in_executor(get_pdf_executor(), func, *args)
+
+def shutdown_pdf_executor():
+    """Cerrar el pool de procesos de los PDF (al apagar la aplicación)"""
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is not None:
+            _pdf_executor.shutdown(wait=True, cancel_futures=True)
+            _pdf_executor = None
+
+def _device_cost_report_pdf_worker(device_id: int, calculation_date: Optional[date]) -> bytes:
+    db = SessionLocal()
+    try:
+        device = db.get(Device, device_id)
+        return ReportGenerator(db).generate_device_cost_report_pdf(device, calculation_date)
+    finally:
+        db.close()
+
+def _company_monthly_report_pdf_worker(company_id: int, year: int, month: int) -> bytes:
+    db = SessionLocal()
+    try:
+        company = db.get(Company, company_id)
+        return ReportGenerator(db).generate_company_monthly_report_pdf(company, year, month)
+    finally:
+        db.close()
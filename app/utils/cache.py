@@ -1,32 +1,86 @@
 import redis
+import hashlib
 import json
+import orjson
 import pickle
-from typing import Any, Optional, Union
+import threading
+import time
+from fnmatch import fnmatchcase
+from decimal import Decimal
+from typing import Any, Callable, Hashable, Optional, Union
 from functools import wraps
+from cachetools import TLRUCache, TTLCache
 from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Prefijo de formato de los valores guardados en Redis
+_JSON_PREFIX = b'J'
+_PICKLE_PREFIX = b'P'
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+
+# Caché local (L1) por proceso delante de Redis. El TTL es corto porque las
+# invalidaciones de otros workers no llegan a este proceso.
+L1_CACHE_SIZE = 1024
+L1_CACHE_TTL = 60
+
+# Segundos sin intentar usar Redis tras un error de conexión
+REDIS_RETRY_AFTER = 5
+
+# Pool de conexiones compartido por el proceso (no conecta hasta el primer uso)
+_pool = redis.ConnectionPool(
+    host=getattr(settings, 'redis_host', 'localhost'),
+    port=getattr(settings, 'redis_port', 6379),
+    db=getattr(settings, 'redis_db', 0),
+    decode_responses=False,  # Para manejar datos binarios
+    socket_connect_timeout=5,
+    socket_timeout=5,
+    max_connections=50
+)
+
+def _json_default(value: Any) -> Any:
+    """Tipos no nativos de orjson; el resto cae a pickle"""
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+def serialize_value(value: Any) -> bytes:
+    """Serializar con orjson y usar pickle solo si el valor no es JSON"""
+    try:
+        return _JSON_PREFIX + orjson.dumps(value, default=_json_default, option=_ORJSON_OPTIONS)
+    except TypeError:
+        return _PICKLE_PREFIX + pickle.dumps(value)
+
+def deserialize_value(data: bytes) -> Any:
+    """Deserializar un valor guardado por `serialize_value`"""
+    prefix = data[:1]
+    if prefix == _JSON_PREFIX:
+        return orjson.loads(data[1:])
+    if prefix == _PICKLE_PREFIX:
+        return pickle.loads(data[1:])
+    # Valores anteriores sin prefijo (pickle)
+    return pickle.loads(data)
+
 class CacheManager:
     """Gestor de caché con Redis como backend"""
     
     def __init__(self):
         self.redis_client = None
+        self._unavailable_until = 0.0
+        # Valores guardados como (ttl, valor) para no sobrevivir a su expiración en Redis
+        self._l1 = TLRUCache(maxsize=L1_CACHE_SIZE, ttu=lambda key, item, now: now + item[0])
+        self._l1_lock = threading.Lock()
         self._connect()
     
+    def _l1_set(self, key: str, value: Any, ttl: int):
+        with self._l1_lock:
+            self._l1[key] = (min(ttl, L1_CACHE_TTL), value)
+    
     def _connect(self):
         """Conectar a Redis con manejo de errores"""
         try:
-            # Configuración básica de Redis
-            self.redis_client = redis.Redis(
-                host=getattr(settings, 'redis_host', 'localhost'),
-                port=getattr(settings, 'redis_port', 6379),
-                db=getattr(settings, 'redis_db', 0),
-                decode_responses=False,  # Para manejar datos binarios
-                socket_connect_timeout=5,
-                socket_timeout=5
-            )
+            self.redis_client = redis.Redis(connection_pool=_pool)
             # Probar la conexión
             self.redis_client.ping()
             logger.info("Conexión a Redis establecida exitosamente")
@@ -44,6 +98,14 @@ class CacheManager:
         except:
             return False
     
+    def _usable(self) -> bool:
+        """Verificar sin PING si se puede usar Redis (errores recientes lo pausan)"""
+        return self.redis_client is not None and time.monotonic() >= self._unavailable_until
+    
+    def _handle_error(self, e: Exception):
+        if isinstance(e, (redis.ConnectionError, redis.TimeoutError)):
+            self._unavailable_until = time.monotonic() + REDIS_RETRY_AFTER
+    
     def set(self, key: str, value: Any, expire: int = 300) -> bool:
         """Guardar valor en caché
         
@@ -52,67 +114,96 @@ class CacheManager:
             value: Valor a guardar
             expire: Tiempo de expiración en segundos (default: 5 minutos)
         """
-        if not self.is_available():
+        if not self._usable():
             return False
         
         try:
             # Serializar el valor
-            serialized_value = pickle.dumps(value)
+            serialized_value = serialize_value(value)
             self.redis_client.setex(key, expire, serialized_value)
+            # En L1 el mismo valor que leerían otros workers desde Redis (y no
+            # el objeto del llamador, que podría modificarlo después)
+            self._l1_set(key, deserialize_value(serialized_value), expire)
             return True
         except Exception as e:
+            self._handle_error(e)
             logger.error(f"Error al guardar en caché {key}: {e}")
             return False
     
     def get(self, key: str) -> Optional[Any]:
         """Obtener valor del caché"""
-        if not self.is_available():
+        with self._l1_lock:
+            item = self._l1.get(key)
+        if item is not None:
+            return item[1]
+        
+        if not self._usable():
             return None
         
         try:
             value = self.redis_client.get(key)
             if value is None:
                 return None
-            return pickle.loads(value)
+            value = deserialize_value(value)
+            self._l1_set(key, value, L1_CACHE_TTL)
+            return value
         except Exception as e:
+            self._handle_error(e)
             logger.error(f"Error al obtener del caché {key}: {e}")
             return None
     
     def delete(self, key: str) -> bool:
         """Eliminar clave del caché"""
-        if not self.is_available():
+        with self._l1_lock:
+            self._l1.pop(key, None)
+        if not self._usable():
             return False
         
         try:
             self.redis_client.delete(key)
             return True
         except Exception as e:
+            self._handle_error(e)
             logger.error(f"Error al eliminar del caché {key}: {e}")
             return False
     
     def delete_pattern(self, pattern: str) -> int:
         """Eliminar claves que coincidan con un patrón"""
-        if not self.is_available():
+        with self._l1_lock:
+            for key in [k for k in self._l1.keys() if fnmatchcase(k, pattern)]:
+                self._l1.pop(key, None)
+        if not self._usable():
             return 0
         
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                return self.redis_client.delete(*keys)
-            return 0
+            # SCAN no bloquea Redis como KEYS; los DEL se envían en un pipeline
+            with self.redis_client.pipeline(transaction=False) as pipe:
+                batch = []
+                for key in self.redis_client.scan_iter(match=pattern, count=500):
+                    batch.append(key)
+                    if len(batch) >= 500:
+                        pipe.delete(*batch)
+                        batch = []
+                if batch:
+                    pipe.delete(*batch)
+                return sum(pipe.execute())
         except Exception as e:
+            self._handle_error(e)
             logger.error(f"Error al eliminar patrón del caché {pattern}: {e}")
             return 0
     
     def clear_all(self) -> bool:
         """Limpiar todo el caché"""
-        if not self.is_available():
+        with self._l1_lock:
+            self._l1.clear()
+        if not self._usable():
             return False
         
         try:
             self.redis_client.flushdb()
             return True
         except Exception as e:
+            self._handle_error(e)
             logger.error(f"Error al limpiar caché: {e}")
             return False
 
@@ -120,10 +211,10 @@ class CacheManager:
 cache_manager = CacheManager()
 
 def cache_key(*args, **kwargs) -> str:
-    """Generar clave de caché a partir de argumentos"""
+    """Generar clave de caché de longitud fija (hash BLAKE2) a partir de argumentos"""
     key_parts = [str(arg) for arg in args]
     key_parts.extend([f"{k}:{v}" for k, v in sorted(kwargs.items())])
-    return ":".join(key_parts)
+    return hashlib.blake2b(":".join(key_parts).encode(), digest_size=16).hexdigest()
 
 def cached(expire: int = 300, key_prefix: str = ""):
     """Decorador para cachear resultados de funciones
@@ -135,9 +226,9 @@ def cached(expire: int = 300, key_prefix: str = ""):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Generar clave de caché
+            # Generar clave de caché (prefijo legible para invalidar por patrón)
             func_name = f"{func.__module__}.{func.__name__}"
-            cache_key_str = cache_key(key_prefix, func_name, *args, **kwargs)
+            cache_key_str = f"{key_prefix}:{func_name}:{cache_key(*args, **kwargs)}"
             
             # Intentar obtener del caché
             cached_result = cache_manager.get(cache_key_str)
@@ -154,24 +245,62 @@ def cached(expire: int = 300, key_prefix: str = ""):
         return wrapper
     return decorator
 
+# Caché en proceso para catálogos pequeños por empresa (ubicaciones, etiquetas).
+# Solo guarda datos no sensibles; se invalida en los endpoints de escritura.
+lookup_cache = TTLCache(maxsize=1024, ttl=60)
+_lookup_lock = threading.Lock()
+
+def get_cached_lookup(key: Hashable, loader: Callable[[], Any]) -> Any:
+    """Obtener un catálogo del caché en proceso o cargarlo con `loader`"""
+    with _lookup_lock:
+        value = lookup_cache.get(key)
+    if value is None:
+        value = loader()
+        with _lookup_lock:
+            lookup_cache[key] = value
+    return value
+
+def invalidate_lookup_cache():
+    """Invalidar el caché en proceso de catálogos"""
+    with _lookup_lock:
+        lookup_cache.clear()
+
 def invalidate_cache_pattern(pattern: str):
     """Invalidar caché por patrón"""
     return cache_manager.delete_pattern(pattern)
 
+# Última lectura de INFO (los paneles de monitoreo consultan seguido)
+CACHE_STATS_TTL = 2
+_stats_cache = {'ts': 0.0, 'data': None}
+
 def get_cache_stats() -> dict:
     """Obtener estadísticas del caché"""
-    if not cache_manager.is_available():
+    now = time.monotonic()
+    if _stats_cache['data'] is not None and now - _stats_cache['ts'] < CACHE_STATS_TTL:
+        return _stats_cache['data']
+    
+    if not cache_manager._usable():
         return {"available": False, "error": "Redis no disponible"}
     
     try:
-        info = cache_manager.redis_client.info()
-        return {
+        # Solo las secciones necesarias, en un único round-trip
+        with cache_manager.redis_client.pipeline(transaction=False) as pipe:
+            pipe.info('memory')
+            pipe.info('clients')
+            pipe.info('stats')
+            memory, clients, stats = pipe.execute()
+        data = {
             "available": True,
-            "used_memory": info.get('used_memory_human', 'N/A'),
-            "connected_clients": info.get('connected_clients', 0),
-            "total_commands_processed": info.get('total_commands_processed', 0),
-            "keyspace_hits": info.get('keyspace_hits', 0),
-            "keyspace_misses": info.get('keyspace_misses', 0)
+            "used_memory": memory.get('used_memory_human', 'N/A'),
+            "connected_clients": clients.get('connected_clients', 0),
+            "total_commands_processed": stats.get('total_commands_processed', 0),
+            "keyspace_hits": stats.get('keyspace_hits', 0),
+            "keyspace_misses": stats.get('keyspace_misses', 0)
         }
     except Exception as e:
-        return {"available": False, "error": str(e)}
\ No newline at end of file
+        cache_manager._handle_error(e)
+        return {"available": False, "error": str(e)}
+    
+    _stats_cache['ts'] = now
+    _stats_cache['data'] = data
+    return data
\ No newline at end of file
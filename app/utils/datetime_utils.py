@@ -1,10 +1,13 @@
 from datetime import datetime, timezone
-import time
 from app.config import settings
 
+# Formatos configurados (settings se carga una vez por proceso)
+_DATETIME_FORMAT = settings.datetime_format
+_DATE_FORMAT = settings.date_format
+
 def get_local_timezone():
-    """Obtiene la zona horaria local del sistema"""
-    return timezone.utc if time.daylight == 0 else timezone.utc
+    """Obtiene la zona horaria local del sistema (offset vigente ahora)"""
+    return datetime.now().astimezone().tzinfo
 
 def now_local():
     """Obtiene la fecha y hora actual en la zona horaria local"""
@@ -23,29 +26,24 @@ def local_to_utc(local_dt):
     """Convierte una fecha local a UTC"""
     if local_dt is None:
         return None
-    if local_dt.tzinfo is None:
-        # Asumir que es local si no tiene timezone info
-        local_dt = local_dt.replace(tzinfo=datetime.now().astimezone().tzinfo)
+    # Si no tiene timezone info se asume local: astimezone aplica las reglas
+    # de la zona del sistema para esa fecha (incluido el horario de verano)
     return local_dt.astimezone(timezone.utc)
 
 def format_datetime(dt, format_str=None):
     """Formatea una fecha usando el formato configurado"""
     if dt is None:
         return None
-    if format_str is None:
-        format_str = settings.datetime_format
-    # Convertir a local si es necesario
+    # Convertir a local solo si trae zona horaria
     if dt.tzinfo is not None:
         dt = utc_to_local(dt)
-    return dt.strftime(format_str)
+    return dt.strftime(format_str or _DATETIME_FORMAT)
 
 def format_date(dt, format_str=None):
     """Formatea una fecha usando el formato configurado"""
     if dt is None:
         return None
-    if format_str is None:
-        format_str = settings.date_format
-    # Convertir a local si es necesario
+    # Convertir a local solo si trae zona horaria
     if dt.tzinfo is not None:
         dt = utc_to_local(dt)
-    return dt.strftime(format_str)
\ No newline at end of file
+    return dt.strftime(format_str or _DATE_FORMAT)
\ No newline at end of file
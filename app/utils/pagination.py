@@ -2,6 +2,8 @@ from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Query
 from sqlalchemy import func
 from math import ceil
+from urllib.parse import urlencode
+from app.utils.cache import cache_key, cache_manager
 
 class PaginationResult:
     """Clase para encapsular resultados de paginación"""
@@ -41,11 +43,40 @@ class PaginationResult:
             'next_num': self.next_num
         }
 
+# Motores con COUNT(*) OVER () (SQLite >= 3.25)
+_WINDOW_COUNT_DIALECTS = ('postgresql', 'sqlite')
+
+def _count_cache_key(query: Query) -> str:
+    """Clave de caché del total de una consulta (SQL y parámetros)"""
+    compiled = query.statement.compile()
+    return f"count:{cache_key(str(compiled), **compiled.params)}"
+
+def _supports_window_count(query: Query) -> bool:
+    """Solo consultas de una entidad, sin DISTINCT ni GROUP BY, en motores con funciones ventana"""
+    descriptions = query.column_descriptions
+    if len(descriptions) != 1 or descriptions[0]['expr'] is not descriptions[0]['entity']:
+        return False
+    if query._distinct or query._group_by_clauses:
+        return False
+    return query.session.get_bind().dialect.name in _WINDOW_COUNT_DIALECTS
+
+def _page_with_total(query: Query, offset: int, limit: int) -> tuple[List[Any], int]:
+    """Elementos de la página y total en una sola consulta con COUNT(*) OVER ()"""
+    if not _supports_window_count(query):
+        return query.offset(offset).limit(limit).all(), query.count()
+    
+    rows = query.add_columns(func.count().over().label('_total')).offset(offset).limit(limit).all()
+    if not rows:
+        # Página fuera de rango: ninguna fila trae el total
+        return [], query.count()
+    return [row[0] for row in rows], rows[0]._total
+
 def paginate_query(
     query: Query,
     page: int = 1,
     per_page: int = 20,
-    max_per_page: int = 100
+    max_per_page: int = 100,
+    count_cache_expire: Optional[int] = None
 ) -> PaginationResult:
     """Pagina una consulta SQLAlchemy
     
@@ -54,6 +85,9 @@ def paginate_query(
         page: Número de página (empezando en 1)
         per_page: Elementos por página
         max_per_page: Máximo elementos por página permitidos
+        count_cache_expire: Segundos que se cachea el total (None o 0 para no cachear).
+            Solo para listados donde un total atrasado es aceptable: las escrituras
+            no invalidan esta clave.
     
     Returns:
         PaginationResult con los datos paginados
@@ -62,14 +96,18 @@ def paginate_query(
     page = max(1, page)
     per_page = min(max(1, per_page), max_per_page)
     
-    # Obtener total de elementos
-    total = query.count()
-    
     # Calcular offset
     offset = (page - 1) * per_page
     
-    # Obtener elementos de la página actual
-    items = query.offset(offset).limit(per_page).all()
+    # Con el total cacheado basta la consulta de la página; si no, página y total juntos
+    count_key = _count_cache_key(query) if count_cache_expire else None
+    total = cache_manager.get(count_key) if count_key else None
+    if total is not None:
+        items = query.offset(offset).limit(per_page).all()
+    else:
+        items, total = _page_with_total(query, offset, per_page)
+        if count_key:
+            cache_manager.set(count_key, total, count_cache_expire)
     
     # Calcular información de navegación
     has_prev = page > 1
@@ -88,6 +126,77 @@ def paginate_query(
         next_num=next_num
     )
 
+class KeysetPaginationResult:
+    """Resultado de paginación por cursor (sin total ni número de páginas)"""
+    
+    def __init__(
+        self,
+        items: List[Any],
+        per_page: int,
+        cursor: Optional[Any] = None,
+        next_cursor: Optional[Any] = None
+    ):
+        self.items = items
+        self.per_page = per_page
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.has_next = next_cursor is not None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte el resultado a diccionario para templates"""
+        return {
+            'items': self.items,
+            'per_page': self.per_page,
+            'cursor': self.cursor,
+            'next_cursor': self.next_cursor,
+            'has_next': self.has_next
+        }
+
+def paginate_keyset(
+    query: Query,
+    cursor: Optional[Any] = None,
+    per_page: int = 20,
+    order_col=None,
+    max_per_page: int = 100
+) -> KeysetPaginationResult:
+    """Pagina una consulta SQLAlchemy por cursor (WHERE col > cursor ORDER BY col)
+    
+    A diferencia de `paginate_query` no hace COUNT ni OFFSET, por lo que el
+    costo de cada página no depende de su profundidad.
+    
+    Args:
+        query: Consulta SQLAlchemy
+        cursor: Último valor de `order_col` de la página anterior (None para la primera)
+        per_page: Elementos por página
+        order_col: Columna única y ordenable (por defecto el id de la entidad principal)
+        max_per_page: Máximo elementos por página permitidos
+    
+    Returns:
+        KeysetPaginationResult con los datos paginados
+    """
+    per_page = min(max(1, per_page), max_per_page)
+    
+    if order_col is None:
+        order_col = query.column_descriptions[0]['entity'].id
+    
+    if cursor is not None:
+        query = query.filter(order_col > cursor)
+    
+    # Un elemento extra indica si hay página siguiente
+    items = query.order_by(None).order_by(order_col).limit(per_page + 1).all()
+    
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = getattr(items[-1], order_col.key)
+    
+    return KeysetPaginationResult(
+        items=items,
+        per_page=per_page,
+        cursor=cursor,
+        next_cursor=next_cursor
+    )
+
 def get_pagination_params(
     page: Optional[int] = None,
     per_page: Optional[int] = None,
@@ -132,11 +241,13 @@ def create_pagination_context(
     Returns:
         Diccionario con contexto para templates
     """
-    # Construir parámetros de query string
+    # Query string común (todo menos la página), codificado una sola vez
+    base_params = {k: v for k, v in query_params.items() if v is not None}
+    base_params['per_page'] = pagination.per_page
+    url_prefix = f"{base_url}?{urlencode(base_params)}&page="
+    
     def build_url(page_num: int) -> str:
-        params = {**query_params, 'page': page_num, 'per_page': pagination.per_page}
-        query_string = '&'.join([f"{k}={v}" for k, v in params.items() if v is not None])
-        return f"{base_url}?{query_string}" if query_string else base_url
+        return f"{url_prefix}{page_num}"
     
     # Calcular rango de páginas para mostrar
     start_page = max(1, pagination.page - 2)
@@ -5,6 +5,7 @@ Script para limpiar datos de prueba de la base de datos
 
 import sys
 import os
+from sqlalchemy import select, text
 from sqlalchemy.orm import Session
 
 # Agregar el directorio raíz al path
@@ -13,7 +14,21 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from app.database import SessionLocal
 from app.models import (
     User, Company, Location, Device, Tag,
-    DeviceMovement, UserRole, CostCalculation, MonthlyReport, AuditLog
+    DeviceMovement, UserRole, CostCalculation, MonthlyReport, AuditLog,
+    location_company_association
+)
+
+# Usuarios y empresas creados por create_test_data.py
+TEST_USER_EMAILS = (
+    'staff@storatrack.com',
+    'cliente1@techcorp.cl',
+    'cliente2@innovacion.cl',
+    'cliente3@soluciones.cl'
+)
+TEST_COMPANY_RUTS = (
+    '76.123.456-7',
+    '77.987.654-3',
+    '78.555.444-9'
 )
 
 def clean_test_data():
@@ -23,68 +38,65 @@ def clean_test_data():
     try:
         print("Iniciando limpieza de datos de prueba...")
         
-        # Eliminar reportes mensuales
-        reports_count = db.query(MonthlyReport).count()
-        if reports_count > 0:
-            db.query(MonthlyReport).delete()
-            print(f"✓ Eliminados {reports_count} reportes mensuales")
-        
-        # Eliminar cálculos de costos
-        costs_count = db.query(CostCalculation).count()
-        if costs_count > 0:
-            db.query(CostCalculation).delete()
-            print(f"✓ Eliminados {costs_count} cálculos de costos")
-        
-        # Eliminar movimientos de dispositivos
-        movements_count = db.query(DeviceMovement).count()
-        if movements_count > 0:
-            db.query(DeviceMovement).delete()
-            print(f"✓ Eliminados {movements_count} movimientos de dispositivos")
-        
-        # Eliminar dispositivos
-        devices_count = db.query(Device).count()
-        if devices_count > 0:
-            db.query(Device).delete()
-            print(f"✓ Eliminados {devices_count} dispositivos")
-        
-        # Eliminar tags
-        tags_count = db.query(Tag).count()
-        if tags_count > 0:
-            db.query(Tag).delete()
-            print(f"✓ Eliminados {tags_count} tags")
-        
-        # Eliminar ubicaciones
-        locations_count = db.query(Location).count()
-        if locations_count > 0:
-            db.query(Location).delete()
-            print(f"✓ Eliminadas {locations_count} ubicaciones")
+        if db.get_bind().dialect.name == "postgresql":
+            # Vaciado completo: TRUNCATE no borra fila a fila (CASCADE incluye
+            # las tablas de asociación con dispositivos, tags y ubicaciones)
+            db.execute(text(
+                "TRUNCATE monthly_reports, cost_calculations, device_movements, "
+                "devices, tags, locations RESTART IDENTITY CASCADE"
+            ))
+            print("✓ Vaciadas las tablas de reportes, costos, movimientos, dispositivos, tags y ubicaciones")
+        else:
+            # Eliminar reportes mensuales
+            reports_count = db.query(MonthlyReport).delete(synchronize_session=False)
+            if reports_count:
+                print(f"✓ Eliminados {reports_count} reportes mensuales")
+            
+            # Eliminar cálculos de costos
+            costs_count = db.query(CostCalculation).delete(synchronize_session=False)
+            if costs_count:
+                print(f"✓ Eliminados {costs_count} cálculos de costos")
+            
+            # Eliminar movimientos de dispositivos
+            movements_count = db.query(DeviceMovement).delete(synchronize_session=False)
+            if movements_count:
+                print(f"✓ Eliminados {movements_count} movimientos de dispositivos")
+            
+            # Eliminar dispositivos
+            devices_count = db.query(Device).delete(synchronize_session=False)
+            if devices_count:
+                print(f"✓ Eliminados {devices_count} dispositivos")
+            
+            # Eliminar tags
+            tags_count = db.query(Tag).delete(synchronize_session=False)
+            if tags_count:
+                print(f"✓ Eliminados {tags_count} tags")
+            
+            # Eliminar ubicaciones
+            locations_count = db.query(Location).delete(synchronize_session=False)
+            if locations_count:
+                print(f"✓ Eliminadas {locations_count} ubicaciones")
         
         # Eliminar usuarios de prueba (mantener solo admin principal)
-        test_users = db.query(User).filter(
-            User.email.in_([
-                'staff@storatrack.com',
-                'cliente1@techcorp.cl',
-                'cliente2@innovacion.cl',
-                'cliente3@soluciones.cl'
-            ])
-        ).all()
-        
-        for user in test_users:
-            db.delete(user)
-            print(f"✓ Usuario eliminado: {user.email}")
-        
-        # Eliminar empresas de prueba
-        test_companies = db.query(Company).filter(
-            Company.rut_id.in_([
-                '76.123.456-7',
-                '77.987.654-3',
-                '78.555.444-9'
-            ])
-        ).all()
+        users_count = db.query(User).filter(
+            User.email.in_(TEST_USER_EMAILS)
+        ).delete(synchronize_session=False)
+        print(f"✓ Eliminados {users_count} usuarios de prueba")
         
-        for company in test_companies:
-            db.delete(company)
-            print(f"✓ Empresa eliminada: {company.name}")
+        # Eliminar empresas de prueba (soltando antes lo que el ORM desvinculaba al borrarlas)
+        test_company_ids = select(Company.id).where(Company.rut_id.in_(TEST_COMPANY_RUTS))
+        db.execute(
+            location_company_association.delete().where(
+                location_company_association.c.company_id.in_(test_company_ids)
+            )
+        )
+        db.query(User).filter(
+            User.company_id.in_(test_company_ids)
+        ).update({User.company_id: None}, synchronize_session=False)
+        companies_count = db.query(Company).filter(
+            Company.rut_id.in_(TEST_COMPANY_RUTS)
+        ).delete(synchronize_session=False)
+        print(f"✓ Eliminadas {companies_count} empresas de prueba")
         
         # Actualizar el usuario admin para producción
         admin_user = db.query(User).filter(
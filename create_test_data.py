@@ -8,69 +8,91 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.database import get_db
-from app.models import User, Company, Location, Device, UserRole, DeviceStatus, LocationType
+from app.database import SessionLocal
+from app.models import User, Company, Location, Device, UserRole, DeviceStatus, LocationType, device_tags
 from app.auth import get_password_hash
 from app.utils.datetime_utils import now_local
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+def bulk_insert(db: Session, model, rows: list, return_ids: bool = False) -> list:
+    """Insertar filas (dicts) con un solo executemany Core, sin objetos ORM
+    
+    SQLAlchemy agrupa las filas en INSERT de varios VALUES (insertmanyvalues),
+    también en psycopg2. Con `return_ids` devuelve los ids en el orden de `rows`.
+    """
+    if not rows:
+        return []
+    if return_ids:
+        result = db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+        return list(result.scalars())
+    db.execute(insert(model), rows)
+    return []
 
 def create_test_data():
     """Crear todos los datos de prueba"""
     print("=== CREANDO DATOS DE PRUEBA STORATRACK ===")
     
-    # Obtener sesión de base de datos
-    db = next(get_db())
+    # Misma fecha de creación para todos los registros de la carga
+    created_at = now_local()
+    # Todos los usuarios de prueba comparten contraseña: un solo hash (bcrypt es costoso)
+    hashed_password = get_password_hash("test123456")
     
-    try:
-        # 1. Crear usuario staff de prueba
-        print("\n1. Creando usuario staff de prueba...")
-        staff_user = create_staff_user(db)
-        
-        # 2. Crear empresa de prueba
-        print("\n2. Creando empresa de prueba...")
-        test_company = create_test_company(db)
-        
-        # 3. Crear ubicaciones de prueba
-        print("\n3. Creando ubicaciones de prueba...")
-        locations = create_test_locations(db, test_company)
-        
-        # 4. Crear dispositivos de prueba
-        print("\n4. Creando dispositivos de prueba...")
-        devices = create_test_devices(db, test_company, locations)
-        
-        # 5. Crear usuarios cliente de prueba
-        print("\n5. Creando usuarios cliente de prueba...")
-        client_users = create_client_users(db, test_company)
-        
-        print("\n=== DATOS DE PRUEBA CREADOS EXITOSAMENTE ===")
-        print(f"✓ Usuario staff: {staff_user.email}")
-        print(f"✓ Empresa: {test_company.name}")
-        print(f"✓ Ubicaciones: {len(locations)} creadas")
-        print(f"✓ Dispositivos: {len(devices)} creados")
-        print(f"✓ Usuarios cliente: {len(client_users)} creados")
-        
-        print("\n=== CREDENCIALES DE PRUEBA ===")
-        print(f"Staff: {staff_user.email} / test123456")
-        for user in client_users:
-            print(f"Cliente: {user.email} / test123456")
+    # Sesión propia del script: sin expirar los objetos al confirmar, así el
+    # resumen final no vuelve a consultar la base de datos
+    with SessionLocal(expire_on_commit=False) as db:
+        try:
+            # 1. Crear usuario staff de prueba
+            print("\n1. Creando usuario staff de prueba...")
+            staff_user = create_staff_user(db, created_at, hashed_password)
+            
+            # 2. Crear empresa de prueba
+            print("\n2. Creando empresa de prueba...")
+            test_company = create_test_company(db, created_at)
+            
+            # 3. Crear ubicaciones de prueba
+            print("\n3. Creando ubicaciones de prueba...")
+            locations = create_test_locations(db, test_company, created_at)
             
-        print("\n=== URLS DE PRUEBA ===")
-        print("Admin Dashboard: http://localhost:4011/admin/dashboard")
-        print("Usuarios: http://localhost:4011/admin/users")
-        print("Empresas: http://localhost:4011/admin/companies")
-        print("Ubicaciones: http://localhost:4011/admin/locations")
-        print("Dispositivos: http://localhost:4011/admin/devices")
-        print("Cliente Dashboard: http://localhost:4011/client/dashboard")
-        
-    except Exception as e:
-        print(f"Error creando datos de prueba: {e}")
-        db.rollback()
-        raise
-    finally:
-        db.close()
+            # 4. Crear dispositivos de prueba
+            print("\n4. Creando dispositivos de prueba...")
+            devices = create_test_devices(db, test_company, locations, created_at)
+            
+            # 5. Crear usuarios cliente de prueba
+            print("\n5. Creando usuarios cliente de prueba...")
+            client_users = create_client_users(db, test_company, created_at, hashed_password)
+            
+            # Una sola transacción para toda la carga
+            db.commit()
+            
+            print("\n=== DATOS DE PRUEBA CREADOS EXITOSAMENTE ===")
+            print(f"✓ Usuario staff: {staff_user.email}")
+            print(f"✓ Empresa: {test_company.name}")
+            print(f"✓ Ubicaciones: {len(locations)} creadas")
+            print(f"✓ Dispositivos: {len(devices)} creados")
+            print(f"✓ Usuarios cliente: {len(client_users)} creados")
+            
+            print("\n=== CREDENCIALES DE PRUEBA ===")
+            print(f"Staff: {staff_user.email} / test123456")
+            for user in client_users:
+                print(f"Cliente: {user.email} / test123456")
+            
+            print("\n=== URLS DE PRUEBA ===")
+            print("Admin Dashboard: http://localhost:4011/admin/dashboard")
+            print("Usuarios: http://localhost:4011/admin/users")
+            print("Empresas: http://localhost:4011/admin/companies")
+            print("Ubicaciones: http://localhost:4011/admin/locations")
+            print("Dispositivos: http://localhost:4011/admin/devices")
+            print("Cliente Dashboard: http://localhost:4011/client/dashboard")
+            
+        except Exception as e:
+            print(f"Error creando datos de prueba: {e}")
+            db.rollback()
+            raise
 
-def create_staff_user(db: Session):
+def create_staff_user(db: Session, created_at: datetime, hashed_password: str):
     """Crear usuario staff de prueba"""
     # Verificar si ya existe
     existing = db.query(User).filter(User.email == "staff_test@storatrack.com").first()
@@ -80,21 +102,19 @@ def create_staff_user(db: Session):
     
     user = User(
         email="staff_test@storatrack.com",
-        hashed_password=get_password_hash("test123456"),
+        hashed_password=hashed_password,
         full_name="Staff de Prueba",
         role=UserRole.STAFF,
         company_id=None,
         is_active=True,
-        created_at=now_local()
+        created_at=created_at
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
     print(f"  ✓ Usuario staff creado: {user.email}")
     return user
 
-def create_test_company(db: Session):
+def create_test_company(db: Session, created_at: datetime):
     """Crear empresa de prueba"""
     # Verificar si ya existe
     existing = db.query(Company).filter(Company.name == "Empresa Test CRUD").first()
@@ -116,16 +136,15 @@ def create_test_company(db: Session):
         currency="CLP",
         timezone="America/Santiago",
         is_active=True,
-        created_at=now_local()
+        created_at=created_at
     )
     
     db.add(company)
-    db.commit()
-    db.refresh(company)
+    db.flush()  # Obtener el id sin confirmar la transacción
     print(f"  ✓ Empresa creada: {company.name}")
     return company
 
-def create_test_locations(db: Session, company: Company):
+def create_test_locations(db: Session, company: Company, created_at: datetime):
     """Crear ubicaciones de prueba"""
     locations = []
     
@@ -141,7 +160,7 @@ def create_test_locations(db: Session, company: Company):
         "max_capacity": 1000,
         "shelf_count": 10,
         "is_active": True,
-        "created_at": now_local()
+        "created_at": created_at
     }
     
     # Verificar si ya existe
@@ -149,8 +168,7 @@ def create_test_locations(db: Session, company: Company):
     if not existing:
         main_location = Location(**main_location_data)
         db.add(main_location)
-        db.commit()
-        db.refresh(main_location)
+        db.flush()
         locations.append(main_location)
         print(f"  ✓ Ubicación principal creada: {main_location.name}")
     else:
@@ -171,7 +189,7 @@ def create_test_locations(db: Session, company: Company):
             "max_capacity": 50,
             "shelf_count": 1,
             "is_active": True,
-            "created_at": now_local()
+            "created_at": created_at
         },
         {
             "name": "Estante B2 Test",
@@ -184,17 +202,23 @@ def create_test_locations(db: Session, company: Company):
             "max_capacity": 30,
             "shelf_count": 1,
             "is_active": True,
-            "created_at": now_local()
+            "created_at": created_at
         }
     ]
     
+    # Insertar las sub-ubicaciones nuevas en un solo lote (sus ids se usan en los dispositivos)
+    codes = [sub_data["code"] for sub_data in sub_locations_data]
+    existing_by_code = {
+        location.code: location
+        for location in db.query(Location).filter(Location.code.in_(codes))
+    }
+    new_rows = [sub_data for sub_data in sub_locations_data if sub_data["code"] not in existing_by_code]
+    new_ids = bulk_insert(db, Location, new_rows, return_ids=True)
+    new_by_code = {row["code"]: row_id for row, row_id in zip(new_rows, new_ids)}
     for sub_data in sub_locations_data:
-        existing = db.query(Location).filter(Location.code == sub_data["code"]).first()
+        existing = existing_by_code.get(sub_data["code"])
         if not existing:
-            sub_location = Location(**sub_data)
-            db.add(sub_location)
-            db.commit()
-            db.refresh(sub_location)
+            sub_location = SimpleNamespace(**sub_data, id=new_by_code[sub_data["code"]])
             locations.append(sub_location)
             print(f"  ✓ Sub-ubicación creada: {sub_location.name}")
         else:
@@ -203,7 +227,7 @@ def create_test_locations(db: Session, company: Company):
     
     return locations
 
-def create_test_devices(db: Session, company: Company, locations: list):
+def create_test_devices(db: Session, company: Company, locations: list, created_at: datetime):
     """Crear dispositivos de prueba"""
     devices = []
     
@@ -220,7 +244,7 @@ def create_test_devices(db: Session, company: Company, locations: list):
             "costo_base": 500000.0,
             "costo_diario": 1000.0,
             "is_active": True,
-            "created_at": now_local()
+            "created_at": created_at
         },
         {
             "name": "Desktop Test 002",
@@ -234,7 +258,7 @@ def create_test_devices(db: Session, company: Company, locations: list):
             "costo_base": 800000.0,
             "costo_diario": 1500.0,
             "is_active": True,
-            "created_at": now_local()
+            "created_at": created_at
         },
         {
             "name": "Tablet Test 003",
@@ -248,107 +272,120 @@ def create_test_devices(db: Session, company: Company, locations: list):
             "costo_base": 300000.0,
             "costo_diario": 800.0,
             "is_active": True,
-            "created_at": now_local()
+            "created_at": created_at
         }
     ]
     
+    # Insertar los dispositivos nuevos en un solo lote (executemany, sin leer los ids)
+    serial_numbers = [device_data["serial_number"] for device_data in devices_data]
+    existing_by_serial = {
+        device.serial_number: device
+        for device in db.query(Device).filter(Device.serial_number.in_(serial_numbers))
+    }
+    new_rows = []
     for device_data in devices_data:
-        existing = db.query(Device).filter(Device.serial_number == device_data["serial_number"]).first()
+        existing = existing_by_serial.get(device_data["serial_number"])
         if not existing:
-            device = Device(**device_data)
-            db.add(device)
-            db.commit()
-            db.refresh(device)
+            device = SimpleNamespace(**device_data)
+            new_rows.append(device_data)
             devices.append(device)
             print(f"  ✓ Dispositivo creado: {device.serial_number} ({device.name})")
         else:
             devices.append(existing)
             print(f"  - Dispositivo ya existe: {existing.serial_number}")
     
+    bulk_insert(db, Device, new_rows)
+    
     return devices
 
-def create_client_users(db: Session, company: Company):
+def create_client_users(db: Session, company: Company, created_at: datetime, hashed_password: str):
     """Crear usuarios cliente de prueba"""
     users = []
     
     users_data = [
         {
             "email": "cliente1_test@storatrack.com",
-            "hashed_password": get_password_hash("test123456"),
+            "hashed_password": hashed_password,
             "full_name": "Cliente Test 1",
             "role": UserRole.CLIENT_USER,
             "company_id": company.id,
             "is_active": True,
-            "created_at": now_local()
+            "created_at": created_at
         },
         {
             "email": "cliente2_test@storatrack.com",
-            "hashed_password": get_password_hash("test123456"),
+            "hashed_password": hashed_password,
             "full_name": "Cliente Test 2",
             "role": UserRole.CLIENT_USER,
             "company_id": company.id,
             "is_active": True,
-            "created_at": now_local()
+            "created_at": created_at
         }
     ]
     
+    # Insertar los usuarios nuevos en un solo lote (executemany, sin leer los ids)
+    emails = [user_data["email"] for user_data in users_data]
+    existing_by_email = {
+        user.email: user
+        for user in db.query(User).filter(User.email.in_(emails))
+    }
+    new_rows = []
     for user_data in users_data:
-        existing = db.query(User).filter(User.email == user_data["email"]).first()
+        existing = existing_by_email.get(user_data["email"])
         if not existing:
-            user = User(**user_data)
-            db.add(user)
-            db.commit()
-            db.refresh(user)
+            user = SimpleNamespace(**user_data)
+            new_rows.append(user_data)
             users.append(user)
             print(f"  ✓ Usuario cliente creado: {user.email}")
         else:
             users.append(existing)
             print(f"  - Usuario cliente ya existe: {existing.email}")
     
+    bulk_insert(db, User, new_rows)
+    
     return users
 
 def cleanup_test_data():
     """Limpiar datos de prueba"""
     print("=== LIMPIANDO DATOS DE PRUEBA ===")
     
-    db = next(get_db())
-    
-    try:
-        # Eliminar dispositivos de prueba
-        devices = db.query(Device).filter(Device.serial_number.like("TEST%")).all()
-        for device in devices:
-            db.delete(device)
-            print(f"  ✓ Dispositivo eliminado: {device.serial_number}")
-        
-        # Eliminar ubicaciones de prueba
-        locations = db.query(Location).filter(Location.code.like("%T001")).all()
-        for location in locations:
-            db.delete(location)
-            print(f"  ✓ Ubicación eliminada: {location.name}")
-        
-        # Eliminar usuarios de prueba
-        test_emails = ["staff_test@storatrack.com", "cliente1_test@storatrack.com", "cliente2_test@storatrack.com"]
-        for email in test_emails:
-            user = db.query(User).filter(User.email == email).first()
-            if user:
-                db.delete(user)
-                print(f"  ✓ Usuario eliminado: {user.email}")
-        
-        # Eliminar empresa de prueba
-        company = db.query(Company).filter(Company.name == "Empresa Test CRUD").first()
-        if company:
-            db.delete(company)
-            print(f"  ✓ Empresa eliminada: {company.name}")
-        
-        db.commit()
-        print("\n✅ Datos de prueba eliminados exitosamente")
-        
-    except Exception as e:
-        print(f"Error limpiando datos: {e}")
-        db.rollback()
-        raise
-    finally:
-        db.close()
+    with SessionLocal() as db:
+        try:
+            # Eliminar dispositivos de prueba (borrado masivo; primero sus etiquetas)
+            test_device_ids = select(Device.id).where(Device.serial_number.like("TEST%"))
+            db.execute(device_tags.delete().where(device_tags.c.device_id.in_(test_device_ids)))
+            deleted = db.query(Device).filter(
+                Device.serial_number.like("TEST%")
+            ).delete(synchronize_session=False)
+            print(f"  ✓ Dispositivos eliminados: {deleted}")
+            
+            # Eliminar ubicaciones de prueba (códigos exactos, usa ix_locations_code)
+            test_codes = ["BPT001", "EA1T001", "EB2T001"]
+            deleted = db.query(Location).filter(
+                Location.code.in_(test_codes)
+            ).delete(synchronize_session=False)
+            print(f"  ✓ Ubicaciones eliminadas: {deleted}")
+            
+            # Eliminar usuarios de prueba
+            test_emails = ["staff_test@storatrack.com", "cliente1_test@storatrack.com", "cliente2_test@storatrack.com"]
+            deleted = db.query(User).filter(
+                User.email.in_(test_emails)
+            ).delete(synchronize_session=False)
+            print(f"  ✓ Usuarios eliminados: {deleted}")
+            
+            # Eliminar empresa de prueba
+            company = db.query(Company).filter(Company.name == "Empresa Test CRUD").first()
+            if company:
+                db.delete(company)
+                print(f"  ✓ Empresa eliminada: {company.name}")
+            
+            db.commit()
+            print("\n✅ Datos de prueba eliminados exitosamente")
+            
+        except Exception as e:
+            print(f"Error limpiando datos: {e}")
+            db.rollback()
+            raise
 
 if __name__ == "__main__":
     import argparse
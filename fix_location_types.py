@@ -4,21 +4,13 @@ from sqlalchemy import text
 def fix_location_types():
     db = SessionLocal()
     try:
-        # Actualizar valores incorrectos en la base de datos
-        result = db.execute(text("UPDATE locations SET location_type = 'ESTANTERIA' WHERE location_type = 'estanteria'"))
-        print(f"Updated {result.rowcount} rows with 'estanteria' to 'ESTANTERIA'")
-        
-        result = db.execute(text("UPDATE locations SET location_type = 'DEPOSITO' WHERE location_type = 'deposito'"))
-        print(f"Updated {result.rowcount} rows with 'deposito' to 'DEPOSITO'")
-        
-        result = db.execute(text("UPDATE locations SET location_type = 'ESTANTE' WHERE location_type = 'estante'"))
-        print(f"Updated {result.rowcount} rows with 'estante' to 'ESTANTE'")
-        
-        result = db.execute(text("UPDATE locations SET location_type = 'CAJA' WHERE location_type = 'caja'"))
-        print(f"Updated {result.rowcount} rows with 'caja' to 'CAJA'")
-        
-        result = db.execute(text("UPDATE locations SET location_type = 'AREA' WHERE location_type = 'area'"))
-        print(f"Updated {result.rowcount} rows with 'area' to 'AREA'")
+        # Actualizar valores incorrectos en la base de datos (un solo recorrido:
+        # el valor correcto es siempre el mismo texto en mayúsculas)
+        result = db.execute(text(
+            "UPDATE locations SET location_type = UPPER(location_type) "
+            "WHERE location_type IN ('estanteria', 'deposito', 'estante', 'caja', 'area')"
+        ))
+        print(f"Updated {result.rowcount} rows with lowercase location types to uppercase")
         
         db.commit()
         print("All location types updated successfully!")
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Migración para agregar índices compuestos a dispositivos y movimientos:
+- devices(company_id, fecha_ingreso), (company_id, status) y (company_id, created_at),
+  parciales sobre is_active
+- device_movements(device_id, created_at) y (device_id, to_status, created_at)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+from app.config import settings
+from app.models import Device, DeviceMovement
+
+def run_migration():
+    """Ejecutar la migración"""
+    if settings.database_url.startswith("sqlite"):
+        engine = create_engine(
+            settings.database_url,
+            connect_args={"check_same_thread": False},
+            poolclass=NullPool
+        )
+    else:
+        engine = create_engine(settings.database_url, poolclass=NullPool)
+    
+    with engine.begin() as conn:
+        # Los índices se definen en los modelos; aquí solo se crean si faltan
+        for table in (Device.__table__, DeviceMovement.__table__):
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+        
+        print("Migración completada exitosamente")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Migración para agregar el índice de búsqueda de dispositivos (solo PostgreSQL):
+- extensión pg_trgm
+- índice GIN trigram sobre nombre, serie, modelo y marca concatenados,
+  usado por el filtro de búsqueda del listado de dispositivos del cliente
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from app.config import settings
+
+def run_migration():
+    """Ejecutar la migración"""
+    if settings.database_url.startswith("sqlite"):
+        print("SQLite no soporta índices trigram; migración omitida")
+        return
+    
+    engine = create_engine(settings.database_url, poolclass=NullPool)
+    
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        
+        # La expresión debe coincidir con DEVICE_SEARCH_TEXT en app/routers/client.py
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_devices_search_trgm ON devices USING gin (
+                (coalesce(name, '') || ' ' || coalesce(serial_number, '') || ' ' ||
+                 coalesce(model, '') || ' ' || coalesce(brand, '')) gin_trgm_ops
+            )
+        """))
+        
+        print("Migración completada exitosamente")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Migración para agregar el índice sobre locations(code), usado por las
+búsquedas por código de referencia
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+from app.config import settings
+from app.models import Location
+
+def run_migration():
+    """Ejecutar la migración"""
+    if settings.database_url.startswith("sqlite"):
+        engine = create_engine(
+            settings.database_url,
+            connect_args={"check_same_thread": False},
+            poolclass=NullPool
+        )
+    else:
+        engine = create_engine(settings.database_url, poolclass=NullPool)
+    
+    with engine.begin() as conn:
+        # El índice se define en el modelo; aquí solo se crea si falta
+        for index in Location.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
+        
+        print("Migración completada exitosamente")
+
+if __name__ == "__main__":
+    run_migration()
@@ -8,23 +8,80 @@ Migración para mejorar el modelo de ubicaciones:
 
 import sys
 import os
+from contextlib import contextmanager
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.pool import NullPool
 from app.config import settings
-from app.models import Base
+from app.models import Base, Location
+
+# Campos nuevos de locations (nombre, declaración SQL)
+NEW_LOCATION_COLUMNS = (
+    ("code", "VARCHAR(100)"),
+    ("location_type", "VARCHAR(20) DEFAULT 'area'"),
+    ("max_capacity", "INTEGER"),
+    ("shelf_count", "INTEGER"),
+    ("sort_order", "INTEGER DEFAULT 0"),
+)
+
+# Columnas de la tabla reconstruida en SQLite (se copian por nombre, no por posición)
+LOCATION_COLUMNS = (
+    "id", "name", "description", "code", "parent_id", "location_type", "level",
+    "max_capacity", "shelf_count", "sort_order", "company_id", "created_at",
+    "updated_at", "is_active"
+)
+
+# PRAGMAs por conexión durante la migración en SQLite. synchronous=NORMAL solo
+# es seguro ante cortes de energía en modo WAL, por eso van juntos.
+SQLITE_MIGRATION_PRAGMAS = (
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-65536",
+)
+
+def _set_journal_mode(engine, mode: str) -> str:
+    """Cambiar el journal_mode de SQLite y devolver el anterior"""
+    with engine.connect() as conn:
+        previous = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+        conn.exec_driver_sql(f"PRAGMA journal_mode={mode}")
+    return previous
+
+@contextmanager
+def sqlite_migration_mode(engine):
+    """Ejecutar la migración en WAL con synchronous=NORMAL y restaurar el modo original
+    
+    journal_mode persiste en el archivo de la base, el resto de PRAGMAs es por conexión.
+    En otros motores no hace nada.
+    """
+    if engine.dialect.name != "sqlite":
+        yield
+        return
+    
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        for pragma in SQLITE_MIGRATION_PRAGMAS:
+            dbapi_connection.execute(f"PRAGMA {pragma}")
+    
+    previous = _set_journal_mode(engine, "WAL")
+    try:
+        yield
+    finally:
+        _set_journal_mode(engine, previous)
 
 def run_migration():
     """Ejecutar la migración"""
     if settings.database_url.startswith("sqlite"):
         engine = create_engine(
             settings.database_url,
-            connect_args={"check_same_thread": False}
+            connect_args={"check_same_thread": False},
+            poolclass=NullPool
         )
     else:
-        engine = create_engine(settings.database_url)
+        engine = create_engine(settings.database_url, poolclass=NullPool)
     
-    with engine.connect() as conn:
+    # Toda la migración en una sola transacción
+    with sqlite_migration_mode(engine), engine.begin() as conn:
         # Crear tabla de asociación location_companies
         conn.execute(text("""
             CREATE TABLE IF NOT EXISTS location_companies (
@@ -36,72 +93,65 @@ def run_migration():
             )
         """))
         
-        # Agregar nuevos campos a la tabla locations
-        try:
-            conn.execute(text("ALTER TABLE locations ADD COLUMN code VARCHAR(100)"))
-        except Exception:
-            pass  # Campo ya existe
-            
-        try:
-            conn.execute(text("ALTER TABLE locations ADD COLUMN location_type VARCHAR(20) DEFAULT 'area'"))
-        except Exception:
-            pass  # Campo ya existe
-            
-        try:
-            conn.execute(text("ALTER TABLE locations ADD COLUMN max_capacity INTEGER"))
-        except Exception:
-            pass  # Campo ya existe
-            
-        try:
-            conn.execute(text("ALTER TABLE locations ADD COLUMN shelf_count INTEGER"))
-        except Exception:
-            pass  # Campo ya existe
-            
-        try:
-            conn.execute(text("ALTER TABLE locations ADD COLUMN sort_order INTEGER DEFAULT 0"))
-        except Exception:
-            pass  # Campo ya existe
+        columns = {column["name"]: column for column in inspect(conn).get_columns("locations")}
+        # En SQLite quitar el NOT NULL exige reconstruir la tabla, y la tabla nueva
+        # ya trae los campos nuevos: una sola reconstrucción en vez de ALTER + copia
+        rebuild = conn.dialect.name == "sqlite" and not columns["company_id"]["nullable"]
+        
+        # Agregar nuevos campos a la tabla locations (solo los que faltan)
+        missing = [(name, decl) for name, decl in NEW_LOCATION_COLUMNS if name not in columns]
+        if missing and not rebuild:
+            if conn.dialect.name == "sqlite":
+                # SQLite solo admite un ADD COLUMN por sentencia
+                for name, decl in missing:
+                    conn.execute(text(f"ALTER TABLE locations ADD COLUMN {name} {decl}"))
+            else:
+                add_columns = ", ".join(f"ADD COLUMN {name} {decl}" for name, decl in missing)
+                conn.execute(text(f"ALTER TABLE locations {add_columns}"))
         
         # Hacer company_id opcional (remover NOT NULL constraint)
-        try:
-            # Para SQLite, necesitamos recrear la tabla
-            conn.execute(text("""
-                CREATE TABLE locations_new AS SELECT * FROM locations
-            """))
-            
-            conn.execute(text("DROP TABLE locations"))
-            
-            conn.execute(text("""
-                CREATE TABLE locations (
-                    id INTEGER PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL,
-                    description TEXT,
-                    code VARCHAR(100),
-                    parent_id INTEGER,
-                    location_type VARCHAR(20) DEFAULT 'area',
-                    level INTEGER DEFAULT 1,
-                    max_capacity INTEGER,
-                    shelf_count INTEGER,
-                    sort_order INTEGER DEFAULT 0,
-                    company_id INTEGER,
-                    created_at DATETIME,
-                    updated_at DATETIME,
-                    is_active BOOLEAN DEFAULT 1,
-                    FOREIGN KEY (parent_id) REFERENCES locations(id),
-                    FOREIGN KEY (company_id) REFERENCES companies(id)
-                )
-            """))
-            
-            conn.execute(text("""
-                INSERT INTO locations SELECT * FROM locations_new
-            """))
-            
-            conn.execute(text("DROP TABLE locations_new"))
-            
-        except Exception as e:
-            print(f"Error al modificar company_id: {e}")
+        if not columns["company_id"]["nullable"]:
+            if rebuild:
+                # SQLite no permite ALTER COLUMN: crear la tabla nueva, copiar los
+                # datos una sola vez y renombrarla
+                conn.execute(text("DROP TABLE IF EXISTS locations_new"))
+                conn.execute(text("""
+                    CREATE TABLE locations_new (
+                        id INTEGER PRIMARY KEY,
+                        name VARCHAR(255) NOT NULL,
+                        description TEXT,
+                        code VARCHAR(100),
+                        parent_id INTEGER,
+                        location_type VARCHAR(20) DEFAULT 'area',
+                        level INTEGER DEFAULT 1,
+                        max_capacity INTEGER,
+                        shelf_count INTEGER,
+                        sort_order INTEGER DEFAULT 0,
+                        company_id INTEGER,
+                        created_at DATETIME,
+                        updated_at DATETIME,
+                        is_active BOOLEAN DEFAULT 1,
+                        FOREIGN KEY (parent_id) REFERENCES locations(id),
+                        FOREIGN KEY (company_id) REFERENCES companies(id)
+                    )
+                """))
+                
+                # Los campos que aún no existían toman el valor por defecto de la tabla nueva
+                copied = ", ".join(name for name in LOCATION_COLUMNS if name in columns)
+                conn.execute(text(
+                    f"INSERT INTO locations_new ({copied}) "
+                    f"SELECT {copied} FROM locations"
+                ))
+                
+                conn.execute(text("DROP TABLE locations"))
+                conn.execute(text("ALTER TABLE locations_new RENAME TO locations"))
+                
+                # DROP TABLE elimina también los índices: recrear los del modelo
+                for index in Location.__table__.indexes:
+                    index.create(bind=conn, checkfirst=True)
+            else:
+                conn.execute(text("ALTER TABLE locations ALTER COLUMN company_id DROP NOT NULL"))
         
-        conn.commit()
         print("Migración completada exitosamente")
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 """Configuración específica para producción de StoraTrack"""
 
 import os
-from app.config import Settings
+from app.config import Settings, settings
 
 class ProductionSettings(Settings):
     """Configuración optimizada para producción"""
@@ -31,6 +31,9 @@ class ProductionSettings(Settings):
     # Desactivar debug en producción
     debug: bool = False
     
+    # No revisar si las plantillas cambiaron en cada render
+    templates_auto_reload: bool = False
+    
     # Configuración de SSL
     ssl_enabled: bool = os.getenv("SSL_ENABLED", "false").lower() == "true"
     
@@ -58,8 +61,9 @@ def validate_production_config():
     """Valida que la configuración de producción sea segura"""
     errors = []
     
+    # Valores ya leídos (entorno y .env) por la configuración de la aplicación
     # Verificar SECRET_KEY
-    secret_key = os.getenv("SECRET_KEY")
+    secret_key = settings.secret_key
     if not secret_key or len(secret_key) < 32:
         errors.append("SECRET_KEY debe tener al menos 32 caracteres")
     
@@ -67,12 +71,12 @@ def validate_production_config():
         errors.append("SECRET_KEY contiene texto por defecto, debe ser cambiada")
     
     # Verificar base de datos
-    db_url = os.getenv("DATABASE_URL")
+    db_url = settings.database_url
     if not db_url or "sqlite" in db_url:
         errors.append("Se recomienda usar PostgreSQL o MySQL para producción")
     
     # Verificar configuración de hosts
-    allowed_hosts = os.getenv("ALLOWED_HOSTS")
+    allowed_hosts = settings.allowed_hosts
     if not allowed_hosts or "*" in allowed_hosts:
         errors.append("ALLOWED_HOSTS debe especificar dominios específicos")
     
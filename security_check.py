@@ -2,10 +2,37 @@
 """Script de verificación de seguridad para StoraTrack"""
 
 import os
+import re
 import sys
+from functools import lru_cache
 from pathlib import Path
 from production_config import validate_production_config, PRODUCTION_CHECKLIST
 
+# Archivos cuyo contenido revisan las verificaciones (se leen una sola vez)
+AUDITED_FILES = [".env", "main.py"]
+
+# Patrones de las verificaciones de contenido (en bytes: sin decodificar ni .lower())
+_DEFAULTS_RE = re.compile(rb"change|default|example", re.IGNORECASE)
+_RELOAD_RE = re.compile(rb"reload\s*=\s*True")
+_DEBUG_RE = re.compile(rb"debug\s*=\s*true", re.IGNORECASE)
+
+@lru_cache(maxsize=64)
+def _stat(path):
+    """os.stat compartido por toda la auditoría; None si la ruta no existe"""
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+def _load_files(paths):
+    """Lee los archivos existentes de `paths` y devuelve {ruta: contenido en bytes}"""
+    files = {}
+    for path in paths:
+        if _stat(path) is not None:
+            with open(path, "rb") as f:
+                files[path] = f.read()
+    return files
+
 def check_file_permissions():
     """Verifica permisos de archivos sensibles"""
     issues = []
@@ -18,41 +45,37 @@ def check_file_permissions():
     ]
     
     for file_path in sensitive_files:
-        if os.path.exists(file_path):
+        stat_info = _stat(file_path)
+        if stat_info is not None:
             # En Windows, verificamos que el archivo no sea de solo lectura para todos
-            stat_info = os.stat(file_path)
             if stat_info.st_mode & 0o077:  # Otros usuarios tienen permisos
                 issues.append(f"Archivo {file_path} tiene permisos demasiado amplios")
     
     return issues
 
-def check_default_credentials():
+def check_default_credentials(files):
     """Verifica credenciales por defecto"""
     issues = []
     
     # Verificar archivo .env
-    if os.path.exists(".env"):
-        with open(".env", "r") as f:
-            content = f.read().lower()
-            
-        if "change" in content or "default" in content or "example" in content:
+    if ".env" in files:
+        if _DEFAULTS_RE.search(files[".env"]):
             issues.append("Archivo .env contiene valores por defecto")
     
     return issues
 
-def check_debug_settings():
+def check_debug_settings(files):
     """Verifica que debug esté desactivado"""
     issues = []
     
     # Verificar main.py
-    if os.path.exists("main.py"):
-        with open("main.py", "r") as f:
-            content = f.read()
-            
-        if "reload=True" in content:
+    if "main.py" in files:
+        content = files["main.py"]
+        
+        if _RELOAD_RE.search(content):
             issues.append("Reload está activado en main.py (debe ser False para producción)")
         
-        if "debug=True" in content.lower():
+        if _DEBUG_RE.search(content):
             issues.append("Debug está activado (debe ser False para producción)")
     
     return issues
@@ -71,19 +94,18 @@ def check_database_config():
     
     return issues
 
-def check_cors_settings():
+def check_cors_settings(files):
     """Verifica configuración de CORS"""
     issues = []
     
     # Verificar main.py para configuración de CORS
-    if os.path.exists("main.py"):
-        with open("main.py", "r") as f:
-            content = f.read()
-            
-        if 'allow_origins=["*"]' in content:
+    if "main.py" in files:
+        content = files["main.py"]
+        
+        if b'allow_origins=["*"]' in content:
             issues.append("CORS configurado para permitir todos los orígenes (inseguro)")
         
-        if 'allowed_hosts=["*"]' in content:
+        if b'allowed_hosts=["*"]' in content:
             issues.append("TrustedHostMiddleware configurado para permitir todos los hosts (inseguro)")
     
     return issues
@@ -96,7 +118,7 @@ def check_static_files():
     required_dirs = ["static", "static/css", "static/js", "static/images"]
     
     for dir_path in required_dirs:
-        if not os.path.exists(dir_path):
+        if _stat(dir_path) is None:
             issues.append(f"Directorio {dir_path} no existe")
     
     return issues
@@ -107,6 +129,7 @@ def run_security_audit():
     print("=" * 50)
     
     all_issues = []
+    files = _load_files(AUDITED_FILES)
     
     # Verificaciones de configuración
     print("\n📋 Verificando configuración de producción...")
@@ -130,7 +153,7 @@ def run_security_audit():
     
     # Verificaciones de credenciales
     print("\n🔑 Verificando credenciales por defecto...")
-    cred_issues = check_default_credentials()
+    cred_issues = check_default_credentials(files)
     if cred_issues:
         all_issues.extend(cred_issues)
         for issue in cred_issues:
@@ -140,7 +163,7 @@ def run_security_audit():
     
     # Verificaciones de debug
     print("\n🐛 Verificando configuración de debug...")
-    debug_issues = check_debug_settings()
+    debug_issues = check_debug_settings(files)
     if debug_issues:
         all_issues.extend(debug_issues)
         for issue in debug_issues:
@@ -160,7 +183,7 @@ def run_security_audit():
     
     # Verificaciones de CORS
     print("\n🌐 Verificando configuración de CORS...")
-    cors_issues = check_cors_settings()
+    cors_issues = check_cors_settings(files)
     if cors_issues:
         all_issues.extend(cors_issues)
         for issue in cors_issues:
@@ -4,15 +4,22 @@ Script de testing automatizado para StoraTrack
 Prueba todas las funcionalidades CRUD y operaciones principales
 """
 
-import requests
-import json
+import asyncio
+import httpx
+import orjson
 import time
-from datetime import datetime
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+def json_body(payload):
+    """Argumentos de httpx para enviar `payload` serializado con orjson"""
+    return {"content": orjson.dumps(payload), "headers": JSON_HEADERS}
 
 class StoraTrackTester:
     def __init__(self, base_url="http://localhost:4011"):
         self.base_url = base_url
-        self.session = requests.Session()
+        # Una conexión keep-alive para toda la corrida (sigue redirecciones como requests)
+        self.session = httpx.Client(follow_redirects=True, timeout=10.0)
         self.test_data = {
             "users": [],
             "companies": [],
@@ -20,9 +27,21 @@ class StoraTrackTester:
             "devices": []
         }
         
+    def post_all(self, path, payloads, field="json", max_concurrency=8):
+        """Enviar POST independientes en paralelo con la sesión actual (respuestas en orden)"""
+        async def run():
+            semaphore = asyncio.Semaphore(max_concurrency)
+            async with httpx.AsyncClient(cookies=self.session.cookies, follow_redirects=True, timeout=10.0) as client:
+                async def post(payload):
+                    async with semaphore:
+                        body = json_body(payload) if field == "json" else {field: payload}
+                        return await client.post(f"{self.base_url}{path}", **body)
+                return await asyncio.gather(*(post(payload) for payload in payloads))
+        return asyncio.run(run())
+        
     def log(self, message, level="INFO"):
         """Log con timestamp"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        timestamp = time.strftime("%H:%M:%S")
         print(f"[{timestamp}] {level}: {message}")
         
     def login_as_admin(self):
@@ -40,7 +59,7 @@ class StoraTrackTester:
             "password": "Kernel1.0"
         }
         
-        response = self.session.post(f"{self.base_url}/auth/login", data=login_data, allow_redirects=False)
+        response = self.session.post(f"{self.base_url}/auth/login", data=login_data, follow_redirects=False)
         
         # Verificar si hay redirección (login exitoso)
         if response.status_code == 302:
@@ -116,9 +135,9 @@ class StoraTrackTester:
             "is_active": True
         }
         
-        response = self.session.post(f"{self.base_url}/admin/locations", json=location_data)
+        response = self.session.post(f"{self.base_url}/admin/locations", **json_body(location_data))
         if response.status_code == 200 or response.status_code == 201:
-            result = response.json()
+            result = orjson.loads(response.content)
             if result.get("success"):
                 self.log("✓ Ubicación principal creada exitosamente")
                 self.test_data["locations"].append(location_data)
@@ -138,9 +157,9 @@ class StoraTrackTester:
                     "is_active": True
                 }
                 
-                response = self.session.post(f"{self.base_url}/admin/locations", json=sub_location_data)
+                response = self.session.post(f"{self.base_url}/admin/locations", **json_body(sub_location_data))
                 if response.status_code == 200 or response.status_code == 201:
-                    result = response.json()
+                    result = orjson.loads(response.content)
                     if result.get("success"):
                         self.log("✓ Sub-ubicación creada exitosamente")
                         self.test_data["locations"].append(sub_location_data)
@@ -196,10 +215,10 @@ class StoraTrackTester:
         ]
         
         created_count = 0
-        for device_data in devices:
-            response = self.session.post(f"{self.base_url}/admin/devices", json=device_data)
+        responses = self.post_all("/admin/devices", devices)
+        for device_data, response in zip(devices, responses):
             if response.status_code == 200 or response.status_code == 201:
-                result = response.json()
+                result = orjson.loads(response.content)
                 if result.get("success"):
                     self.log(f"✓ Dispositivo {device_data['serial_number']} creado exitosamente")
                     self.test_data["devices"].append(device_data)
@@ -235,15 +254,15 @@ class StoraTrackTester:
         ]
         
         created_count = 0
-        for user_data in client_users:
-            response = self.session.post(f"{self.base_url}/admin/users/create", data=user_data)
+        responses = self.post_all("/admin/users/create", client_users, field="data")
+        for user_data, response in zip(client_users, responses):
             if response.status_code == 302:  # Redirección exitosa
                 self.log(f"✓ Usuario cliente {user_data['email']} creado exitosamente")
                 self.test_data["users"].append(user_data)
                 created_count += 1
             elif response.status_code == 200:
                 # Verificar si hay error en la URL de redirección
-                if "error=" in response.url:
+                if "error=" in str(response.url):
                     self.log(f"✗ Error creando usuario cliente {user_data['email']}: {response.url}", "ERROR")
                 else:
                     self.log(f"✓ Usuario cliente {user_data['email']} creado exitosamente")
@@ -259,7 +278,7 @@ class StoraTrackTester:
         self.log("Probando acceso de usuarios cliente...")
         
         # Crear nueva sesión para cliente
-        client_session = requests.Session()
+        client_session = httpx.Client(follow_redirects=True, timeout=10.0)
         
         login_data = {
             "email": "cliente1_test@storatrack.com",
@@ -327,9 +346,6 @@ class StoraTrackTester:
             self.log("No se pudo hacer login como admin. Abortando pruebas.", "ERROR")
             return False
             
-        # Esperar un poco entre operaciones
-        time.sleep(1)
-        
         # Crear datos de prueba
         tests = [
             ("Usuario Staff", self.create_test_staff_user),
@@ -344,7 +360,6 @@ class StoraTrackTester:
             self.log(f"\n--- Probando {test_name} ---")
             if test_func():
                 success_count += 1
-            time.sleep(1)  # Pausa entre pruebas
             
         # Probar operaciones CRUD
         self.log("\n--- Probando Operaciones CRUD ---")